@@ -0,0 +1,281 @@
+import atexit
+import collections
+import math
+import os
+from ctypes import *
+
+# Shared CH347 I2C transport used by the sensor and clock scripts.
+# Set CH347_SIMULATE=1 to run against the simulated adapter in ch347_sim.py,
+# and CH347_TRACE=path to record the I2C calls (i2c_trace.py).
+
+DLL_NAME = "CH347DLLA64.dll"
+
+I2C_MODE = 0x20  # Value passed to CH347I2C_Set by the scripts
+
+# I2C stream packet sent with CH347WriteRead (CH341-compatible sub-commands).
+# A packet is I2C_STREAM, a run of sub-commands, then STM_END; the adapter
+# answers with the bytes clocked in by the STM_IN commands, in order.
+I2C_STREAM = 0xAA
+STM_STA = 0x74  # Start / repeated start
+STM_STO = 0x75  # Stop
+STM_OUT = 0x80  # Bits 5-0: number of bytes that follow to write
+STM_IN = 0xC0   # Bits 5-0: bytes to read with ACK; STM_IN alone reads one byte with NAK
+STM_US = 0x40   # Bits 3-0: delay in microseconds
+STM_MS = 0x50   # Bits 3-0: delay in milliseconds
+STM_END = 0x00
+STM_MAX = 0x3F  # Largest OUT/IN count in one sub-command
+STREAM_PACKET = 512  # Bytes per CH347WriteRead command packet
+RX_CAPACITY = 4096  # Preallocated receive buffer for vectored transfers
+
+# Delay executed by the adapter between operations of one transfer(). The
+# adapter counts whole milliseconds; a fractional ms is rounded up so a
+# settle or write-cycle delay is never cut short.
+Delay = collections.namedtuple("Delay", "ms")
+
+def whole_ms(ms):
+    return math.ceil(ms)
+
+def encode_delay(ms):
+    # STM_MS sub-commands for ms milliseconds, at most 15 per command
+    ms = whole_ms(ms)
+    units = []
+    while ms > 0:
+        n = min(ms, 0x0F)
+        units.append((bytes([STM_MS | n]), 0))
+        ms -= n
+    return units
+
+def encode_op(addr, write=b"", read=0):
+    # One I2C transaction as indivisible (sub-command bytes, bytes read) units
+    units = [(bytes([STM_STA]), 0)]
+    if write or not read:
+        out = bytes([addr << 1]) + bytes(write)
+        for i in range(0, len(out), STM_MAX):
+            chunk = out[i:i + STM_MAX]
+            units.append((bytes([STM_OUT | len(chunk)]) + chunk, 0))
+        if read:
+            units.append((bytes([STM_STA]), 0))  # Repeated start
+    if read:
+        units.append((bytes([STM_OUT | 1, (addr << 1) | 1]), 0))
+        remaining = read
+        while remaining > 1:
+            n = min(remaining - 1, STM_MAX)
+            units.append((bytes([STM_IN | n]), n))
+            remaining -= n
+        units.append((bytes([STM_IN]), 1))  # Last byte is NAKed
+    units.append((bytes([STM_STO]), 0))
+    return units
+
+_dll = None
+
+def load_dll():
+    global _dll
+    if _dll is None:
+        if os.environ.get("CH347_SIMULATE"):
+            from ch347_sim import SimulatedCH347
+            _dll = SimulatedCH347()
+        else:
+            _dll = windll.LoadLibrary(DLL_NAME)
+        _dll.CH347StreamI2C_RetACK.restype = c_bool
+        if os.environ.get("CH347_TRACE"):
+            # Record every I2C call to a binary trace (see i2c_trace.py)
+            from i2c_trace import TraceRecorder
+            _dll = TraceRecorder(_dll, os.environ["CH347_TRACE"])
+            atexit.register(_dll.close)
+    return _dll
+
+class WaveshareI2C:
+    def __init__(self, usb_dev=0, dll=None, mode=I2C_MODE):
+        self.usb_id = usb_dev
+        self.mode = mode
+        self.dll = dll or load_dll()
+        self.gpio_dir = c_ubyte()
+        self.gpio_data = c_ubyte()
+        self.ack_num = c_uint()
+        self.ack_ref = byref(self.ack_num)
+        self.tx = (c_ubyte * STREAM_PACKET)()
+        self.rx = (c_ubyte * RX_CAPACITY)()
+        self.rx_view = memoryview(self.rx).cast("B")
+        self.read_length = c_uint()
+        self.usb_transfers = 0
+        if self.dll.CH347OpenDevice(self.usb_id) != -1:
+            print("Device Opened Successfully!")
+            self.initialize_i2c()
+        else:
+            raise Exception("Device Open Failed!")
+
+    def initialize_i2c(self):
+        if not self.dll.CH347I2C_Set(self.usb_id, self.mode):  # Set I2C speed
+            raise Exception("Failed to initialize I2C")
+
+    def set_mode(self, mode):
+        # Re-issue CH347I2C_Set with a new mode (bits 0-1 select the bus speed)
+        self.mode = mode
+        self.initialize_i2c()
+
+    def close_device(self):
+        self.dll.CH347CloseDevice(self.usb_id)
+        print("Device Closed.")
+
+    def write(self, addr, register, data):
+        # Write one byte to an I2C device register
+        self.write_block(addr, register, (data,))
+
+    def write_block(self, addr, register, data):
+        # Write consecutive registers in a single transaction
+        tcmd = (c_ubyte * (len(data) + 2))()
+        ibuf = (c_ubyte * 1)()
+        tcmd[0] = addr << 1
+        tcmd[1] = register
+        for i, value in enumerate(data):
+            tcmd[i + 2] = value
+        result = self.dll.CH347StreamI2C(self.usb_id, len(tcmd), tcmd, 0, ibuf)
+        if not result:
+            raise Exception(f"Failed to write to address {hex(addr)}")
+
+    def read(self, addr, register, length):
+        # Read consecutive registers from an I2C device
+        tcmd = (c_ubyte * 2)()
+        rbuf = (c_ubyte * length)()
+        tcmd[0] = addr << 1
+        tcmd[1] = register
+        result = self.dll.CH347StreamI2C(self.usb_id, 2, tcmd, length, rbuf)
+        if not result:
+            raise Exception(f"Failed to read from address {hex(addr)}")
+        return rbuf
+
+    def write_read(self, addr, data, length=0):
+        # Generic transfer: write data after the address byte, then read
+        # length bytes with a repeated start (length 0 for a plain write)
+        tcmd = (c_ubyte * (len(data) + 1))(addr << 1, *data)
+        rbuf = (c_ubyte * max(length, 1))()
+        result = self.dll.CH347StreamI2C(self.usb_id, len(tcmd), tcmd, length, rbuf)
+        if not result:
+            raise Exception(f"Failed to transfer with address {hex(addr)}")
+        return bytes(rbuf[:length])
+
+    def probe(self, addr):
+        # True if a device acknowledges its address
+        tcmd = (c_ubyte * 1)(addr << 1)
+        return self.stream_ack(tcmd, 1, None, 0) > 0
+
+    def stream_ack(self, write_buffer, write_length, read_buffer, read_length):
+        # Raw transfer with caller-owned buffers; returns the number of
+        # acknowledged bytes, or -1 if the adapter reported a failure
+        if not self.dll.CH347StreamI2C_RetACK(self.usb_id, write_length, write_buffer,
+                                              read_length, read_buffer, self.ack_ref):
+            return -1
+        return self.ack_num.value
+
+    def transfer(self, ops, packed=True):
+        # Vectored transfer: ops is a list of (addr, write_bytes, read_length)
+        # and Delay(ms) entries, which run on the adapter inside the stream.
+        # Returns one memoryview per op into the shared receive buffer; the
+        # views are only valid until the next transfer() call.
+        ops = [(None, b"", 0, whole_ms(op.ms)) if isinstance(op, Delay) else tuple(op) + (0,) for op in ops]
+        total = sum(op[2] for op in ops)
+        if total > RX_CAPACITY:
+            raise Exception(f"Vectored read of {total} bytes exceeds {RX_CAPACITY}")
+        if packed:
+            units = []
+            for addr, write, read, delay in ops:
+                units += encode_delay(delay) if addr is None else encode_op(addr, write, read)
+            self.send_packets(units)
+        else:
+            offset = 0
+            for addr, write, read, delay in ops:
+                if addr is None:
+                    if not self.dll.CH347I2C_SetDelaymS(self.usb_id, delay):
+                        raise Exception("Failed to queue adapter delay")
+                    self.usb_transfers += 1
+                    continue
+                # One CH347StreamI2C per op, each reading straight into rx;
+                # a write longer than tx gets a one-off buffer as in write_read
+                if len(write) + 1 > STREAM_PACKET:
+                    tx = (c_ubyte * (len(write) + 1))(addr << 1, *write)
+                else:
+                    tx = self.tx
+                    tx[0] = addr << 1
+                    tx[1:len(write) + 1] = write
+                if not self.dll.CH347StreamI2C(self.usb_id, len(write) + 1, tx, read, self.rx_at(offset, read)):
+                    raise Exception(f"Failed to transfer with address {hex(addr)}")
+                self.usb_transfers += 1
+                offset += read
+        views = []
+        offset = 0
+        for op in ops:
+            views.append(self.rx_view[offset:offset + op[2]])
+            offset += op[2]
+        return views
+
+    def burst_read(self, addr, register, length, count, out=None):
+        # Read the same register block count times, packed into CH347WriteRead
+        # calls with iReadStep=length and iReadTimes=samples per packet. The
+        # samples land back to back in out (any writable buffer, e.g. a
+        # bytearray or numpy array) or in rx; returns a (count, length)
+        # memoryview over them, valid until the next transfer.
+        total = length * count
+        if out is None:
+            if total > RX_CAPACITY:
+                raise Exception(f"Burst of {total} bytes exceeds {RX_CAPACITY}; pass an out buffer")
+            out = self.rx
+        target = memoryview(out).cast("B")
+        if len(target) < total:
+            raise Exception(f"Burst buffer holds {len(target)} bytes, {total} needed")
+        op = b"".join(cmds for cmds, _ in encode_op(addr, bytes([register]), length))
+        per_packet = (STREAM_PACKET - 2) // len(op)
+        if per_packet < 1:
+            raise Exception(f"Burst read of {length} bytes does not fit one packet")
+        done = 0
+        while done < count:
+            n = min(per_packet, count - done)
+            packet = bytes([I2C_STREAM]) + op * n + bytes([STM_END])
+            self.tx[:len(packet)] = packet
+            rbuf = (c_ubyte * (n * length)).from_buffer(target, done * length)
+            result = self.dll.CH347WriteRead(self.usb_id, len(packet), self.tx, length, n,
+                                             byref(self.read_length), rbuf)
+            self.usb_transfers += 1
+            if not result or self.read_length.value != n * length:
+                raise Exception(f"Burst read from address {hex(addr)} failed")
+            done += n
+        return target[:total].cast("B", (count, length))
+
+    def rx_at(self, offset, length):
+        # ctypes view of rx starting at offset (shares memory, no copy)
+        return (c_ubyte * max(length, 1)).from_buffer(self.rx, offset)
+
+    def send_packets(self, units):
+        # Pack sub-command units into as few CH347WriteRead calls as possible
+        packet = bytearray([I2C_STREAM])
+        packet_read = 0
+        offset = 0
+        for cmds, read in units:
+            if len(packet) + len(cmds) + 1 > STREAM_PACKET:
+                offset += self.send_packet(packet, packet_read, offset)
+                packet = bytearray([I2C_STREAM])
+                packet_read = 0
+            packet += cmds
+            packet_read += read
+        if len(packet) > 1:
+            self.send_packet(packet, packet_read, offset)
+
+    def send_packet(self, packet, read, offset):
+        packet.append(STM_END)
+        self.tx[:len(packet)] = packet
+        result = self.dll.CH347WriteRead(self.usb_id, len(packet), self.tx, read, 1 if read else 0,
+                                         byref(self.read_length), self.rx_at(offset, read))
+        self.usb_transfers += 1
+        if not result or self.read_length.value != read:
+            raise Exception("Vectored I2C transfer failed")
+        return read
+
+    def gpio_set(self, enable, dir_out, data_out):
+        # Bits 0-7 map to GPIO0-7; only pins set in enable are changed
+        if not self.dll.CH347GPIO_Set(self.usb_id, enable, dir_out, data_out):
+            raise Exception("Failed to set GPIO")
+
+    def gpio_get(self):
+        # Returns the level bits of GPIO0-7
+        if not self.dll.CH347GPIO_Get(self.usb_id, byref(self.gpio_dir), byref(self.gpio_data)):
+            raise Exception("Failed to read GPIO")
+        return self.gpio_data.value
@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# asyncio front end for a CH347 adapter. Every blocking DLL call runs on one
+# executor thread per adapter (the adapter handles one transfer at a time and
+# ctypes releases the GIL while the DLL blocks), so display flushes, sensor
+# reads and socket handlers can share one event loop without stalling it.
+#
+# Backpressure: at most max_pending transfers may be queued per adapter;
+# further callers wait in the event loop. Cancellation: a cancelled transfer
+# that has not reached the executor thread is never sent on the bus.
+
+MAX_PENDING = 16
+
+class AsyncCH347Bus:
+    def __init__(self, i2c, max_pending=MAX_PENDING):
+        self.i2c = i2c
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ch347-{i2c.usb_id}")
+        self.slots = asyncio.Semaphore(max_pending)
+        self.queued = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    async def call(self, func, *args):
+        self.queued += 1
+        try:
+            async with self.slots:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, func, *args)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.queued -= 1
+        self.completed += 1
+        return result
+
+    async def write(self, addr, data):
+        await self.call(self.i2c.write_read, addr, bytes(data), 0)
+
+    async def write_read(self, addr, data, length):
+        return await self.call(self.i2c.write_read, addr, bytes(data), length)
+
+    async def scan(self, first=0x08, last=0x77):
+        # One queued probe per address so other traffic can interleave
+        found = []
+        for addr in range(first, last + 1):
+            if await self.call(self.i2c.probe, addr):
+                found.append(addr)
+        return found
+
+    async def close(self):
+        await self.call(self.i2c.close_device)
+        self.executor.shutdown(wait=True)
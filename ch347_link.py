@@ -0,0 +1,154 @@
+import time
+
+# Connection manager for an adapter that can be unplugged or reset while a
+# script runs. It wraps a transport (WaveshareI2C) and forwards every call.
+# When a call fails it asks the adapter for its GPIO state: if that works the
+# failure was on the bus (NACK, ...) and is passed through unchanged,
+# otherwise the adapter is gone and an outage starts. During an outage calls
+# fail fast with DeviceLost (stream_ack returns -1, as on any failure) and a
+# reopen is attempted on the first call after each backoff delay, so loops
+# keep running instead of blocking. After a reopen the adapter settings made
+# through the manager (SETTINGS, e.g. a bus speed lowered by set_mode) are
+# applied to the new transport, then the on_reconnect hooks replay device
+# state, e.g. SSD1306.restore() for the panel init and the last flushed
+# frame. Attributes such as mode are read from the current transport on
+# every access, so read them through the manager rather than keeping a copy.
+# Each outage records its time to recover and the operations lost; a display
+# loop loses one frame per refused operation, since a frame stops at its
+# first failed write. on_status listeners are called with ("lost", outage)
+# and ("back", outage) so scripts can report the link state; failures with
+# the link up (NACKs, a stream_ack returning -1) are counted as bus_errors.
+
+BACKOFF_START = 0.1  # Seconds before the second reopen attempt, doubled per failure
+BACKOFF_MAX = 5.0
+SETTINGS = ("set_mode",)  # Transport calls replayed after a reopen, last arguments win
+
+class DeviceLost(Exception):
+    pass
+
+class Outage:
+    def __init__(self, started):
+        self.started = started
+        self.recovered = None
+        self.attempts = 0
+        self.lost = 0
+
+    def duration(self):
+        return self.recovered - self.started
+
+class ConnectionManager:
+    def __init__(self, open_transport, backoff_start=BACKOFF_START, backoff_max=BACKOFF_MAX,
+                 clock=time.monotonic):
+        self.open_transport = open_transport  # Returns a new, opened transport
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.transport = open_transport()
+        self.restorers = []
+        self.listeners = []
+        self.settings = {}  # SETTINGS name -> last arguments
+        self.bus_errors = 0
+        self.outages = []   # Recovered outages
+        self.outage = None  # Current outage
+        self.next_attempt = 0.0
+        self.delay = backoff_start
+        self.restoring = False
+
+    def __getattr__(self, name):
+        attr = getattr(self.transport, name)
+        if not callable(attr):
+            return attr
+        def call(*args):
+            return self.call(name, args)
+        return call
+
+    def on_reconnect(self, restore):
+        self.restorers.append(restore)
+
+    def on_status(self, listener):
+        self.listeners.append(listener)
+
+    def notify(self, event):
+        for listener in self.listeners:
+            listener(event, self.outage)
+
+    def link_ok(self):
+        try:
+            self.transport.gpio_get()
+        except Exception:
+            return False
+        return True
+
+    def call(self, name, args):
+        if self.outage is not None and not self.restoring and not self.reconnect():
+            self.outage.lost += 1
+            return self.refuse(name)
+        try:
+            result = getattr(self.transport, name)(*args)
+        except Exception:
+            if self.restoring or self.link_ok():
+                self.bus_errors += 1
+                raise
+            self.start_outage()
+            self.outage.lost += 1
+            raise DeviceLost(f"Adapter lost during {name}")
+        if name == "stream_ack" and result < 0:
+            if self.restoring or self.link_ok():
+                self.bus_errors += 1
+            else:
+                self.start_outage()
+                self.outage.lost += 1
+        elif name in SETTINGS:
+            self.settings[name] = args
+        return result
+
+    def refuse(self, name):
+        if name == "stream_ack":
+            return -1
+        raise DeviceLost(f"Adapter disconnected, {name} refused")
+
+    def start_outage(self):
+        now = self.clock()
+        self.outage = Outage(now)
+        self.next_attempt = now  # First reopen on the next call
+        self.delay = self.backoff_start
+        try:
+            self.transport.close_device()
+        except Exception:
+            pass
+        self.notify("lost")
+
+    def reconnect(self):
+        now = self.clock()
+        if now < self.next_attempt:
+            return False
+        self.outage.attempts += 1
+        self.restoring = True
+        try:
+            self.transport = self.open_transport()
+            for name, args in self.settings.items():
+                getattr(self.transport, name)(*args)
+            for restore in self.restorers:
+                restore()
+        except Exception:
+            self.next_attempt = now + self.delay
+            self.delay = min(self.delay * 2, self.backoff_max)
+            return False
+        finally:
+            self.restoring = False
+        self.outage.recovered = self.clock()
+        self.outages.append(self.outage)
+        self.notify("back")
+        self.outage = None
+        return True
+
+    def stats(self):
+        count = len(self.outages)
+        return {
+            "outages": count,
+            "connected": self.outage is None,
+            "mttr": sum(o.duration() for o in self.outages) / count if count else 0.0,
+            "lost_per_outage": sum(o.lost for o in self.outages) / count if count else 0.0,
+            "attempts": sum(o.attempts for o in self.outages),
+            "bus_errors": self.bus_errors,
+        }
@@ -0,0 +1,695 @@
+import datetime
+import errno
+import random
+import threading
+import time
+
+# Simulated CH347 DLL so the scripts can be exercised without hardware.
+# SimulatedCH347 exposes the same exported function names as CH347DLLA64.DLL
+# and routes each I2C stream to the devices attached to that adapter index.
+
+USB_LATENCY = 0.001  # Seconds per USB round trip (one DLL call)
+I2C_SPEEDS = {0: 20000, 1: 100000, 2: 400000, 3: 750000}  # CH347I2C_Set mode bits 0-1
+SPI_BASE_CLOCK = 60000000  # mSpiCfgS.iClock n selects 60 MHz >> n
+SPI_DC_PIN = 4  # GPIO wired to the D/C line of the simulated SPI panel
+
+
+def _buffer_bytes(buf, length):
+    # ctypes buffers in the scripts are both c_byte and c_ubyte arrays
+    if not length or buf is None:
+        return b''
+    return bytes(b & 0xFF for b in buf[:length])
+
+
+def _store_ref(ref, value):
+    # Accept both ctypes.byref(x) and ctypes.pointer(x)
+    target = getattr(ref, '_obj', None)
+    if target is None:
+        target = ref.contents
+    target.value = value
+
+
+def bcd(value):
+    return (value // 10 * 16) + (value % 10)
+
+
+def unbcd(value):
+    return (value // 16 * 10) + (value % 16)
+
+
+class SimDevice:
+    def __init__(self, address):
+        self.address = address
+
+    def write(self, data):
+        # Returns the number of data bytes acknowledged
+        return len(data)
+
+    def read(self, length):
+        return bytes(length)
+
+
+class SimRegisterDevice(SimDevice):
+    # Register-pointer device: the first written byte selects the register
+    def __init__(self, address, size):
+        super().__init__(address)
+        self.regs = bytearray(size)
+        self.pointer = 0
+
+    def write(self, data):
+        if not data:
+            return 0
+        self.pointer = data[0] % len(self.regs)
+        for value in data[1:]:
+            self.write_register(self.pointer, value)
+            self.pointer = (self.pointer + 1) % len(self.regs)
+        return len(data)
+
+    def read(self, length):
+        self.refresh()
+        out = bytearray()
+        for _ in range(length):
+            out.append(self.regs[self.pointer])
+            self.pointer = (self.pointer + 1) % len(self.regs)
+        return bytes(out)
+
+    def write_register(self, register, value):
+        self.regs[register] = value
+
+    def refresh(self):
+        pass
+
+
+class SimDS3231(SimRegisterDevice):
+    def __init__(self, address=0x68, start=None, temperature=25.25):
+        super().__init__(address, 0x13)
+        start = start or datetime.datetime.now()
+        self.offset = start.timestamp() - time.time()
+        self.regs[0x0E] = 0x1C  # Control: INTCN set, RS2/RS1 set (power-on default)
+        self.regs[0x0F] = 0x88  # Status: OSF and EN32kHz set
+        self.set_temperature(temperature)
+        self.gpio_pin = 0  # CH347 GPIO wired to INT/SQW
+        self.alarm_checked = int(time.time() + self.offset)
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(time.time() + self.offset)
+
+    def set_temperature(self, celsius):
+        quarters = int(round(celsius * 4)) & 0x3FF
+        self.regs[0x11] = quarters >> 2
+        self.regs[0x12] = (quarters & 0x03) << 6
+
+    def refresh(self):
+        self.update_alarm_flags()
+        now = self.now()
+        self.regs[0:7] = bytes([
+            bcd(now.second),
+            bcd(now.minute),
+            bcd(now.hour),
+            now.isoweekday() % 7 + 1,
+            bcd(now.day),
+            bcd(now.month),
+            bcd(now.year - 2000),
+        ])
+
+    def update_alarm_flags(self):
+        # Latch A1F/A2F for every whole second that passed since the last check
+        current = int(time.time() + self.offset)
+        first = max(self.alarm_checked + 1, current - 120)
+        for second in range(first, current + 1):
+            dt = datetime.datetime.fromtimestamp(second)
+            if self.alarm_matches(self.regs[0x07:0x0B], dt):
+                self.regs[0x0F] |= 0x01
+            if dt.second == 0 and self.alarm_matches(bytes([0x00]) + self.regs[0x0B:0x0E], dt):
+                self.regs[0x0F] |= 0x02
+        self.alarm_checked = current
+
+    @staticmethod
+    def alarm_matches(fields, dt):
+        day = dt.isoweekday() % 7 + 1 if fields[3] & 0x40 else dt.day
+        values = (dt.second, dt.minute, dt.hour, day)
+        masks = (0x7F, 0x7F, 0x3F, 0x3F)
+        return all(field & 0x80 or unbcd(field & mask) == value
+                   for field, mask, value in zip(fields, masks, values))
+
+    def pin_level(self):
+        # INT/SQW output: alarm interrupt (active low) or square wave
+        control = self.regs[0x0E]
+        if control & 0x04:
+            self.update_alarm_flags()
+            status = self.regs[0x0F]
+            return 0 if status & control & 0x03 else 1
+        frequency = (1, 1024, 4096, 8192)[(control >> 3) & 0x03]
+        phase = ((time.time() + self.offset) * frequency) % 1.0
+        return 0 if phase < 0.5 else 1  # Falling edge on the seconds update
+
+    def write_register(self, register, value):
+        if register < 7:
+            self.refresh()
+            self.regs[register] = value
+            try:
+                dt = datetime.datetime(unbcd(self.regs[6]) + 2000, unbcd(self.regs[5] & 0x1F),
+                                       unbcd(self.regs[4]), unbcd(self.regs[2] & 0x3F),
+                                       unbcd(self.regs[1]), unbcd(self.regs[0] & 0x7F))
+                self.offset = dt.timestamp() - time.time()
+            except ValueError:
+                pass  # Intermediate state of a register-by-register update
+        elif register == 0x0F:
+            # OSF, A2F and A1F can only be cleared; BSY is read-only
+            self.regs[0x0F] = (self.regs[0x0F] & value & 0x83) | (value & 0x08)
+        elif register in (0x11, 0x12):
+            pass  # Temperature registers are read-only
+        else:
+            self.regs[register] = value
+
+
+class SimDHT12(SimRegisterDevice):
+    def __init__(self, address=0x5C, humidity=45.6, temperature=23.4):
+        super().__init__(address, 5)
+        self.humidity = humidity
+        self.temperature = temperature
+
+    def refresh(self):
+        hum = int(round(self.humidity * 10))
+        temp = int(round(abs(self.temperature) * 10))
+        self.regs[0] = hum // 10
+        self.regs[1] = hum % 10
+        self.regs[2] = temp // 10
+        self.regs[3] = (temp % 10) | (0x80 if self.temperature < 0 else 0x00)
+        self.regs[4] = sum(self.regs[0:4]) & 0xFF
+
+    def write_register(self, register, value):
+        pass  # Read-only sensor
+
+
+class SimAT24C32(SimDevice):
+    # EEPROM with 2-byte addressing and a 5 ms write cycle during which it NACKs
+    def __init__(self, address=0x57, size=4096, page=32, write_cycle=0.005):
+        super().__init__(address)
+        self.memory = bytearray(b'\xff' * size)
+        self.page = page
+        self.write_cycle = write_cycle
+        self.pointer = 0
+        self.busy_until = 0.0
+
+    def busy(self):
+        return time.monotonic() < self.busy_until
+
+    def write(self, data):
+        if self.busy():
+            return 0
+        if len(data) < 2:
+            return len(data)
+        self.pointer = ((data[0] << 8) | data[1]) % len(self.memory)
+        if len(data) > 2:
+            base = self.pointer - self.pointer % self.page
+            for value in data[2:]:
+                self.memory[self.pointer] = value
+                self.pointer = base + (self.pointer + 1 - base) % self.page  # Wraps within the page
+            self.busy_until = time.monotonic() + self.write_cycle
+        return len(data)
+
+    def read(self, length):
+        if self.busy():
+            return None
+        out = bytearray()
+        for _ in range(length):
+            out.append(self.memory[self.pointer])
+            self.pointer = (self.pointer + 1) % len(self.memory)
+        return bytes(out)
+
+
+class SimSSD1306(SimDevice):
+    # Accepts command (0x00) and data (0x40) control bytes; never answers reads
+    def __init__(self, address=0x3C, width=128, height=64):
+        super().__init__(address)
+        self.width = width
+        self.pages = height // 8
+        self.gddram = bytearray(self.width * self.pages)
+        self.page = 0
+        self.column = 0
+        self.pending = []
+        self.data_bytes = 0
+        self.display_on = False
+
+    def power_cycle(self):
+        # Power lost (adapter unplugged): RAM cleared, display off until the
+        # init sequence is sent again
+        self.gddram[:] = bytes(len(self.gddram))
+        self.page = 0
+        self.column = 0
+        self.pending = []
+        self.display_on = False
+
+    def write(self, data):
+        if not data:
+            return 0
+        control, payload = data[0], data[1:]
+        if control & 0x40:
+            for value in payload:
+                self.gddram[self.page * self.width + self.column] = value
+                self.column += 1
+                if self.column >= self.width:
+                    self.column = 0
+                    self.page = (self.page + 1) % self.pages
+            self.data_bytes += len(payload)
+        else:
+            for value in payload:
+                self.command(value)
+        return len(data)
+
+    def spi_write(self, data, dc):
+        # 4-wire SPI: the D/C line selects data (high) or commands (low)
+        self.write(bytes([0x40 if dc else 0x00]) + bytes(data))
+
+    def command(self, value):
+        if self.pending:
+            self.pending.append(value)
+            if self.pending[0] == 0x21 and len(self.pending) == 3:
+                self.column = self.pending[1] % self.width
+                self.pending = []
+            elif self.pending[0] == 0x22 and len(self.pending) == 3:
+                self.page = self.pending[1] % self.pages
+                self.pending = []
+            elif self.pending[0] not in (0x21, 0x22):
+                self.pending = []
+        elif value in (0x21, 0x22):
+            self.pending = [value]
+        elif value in (0x20, 0x81, 0x8D, 0xA8, 0xD3, 0xD5, 0xD9, 0xDA, 0xDB):
+            self.pending = [value]  # Single-argument commands
+        elif value in (0xAE, 0xAF):
+            self.display_on = value == 0xAF
+        elif 0xB0 <= value <= 0xB7:
+            self.page = (value - 0xB0) % self.pages
+        elif value <= 0x0F:
+            self.column = (self.column & 0xF0) | value
+        elif value <= 0x1F:
+            self.column = ((value & 0x0F) << 4) | (self.column & 0x0F)
+
+    def read(self, length):
+        return None
+
+
+class SimHT16K33(SimDevice):
+    # Command byte first: 0x00-0x0F sets the display RAM address and any
+    # data bytes follow it (auto-increment, wrapping at 0x0F), 0x2N system
+    # setup (bit 0 oscillator), 0x8N display setup (bit 0 on, bits 1-2 blink),
+    # 0xEN dimming. Reads return display RAM from the current address.
+    def __init__(self, address=0x70):
+        super().__init__(address)
+        self.ram = bytearray(16)
+        self.pointer = 0
+        self.oscillator = False
+        self.display_on = False
+        self.blink = 0
+        self.dimming = 15
+        self.data_bytes = 0
+        self.ram_writes = 0
+
+    def power_cycle(self):
+        self.ram[:] = bytes(len(self.ram))
+        self.pointer = 0
+        self.oscillator = False
+        self.display_on = False
+        self.blink = 0
+        self.dimming = 15
+
+    def write(self, data):
+        if not data:
+            return 0
+        command = data[0]
+        if command & 0xF0 == 0x00:
+            self.pointer = command & 0x0F
+            for value in data[1:]:
+                self.ram[self.pointer] = value
+                self.pointer = (self.pointer + 1) & 0x0F
+            if len(data) > 1:
+                self.data_bytes += len(data) - 1
+                self.ram_writes += 1
+        elif command & 0xF0 == 0x20:
+            self.oscillator = bool(command & 0x01)
+        elif command & 0xF0 == 0x80:
+            self.display_on = bool(command & 0x01)
+            self.blink = (command >> 1) & 0x03
+        elif command & 0xF0 == 0xE0:
+            self.dimming = command & 0x0F
+        return len(data)
+
+    def read(self, length):
+        out = bytearray()
+        for _ in range(length):
+            out.append(self.ram[self.pointer])
+            self.pointer = (self.pointer + 1) & 0x0F
+        return bytes(out)
+
+
+class SimulatedCH347:
+    EXPORTS = [
+        'CH347OpenDevice', 'CH347CloseDevice', 'CH347I2C_Set', 'CH347I2C_SetDelaymS',
+        'CH347StreamI2C', 'CH347StreamI2C_RetACK', 'CH347GPIO_Get', 'CH347GPIO_Set',
+        'CH347WriteRead', 'CH347SPI_Init', 'CH347SPI_Write',
+    ]
+
+    def __init__(self, adapters=None, usb_latency=USB_LATENCY, spi_devices=None):
+        if adapters is None:
+            adapters = [default_devices()]
+        if spi_devices is None:
+            spi_devices = [SimSSD1306() for _ in adapters]
+        # One SPI panel per adapter, D/C on SPI_DC_PIN; None for no SPI device
+        self.spi = list(spi_devices)
+        self.spi_clocks = [0 for _ in adapters]  # 0 until CH347SPI_Init
+        self.buses = [{dev.address: dev for dev in devices} for devices in adapters]
+        self.locks = [threading.Lock() for _ in self.buses]
+        self.speeds = [I2C_SPEEDS[1] for _ in self.buses]
+        self.gpio = [{'enable': 0, 'dir': 0, 'out': 0, 'inputs': {}} for _ in self.buses]
+        for index, devices in enumerate(adapters):
+            for dev in devices:
+                if hasattr(dev, 'pin_level'):
+                    self.connect_gpio(dev.gpio_pin, dev.pin_level, index)
+        self.stream_state = [{'out': bytearray(), 'device': None} for _ in self.buses]
+        self.usb_latency = usb_latency
+        self.calls = 0
+        self.bytes = 0
+        self.unplugged = set()  # Adapter indices whose every call fails (unplug/replug)
+        self.fault_rates = [{} for _ in self.buses]  # Bus speed -> failure probability (inject_faults)
+        self.fault_random = random.Random()
+        self.stuck_rate = 0.0
+        self.stuck = {}  # Adapter index -> clocks still needed to release SDA
+        self.scl_pins = [None for _ in self.buses]
+        self.faults = 0
+        # ctypes-style callables so scripts can still assign argtypes/restype
+        for name in self.EXPORTS:
+            setattr(self, name, _Export(self.plugged(name, getattr(self, '_' + name))))
+
+    def plugged(self, name, func):
+        failure = -1 if name == 'CH347OpenDevice' else 0
+        def call(index, *args):
+            if index in self.unplugged:
+                return failure
+            return func(index, *args)
+        return call
+
+    def unplug(self, index=0):
+        # Cable pulled: every call on the adapter fails until replug()
+        self.unplugged.add(index)
+
+    def replug(self, index=0):
+        # Devices come back from a power loss
+        self.unplugged.discard(index)
+        for dev in list(self.buses[index].values()) + [self.spi[index]]:
+            if hasattr(dev, 'power_cycle'):
+                dev.power_cycle()
+
+    def inject_faults(self, rates, index=0, seed=None, stuck_rate=0.1, scl_pin=None):
+        # rates: failure probability per transfer, either one float or a dict
+        # of bus speed in Hz -> probability (a marginal cable fails more at
+        # higher clocks). Half the faults NACK before anything is written, the
+        # other half lose the last ACK after the write landed. stuck_rate of
+        # the faults also leave a slave holding SDA low: every transfer then
+        # fails until nine clocks are sent, either as a 0xFF address byte or
+        # by toggling scl_pin (a GPIO wired to SCL) low nine times.
+        if not isinstance(rates, dict):
+            rates = {speed: rates for speed in I2C_SPEEDS.values()}
+        self.fault_rates[index] = rates
+        self.stuck_rate = stuck_rate
+        self.scl_pins[index] = scl_pin
+        if seed is not None:
+            self.fault_random.seed(seed)
+
+    def fault(self, index):
+        # None, 'nack' or 'ack_lost' for the transfer about to run
+        rate = self.fault_rates[index].get(self.speeds[index], 0.0)
+        if not rate or self.fault_random.random() >= rate:
+            return None
+        self.faults += 1
+        if self.fault_random.random() < self.stuck_rate:
+            self.stuck[index] = 9
+        return 'nack' if self.fault_random.random() < 0.5 else 'ack_lost'
+
+    def _CH347OpenDevice(self, index):
+        return index if 0 <= index < len(self.buses) else -1
+
+    def _CH347CloseDevice(self, index):
+        return 1
+
+    def _CH347I2C_Set(self, index, mode):
+        if not 0 <= index < len(self.buses):
+            return 0
+        self.speeds[index] = I2C_SPEEDS[mode & 0x03]
+        return 1
+
+    def _CH347I2C_SetDelaymS(self, index, delay):
+        time.sleep(delay / 1000.0)
+        return 1
+
+    def _CH347StreamI2C(self, index, write_length, write_buffer, read_length, read_buffer):
+        ok, _, data = self.stream(index, _buffer_bytes(write_buffer, write_length), read_length)
+        if ok and read_length:
+            for i, value in enumerate(data):
+                read_buffer[i] = value
+        return 1 if ok else 0
+
+    def _CH347StreamI2C_RetACK(self, index, write_length, write_buffer, read_length, read_buffer, ack_ref):
+        ok, acks, data = self.stream(index, _buffer_bytes(write_buffer, write_length), read_length)
+        _store_ref(ack_ref, acks)
+        if ok and read_length:
+            for i, value in enumerate(data):
+                read_buffer[i] = value
+        return 1
+
+    def _CH347WriteRead(self, index, write_length, write_buffer, read_step, read_times, read_length_ref, read_buffer):
+        # I2C stream packet: 0xAA, sub-commands, 0x00 (see ch347.encode_op)
+        if not 0 <= index < len(self.buses):
+            return 0
+        packet = _buffer_bytes(write_buffer, write_length)
+        with self.locks[index]:
+            self.calls += 1
+            fault = 'nack' if index in self.stuck else self.fault(index)
+            if fault == 'nack':
+                self.wait(index, 1)
+                _store_ref(read_length_ref, 0)
+                return 0
+            ok, data, bus_bytes = self.run_stream(index, packet)
+            self.bytes += bus_bytes
+            self.wait(index, bus_bytes)
+            if fault == 'ack_lost':
+                ok = False
+        data = data[:read_step * read_times]
+        _store_ref(read_length_ref, len(data))
+        for i, value in enumerate(data):
+            read_buffer[i] = value
+        return 1 if ok else 0
+
+    def run_stream(self, index, packet):
+        # Execute stream sub-commands; returns (all ACKed, bytes read, bus bytes)
+        if not packet or packet[0] != 0xAA:
+            return False, b'', 0
+        # A transaction may continue in the next packet until its stop
+        bus = self.buses[index]
+        state = self.stream_state[index]
+        out, device = state['out'], state['device']
+        ok = True
+        data = bytearray()
+        bus_bytes = 0
+        i = 1
+        while i < len(packet):
+            cmd = packet[i]
+            i += 1
+            if cmd == 0x00:
+                break
+            if cmd in (0x74, 0x75):  # Start or stop ends the pending write
+                if out and device is not None and not out[0] & 1:
+                    if device.write(bytes(out[1:])) < len(out) - 1:
+                        ok = False
+                out = bytearray()
+                device = None
+            elif cmd & 0xC0 == 0x80:  # OUT
+                n = cmd & 0x3F
+                chunk = packet[i:i + n]
+                i += n
+                bus_bytes += n
+                if not out and chunk:
+                    device = bus.get(chunk[0] >> 1)
+                    if device is None:
+                        ok = False
+                out += chunk
+            elif cmd & 0xC0 == 0xC0:  # IN
+                n = max(cmd & 0x3F, 1)
+                bus_bytes += n
+                values = device.read(n) if device is not None and out and out[0] & 1 else None
+                if values is None:
+                    ok = False
+                    values = b'\xff' * n
+                data += values
+            elif cmd & 0xF0 == 0x50:  # MS delay
+                time.sleep((cmd & 0x0F) / 1000.0)
+            elif cmd & 0xF0 == 0x40:  # US delay
+                time.sleep((cmd & 0x0F) / 1e6)
+        state['out'], state['device'] = out, device
+        return ok, bytes(data), bus_bytes
+
+    def _CH347SPI_Init(self, index, config_ref):
+        if not 0 <= index < len(self.buses):
+            return 0
+        config = getattr(config_ref, '_obj', None) or config_ref.contents
+        self.spi_clocks[index] = SPI_BASE_CLOCK >> (config.iClock & 0x07)
+        return 1
+
+    def _CH347SPI_Write(self, index, chip_select, length, write_step, write_buffer):
+        # write_step only changes how the DLL splits the USB packets
+        if not 0 <= index < len(self.buses) or not self.spi_clocks[index]:
+            return 0
+        data = _buffer_bytes(write_buffer, length)
+        with self.locks[index]:
+            self.calls += 1
+            self.bytes += length
+            cost = self.usb_latency + length * 8.0 / self.spi_clocks[index]
+            time.sleep(cost)
+            device = self.spi[index]
+            if device is not None:
+                device.spi_write(data, self.gpio[index]['out'] >> SPI_DC_PIN & 1)
+        return 1
+
+    def _CH347GPIO_Get(self, index, dir_ref, data_ref):
+        if not 0 <= index < len(self.buses):
+            return 0
+        with self.locks[index]:
+            self.calls += 1
+            self.wait(index, 0)
+            gpio = self.gpio[index]
+            data = gpio['out'] & gpio['dir']
+            for pin, level in gpio['inputs'].items():
+                if not gpio['dir'] & (1 << pin) and level():
+                    data |= 1 << pin
+            _store_ref(dir_ref, gpio['dir'])
+            _store_ref(data_ref, data)
+        return 1
+
+    def _CH347GPIO_Set(self, index, enable, dir_out, data_out):
+        if not 0 <= index < len(self.buses):
+            return 0
+        with self.locks[index]:
+            self.calls += 1
+            self.wait(index, 0)
+            gpio = self.gpio[index]
+            gpio['enable'] |= enable
+            gpio['dir'] = (gpio['dir'] & ~enable) | (dir_out & enable)
+            gpio['out'] = (gpio['out'] & ~enable) | (data_out & enable)
+            pin = self.scl_pins[index]
+            if index in self.stuck and pin is not None and gpio['dir'] >> pin & 1 and not gpio['out'] >> pin & 1:
+                self.clock_stuck(index)
+        return 1
+
+    def clock_stuck(self, index):
+        # One SCL clock while a slave holds SDA; nine release it
+        self.stuck[index] -= 1
+        if self.stuck[index] <= 0:
+            del self.stuck[index]
+
+    def connect_gpio(self, pin, level, index=0):
+        # level() returns the logic level driven onto the pin
+        self.gpio[index]['inputs'][pin] = level
+
+    def stream(self, index, wdata, read_length):
+        # One start/stop framed transfer: write wdata, optional repeated-start read
+        if not 0 <= index < len(self.buses):
+            return False, 0, b''
+        with self.locks[index]:
+            self.calls += 1
+            self.bytes += len(wdata) + read_length
+            self.wait(index, len(wdata) + read_length)
+            if not wdata:
+                return True, 0, b''
+            if index in self.stuck:
+                if wdata[0] == 0xFF:  # Nine clocks with SDA released
+                    del self.stuck[index]
+                return False, 0, b''
+            fault = self.fault(index)
+            if fault == 'nack':
+                return False, 0, b''
+            device = self.buses[index].get(wdata[0] >> 1)
+            if device is None:
+                return False, 0, b''
+            acks = 1 + device.write(wdata[1:]) if wdata[0] & 1 == 0 else 1
+            if fault == 'ack_lost':
+                return False, acks - 1, b''
+            if acks < len(wdata):
+                return False, acks, b''
+            data = b''
+            if read_length:
+                data = device.read(read_length)
+                if data is None:
+                    return False, acks, b''
+            return True, acks, data
+
+    def wait(self, index, nbytes):
+        # USB round trip plus 9 clocks per byte on the bus
+        cost = self.usb_latency + nbytes * 9.0 / self.speeds[index]
+        if cost > 0:
+            time.sleep(cost)
+
+    def device(self, address, index=0):
+        return self.buses[index].get(address)
+
+
+class _Export:
+    def __init__(self, func):
+        self.func = func
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+
+def default_devices():
+    return [SimDS3231(), SimDHT12(), SimSSD1306(), SimAT24C32(), SimHT16K33()]
+
+
+class SimulatedI2CDev:
+    # Mock of the Linux i2c-dev layer (os.open/os.close/fcntl.ioctl) for
+    # i2c_dev.LinuxI2C: I2C_RDWR message lists are run against the devices
+    def __init__(self, devices=None, speed=I2C_SPEEDS[2], syscall_latency=0.00005):
+        self.bus = {dev.address: dev for dev in (default_devices() if devices is None else devices)}
+        self.speed = speed
+        self.syscall_latency = syscall_latency
+        self.syscalls = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def open(self, path, flags):
+        return 3
+
+    def close(self, fd):
+        pass
+
+    def ioctl(self, fd, request, arg):
+        from i2c_dev import I2C_M_RD, I2C_RDWR
+        if request != I2C_RDWR:
+            raise OSError(errno.EINVAL, "Unsupported ioctl")
+        self.syscalls += 1
+        nbytes = 0
+        error = None
+        for i in range(arg.nmsgs):
+            msg = arg.msgs[i]
+            self.messages += 1
+            nbytes += msg.len + 1
+            device = self.bus.get(msg.addr)
+            if device is None:
+                error = OSError(errno.ENXIO, "No such device or address")
+                break
+            if msg.flags & I2C_M_RD:
+                values = device.read(msg.len)
+                if values is None:
+                    error = OSError(errno.EREMOTEIO, "Remote I/O error")
+                    break
+                for j, value in enumerate(values):
+                    msg.buf[j] = value
+            elif msg.len and device.write(bytes(msg.buf[:msg.len])) < msg.len:
+                error = OSError(errno.EREMOTEIO, "Remote I/O error")
+                break
+        self.bytes += nbytes
+        time.sleep(self.syscall_latency + nbytes * 9.0 / self.speed)
+        if error is not None:
+            raise error
+        return arg.nmsgs
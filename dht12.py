@@ -0,0 +1,156 @@
+import collections
+import time
+from array import array
+from ctypes import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# DHT12 sampling engine: preallocated transfer buffers, sign-aware decoding,
+# bounded retry with backoff, error counters and median + EMA filtering.
+
+DHT12_ADDRESS = 0x5C
+DHT12_MIN_INTERVAL = 2.0  # The sensor refreshes its registers about every 2 s
+
+RETRIES = 3
+BACKOFF_START = 0.05  # Seconds before the first retry, doubled per attempt
+BACKOFF_MAX = 0.5
+MEDIAN_WINDOW = 5
+EMA_ALPHA = 0.3
+
+Sample = collections.namedtuple(
+    "Sample", "timestamp humidity temperature raw_humidity raw_temperature")
+
+def decode_dht12(data):
+    # Bytes: humidity int, humidity tenths, temperature int,
+    # temperature tenths (bit 7 = below zero), checksum
+    if (data[0] + data[1] + data[2] + data[3]) & 0xFF != data[4]:
+        return None
+    humidity = data[0] + data[1] * 0.1
+    temperature = data[2] + (data[3] & 0x7F) * 0.1
+    if data[3] & 0x80:
+        temperature = -temperature
+    return round(humidity, 1), round(temperature, 1)
+
+def decode_dht12_block(frames):
+    # Decode back-to-back 5-byte readings (e.g. from WaveshareI2C.burst_read)
+    # in one pass; returns (humidity, temperature, valid) columns, as numpy
+    # arrays when numpy is installed and array/list columns otherwise
+    if numpy is not None:
+        a = numpy.frombuffer(frames, dtype=numpy.uint8).reshape(-1, 5).astype(numpy.int16)
+        valid = (a[:, :4].sum(axis=1) & 0xFF) == a[:, 4]
+        humidity = numpy.round(a[:, 0] + a[:, 1] * 0.1, 1)
+        temperature = numpy.round(a[:, 2] + (a[:, 3] & 0x7F) * 0.1, 1)
+        temperature = numpy.where(a[:, 3] & 0x80, -temperature, temperature)
+        return humidity, temperature, valid
+    raw = bytes(memoryview(frames).cast("B"))
+    h, hd, t, td, c = (raw[i::5] for i in range(5))
+    valid = [(a + b + d + e) & 0xFF == s for a, b, d, e, s in zip(h, hd, t, td, c)]
+    humidity = array("f", [round(a + b * 0.1, 1) for a, b in zip(h, hd)])
+    temperature = array("f", [round(-(a + (b & 0x7F) * 0.1) if b & 0x80 else a + b * 0.1, 1)
+                              for a, b in zip(t, td)])
+    return humidity, temperature, valid
+
+class SampleFilter:
+    # Median over the last few readings (rejects spikes), then EMA (smooths noise)
+    def __init__(self, window=MEDIAN_WINDOW, alpha=EMA_ALPHA):
+        self.history = collections.deque(maxlen=window)
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, value):
+        self.history.append(value)
+        median = sorted(self.history)[len(self.history) // 2]
+        if self.value is None:
+            self.value = median
+        else:
+            self.value += self.alpha * (median - self.value)
+        return self.value
+
+class DHT12:
+    def __init__(self, i2c, address=DHT12_ADDRESS, retries=RETRIES,
+                 backoff_start=BACKOFF_START, backoff_max=BACKOFF_MAX, sleep=time.sleep):
+        self.i2c = i2c
+        self.address = address
+        self.retries = retries
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+
+        # Buffers reused by every read
+        self.write_buffer = (c_ubyte * 2)(address << 1, 0x00)
+        self.read_buffer = (c_ubyte * 5)()
+
+        self.humidity_filter = SampleFilter()
+        self.temperature_filter = SampleFilter()
+
+        self.reads = 0
+        self.checksum_errors = 0
+        self.nack_errors = 0
+        self.retry_count = 0
+        self.failures = 0
+
+    def read_raw(self):
+        # One bus transaction; returns (humidity, temperature) or None
+        self.reads += 1
+        acks = self.i2c.stream_ack(self.write_buffer, 2, self.read_buffer, 5)
+        if acks < 2:
+            self.nack_errors += 1
+            return None
+        reading = decode_dht12(self.read_buffer)
+        if reading is None:
+            self.checksum_errors += 1
+        return reading
+
+    def read(self):
+        # Retry failed reads with bounded exponential backoff
+        delay = self.backoff_start
+        for attempt in range(self.retries + 1):
+            reading = self.read_raw()
+            if reading is not None:
+                return reading
+            if attempt < self.retries:
+                self.retry_count += 1
+                self.sleep(delay)
+                delay = min(delay * 2, self.backoff_max)
+        self.failures += 1
+        return None
+
+    def sample(self):
+        reading = self.read()
+        if reading is None:
+            return None
+        humidity, temperature = reading
+        return Sample(time.time(),
+                      round(self.humidity_filter.update(humidity), 2),
+                      round(self.temperature_filter.update(temperature), 2),
+                      humidity, temperature)
+
+    def stream(self, interval=DHT12_MIN_INTERVAL, count=None):
+        # Timestamped samples on a fixed schedule (no cumulative drift);
+        # slots whose read fails after all retries are skipped
+        interval = max(interval, DHT12_MIN_INTERVAL)
+        deadline = time.monotonic()
+        produced = 0
+        while count is None or produced < count:
+            sample = self.sample()
+            if sample is not None:
+                produced += 1
+                yield sample
+            deadline += interval
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                self.sleep(remaining)
+            else:
+                deadline = time.monotonic()  # Fell behind; restart the schedule
+
+    def stats(self):
+        return {
+            "reads": self.reads,
+            "checksum_errors": self.checksum_errors,
+            "nack_errors": self.nack_errors,
+            "retries": self.retry_count,
+            "failures": self.failures,
+        }
@@ -0,0 +1,374 @@
+import argparse
+import json
+import os
+import selectors
+import socket
+import struct
+import time
+from multiprocessing import shared_memory
+
+from ssd1306 import SSD1306, I2CPanel, SPIPanel
+
+# Display daemon: one process owns the CH347 and the SSD1306, initializes the
+# panel once, and shows frames from any number of local clients. Each client
+# gets a shared-memory segment holding a sequence counter and a framebuffer
+# in the panel's page layout:
+#
+#   offset 0  uint32 sequence (odd while the client is writing)
+#   offset 8  width * pages bytes of framebuffer
+#
+# Clients write frames in place and bump the counter; the server copies a
+# frame only when the counter has moved to a new even value and did not move
+# during the copy (a seqlock), so frames never cross the socket. The control
+# channel is a Unix socket (TCP on localhost where AF_UNIX is missing) taking
+# one text command per line, answered with one JSON line:
+#
+#   attach NAME      -> {"id", "shm", "size", "width", "height"}
+#   select [ID]      show only client ID (default: the caller)
+#   mode select|or   show the selected client, or OR all clients together
+#   stats            server and per-client counters
+#
+# A client is detached and its segment unlinked when its connection closes.
+# Each tick the composed frame goes out with update_dirty(), so only pages
+# that changed are sent.
+
+SOCKET_PATH = "/tmp/ch347-oled.sock"
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 8348
+FRAME_OFFSET = 8
+FRAME_INTERVAL = 1 / 60  # Seconds between frame polls
+SEQ = struct.Struct("<I")
+MODES = ("select", "or")
+
+def control_address(path=SOCKET_PATH):
+    if hasattr(socket, "AF_UNIX"):
+        return socket.AF_UNIX, path
+    return socket.AF_INET, (CONTROL_HOST, CONTROL_PORT)
+
+def attach_shared(name):
+    # Attach without the resource tracker, which would unlink the server's
+    # segment when this process exits (track= is Python 3.13+)
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+def control(command, path=SOCKET_PATH):
+    # One command without attaching a framebuffer
+    family, address = control_address(path)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        sock.sendall((command + "\n").encode())
+        return json.loads(sock.makefile("rb").readline())
+
+class ClientSlot:
+    def __init__(self, client_id, name, size):
+        self.id = client_id
+        self.name = name
+        self.shm = shared_memory.SharedMemory(create=True, size=FRAME_OFFSET + size)
+        self.shm.buf[:FRAME_OFFSET + size] = bytes(FRAME_OFFSET + size)
+        self.frame = bytearray(size)
+        self.seq = 0
+        self.frames = 0  # Frames picked up (a client may publish faster than the server polls)
+        self.torn = 0    # Copies discarded because the client wrote during them
+
+    def read_frame(self):
+        buf = self.shm.buf
+        seq = SEQ.unpack_from(buf, 0)[0]
+        if seq == self.seq or seq & 1:
+            return False
+        self.frame[:] = buf[FRAME_OFFSET:FRAME_OFFSET + len(self.frame)]
+        if SEQ.unpack_from(buf, 0)[0] != seq:
+            self.torn += 1
+            return False
+        self.seq = seq
+        self.frames += 1
+        return True
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+class DisplayServer:
+    def __init__(self, display, path=SOCKET_PATH, mode="select"):
+        self.display = display
+        self.size = len(display.buffer)
+        self.mode = mode
+        self.family, self.address = control_address(path)
+        if self.family == socket.AF_UNIX and os.path.exists(path):
+            os.unlink(path)  # Stale socket from a previous run
+        self.listener = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(self.address)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.pending = {}  # conn -> unterminated command bytes
+        self.slots = {}    # conn -> ClientSlot
+        self.next_id = 1
+        self.active = None
+        self.dirty = True
+        self.flushes = 0
+        self.pages_sent = 0
+        print(f"Display server on {self.address}")
+
+    def slot_by_id(self, client_id):
+        for slot in self.slots.values():
+            if slot.id == client_id:
+                return slot
+        return None
+
+    def accept(self):
+        conn, _ = self.listener.accept()
+        conn.setblocking(False)
+        self.pending[conn] = b""
+        self.selector.register(conn, selectors.EVENT_READ)
+
+    def disconnect(self, conn):
+        self.selector.unregister(conn)
+        conn.close()
+        del self.pending[conn]
+        slot = self.slots.pop(conn, None)
+        if slot is not None:
+            slot.close()
+            if self.active == slot.id:
+                # Fall back to the most recently attached client
+                self.active = max((s.id for s in self.slots.values()), default=None)
+            self.dirty = True
+            print(f"Client {slot.id} ({slot.name}) detached")
+
+    def receive(self, conn):
+        try:
+            data = conn.recv(4096)
+        except ConnectionError:
+            data = b""
+        if not data:
+            self.disconnect(conn)
+            return
+        self.pending[conn] += data
+        while b"\n" in self.pending[conn]:
+            line, self.pending[conn] = self.pending[conn].split(b"\n", 1)
+            reply = self.command(conn, line.decode().split())
+            conn.sendall((json.dumps(reply) + "\n").encode())
+
+    def command(self, conn, words):
+        if not words:
+            return {"error": "empty command"}
+        name, args = words[0], words[1:]
+        slot = self.slots.get(conn)
+        if name == "attach":
+            if slot is not None:
+                return {"error": "already attached"}
+            slot = self.slots[conn] = ClientSlot(self.next_id, args[0] if args else "client", self.size)
+            self.next_id += 1
+            self.active = slot.id  # The newest client is shown
+            self.dirty = True
+            print(f"Client {slot.id} ({slot.name}) attached")
+            return {"id": slot.id, "shm": slot.shm.name, "size": self.size,
+                    "width": self.display.width, "height": self.display.height}
+        if name == "select":
+            target = self.slot_by_id(int(args[0])) if args else slot
+            if target is None:
+                return {"error": "no such client"}
+            self.active = target.id
+            self.dirty = True
+            return {"active": self.active}
+        if name == "mode":
+            if not args or args[0] not in MODES:
+                return {"error": f"mode must be one of {', '.join(MODES)}"}
+            self.mode = args[0]
+            self.dirty = True
+            return {"mode": self.mode}
+        if name == "stats":
+            return self.stats()
+        return {"error": f"unknown command {name!r}"}
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "active": self.active,
+            "flushes": self.flushes,
+            "pages_sent": self.pages_sent,
+            "clients": [{"id": s.id, "name": s.name, "frames": s.frames, "torn": s.torn}
+                        for s in self.slots.values()],
+        }
+
+    def compose(self):
+        buffer = self.display.buffer
+        if self.mode == "or":
+            combined = 0
+            for slot in self.slots.values():
+                combined |= int.from_bytes(slot.frame, "little")
+            buffer[:] = combined.to_bytes(self.size, "little")
+            return
+        slot = self.slot_by_id(self.active)
+        if slot is None:
+            buffer[:] = bytes(self.size)
+        else:
+            buffer[:] = slot.frame
+
+    def tick(self):
+        for slot in self.slots.values():
+            if slot.read_frame() and (self.mode == "or" or slot.id == self.active):
+                self.dirty = True
+        if not self.dirty:
+            return
+        self.dirty = False
+        self.compose()
+        dirty = self.display.update_dirty()
+        if dirty:
+            self.flushes += 1
+            self.pages_sent += len(dirty)
+
+    def serve_forever(self, interval=FRAME_INTERVAL):
+        next_tick = time.monotonic()
+        while True:
+            timeout = max(0.0, next_tick - time.monotonic())
+            for key, _ in self.selector.select(timeout):
+                if key.fileobj is self.listener:
+                    self.accept()
+                else:
+                    self.receive(key.fileobj)
+            if time.monotonic() >= next_tick:
+                next_tick += interval
+                self.tick()
+
+    def close(self):
+        for conn in list(self.pending):
+            self.disconnect(conn)
+        self.selector.close()
+        self.listener.close()
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)
+
+class DisplayClient:
+    def __init__(self, name="client", path=SOCKET_PATH):
+        family, address = control_address(path)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(address)
+        self.reader = self.sock.makefile("rb")
+        reply = self.request(f"attach {name}")
+        self.id = reply["id"]
+        self.width = reply["width"]
+        self.height = reply["height"]
+        self.shm = attach_shared(reply["shm"])
+        self.buffer = self.shm.buf[FRAME_OFFSET:FRAME_OFFSET + reply["size"]]
+        self.seq = 0
+
+    def request(self, command):
+        self.sock.sendall((command + "\n").encode())
+        reply = json.loads(self.reader.readline())
+        if "error" in reply:
+            raise Exception(f"Display server: {reply['error']}")
+        return reply
+
+    def begin(self):
+        self.seq += 1  # Odd: the server skips the frame until publish()
+        SEQ.pack_into(self.shm.buf, 0, self.seq)
+
+    def publish(self):
+        self.seq += 1
+        SEQ.pack_into(self.shm.buf, 0, self.seq)
+
+    def write(self, offset, data):
+        self.begin()
+        self.buffer[offset:offset + len(data)] = data
+        self.publish()
+
+    def select(self, client_id=None):
+        return self.request("select" if client_id is None else f"select {client_id}")
+
+    def mode(self, mode):
+        return self.request(f"mode {mode}")
+
+    def stats(self):
+        return self.request("stats")
+
+    def close(self):
+        self.buffer.release()
+        self.shm.close()
+        self.reader.close()
+        self.sock.close()
+
+class ClientPanel:
+    # SSD1306 panel backed by a display server, so SSD1306 code runs
+    # unchanged: init commands are dropped (the server owns the panel) and
+    # data lands in the shared framebuffer at the page window last set.
+    # SSD1306 always addresses whole-width windows; each window write is
+    # published on its own.
+    def __init__(self, client):
+        self.client = client
+        self.page = 0
+
+    def command(self, commands):
+        if len(commands) == 6 and commands[0] == 0x21 and commands[3] == 0x22:
+            self.page = commands[4]
+
+    def data(self, data):
+        self.client.write(self.page * self.client.width, data)
+
+    def close_device(self):
+        self.client.close()
+
+def serve(args):
+    if args.spi:
+        panel = SPIPanel(args.index)
+    else:
+        from ch347 import WaveshareI2C
+        panel = I2CPanel(WaveshareI2C(args.index))
+    display = SSD1306(panel)
+    server = DisplayServer(display, args.socket, args.mode)
+    try:
+        server.serve_forever(1.0 / args.fps)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats()))
+        server.close()
+        display.close_device()
+
+def show(args):
+    # Example client: text on one page until interrupted or --hold expires
+    start = time.perf_counter()
+    oled = SSD1306(ClientPanel(DisplayClient("show", args.socket)))
+    print(f"Attached in {(time.perf_counter() - start) * 1000:.1f} ms")
+    try:
+        oled.draw_text(args.text, 0, args.page)
+        oled.update_dirty()
+        time.sleep(args.hold)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        oled.close_device()
+
+def main():
+    parser = argparse.ArgumentParser(description="SSD1306 display server and example client")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="control socket path")
+    sub = parser.add_subparsers(dest="action", required=True)
+    serve_parser = sub.add_parser("serve", help="own the adapter and panel, show client frames")
+    serve_parser.add_argument("--index", type=int, default=0, help="CH347 adapter index")
+    serve_parser.add_argument("--spi", action="store_true", help="panel on SPI instead of I2C")
+    serve_parser.add_argument("--mode", choices=MODES, default="select")
+    serve_parser.add_argument("--fps", type=float, default=60.0, help="frame polls per second")
+    show_parser = sub.add_parser("show", help="draw text through a running server")
+    show_parser.add_argument("text")
+    show_parser.add_argument("--page", type=int, default=0)
+    show_parser.add_argument("--hold", type=float, default=5.0, help="seconds to keep the frame")
+    sub.add_parser("stats", help="print server counters")
+    args = parser.parse_args()
+
+    if args.action == "serve":
+        serve(args)
+    elif args.action == "show":
+        show(args)
+    else:
+        print(json.dumps(control("stats", args.socket), indent=1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import collections
+import itertools
+import json
+import time
+
+# Sensor-to-display latency tracing. A Trace follows one value from its bus
+# read through formatting and glyph rendering to the flush of the page it
+# landed on; spans are (name, start, end) in perf_counter_ns. A trace whose
+# value did not change any pixels ends as "unchanged" and is left out of the
+# latency percentiles.
+
+TRACE_CAPACITY = 10000
+
+class Trace:
+    def __init__(self, tracer, trace_id, name):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.name = name
+        self.wall_start = time.time()
+        self.start = tracer.clock()
+        self.end = None
+        self.status = None
+        self.spans = []
+        self.open = None
+
+    def span(self, name):
+        self.open = [name, self.tracer.clock(), None]
+        self.spans.append(self.open)
+        return self
+
+    def add_span(self, name, start, end):
+        # Span measured elsewhere (e.g. one flush shared by several traces)
+        self.spans.append([name, start, end])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.open[2] = self.tracer.clock()
+        self.open = None
+        return False
+
+    def finish(self, status="flushed"):
+        if self.end is None:
+            self.end = self.tracer.clock()
+            self.status = status
+            self.tracer.completed.append(self)
+
+    def latency(self):
+        return (self.end - self.start) / 1e6
+
+class Tracer:
+    def __init__(self, clock=time.perf_counter_ns, capacity=TRACE_CAPACITY):
+        self.clock = clock
+        self.ids = itertools.count(1)
+        self.completed = collections.deque(maxlen=capacity)
+
+    def start(self, name):
+        return Trace(self, next(self.ids), name)
+
+    def percentiles(self, name=None, points=(50, 99)):
+        # {"p50": ms, "p99": ms, "count": n} over flushed traces
+        values = sorted(t.latency() for t in self.completed
+                        if t.status == "flushed" and (name is None or t.name == name))
+        result = {"count": len(values)}
+        for p in points:
+            result[f"p{p}"] = values[min(len(values) - 1, len(values) * p // 100)] if values else 0.0
+        return result
+
+    def export_json(self, path):
+        traces = []
+        for t in self.completed:
+            traces.append({
+                "trace_id": t.trace_id,
+                "name": t.name,
+                "start": t.wall_start,
+                "status": t.status,
+                "latency_ms": round(t.latency(), 3),
+                "spans": [{"name": name, "offset_ms": round((start - t.start) / 1e6, 3),
+                           "duration_ms": round(((end or start) - start) / 1e6, 3)}
+                          for name, start, end in t.spans],
+            })
+        with open(path, "w") as f:
+            json.dump(traces, f, indent=1)
+        return len(traces)
@@ -0,0 +1,227 @@
+import datetime
+import time
+
+# DS3231 driver built on a cached copy of the whole register file (0x00-0x12).
+# Reads refresh the cache with one burst transaction; writes only mark
+# registers dirty and flush() writes each contiguous dirty run in one burst.
+
+RTC_ADDRESS = 0x68
+
+REG_SECONDS = 0x00
+REG_ALARM1 = 0x07  # 0x07-0x0A: seconds, minutes, hours, day/date
+REG_ALARM2 = 0x0B  # 0x0B-0x0D: minutes, hours, day/date
+REG_CONTROL = 0x0E
+REG_STATUS = 0x0F
+REG_AGING = 0x10
+REG_TEMP_MSB = 0x11
+REG_TEMP_LSB = 0x12
+NUM_REGISTERS = 0x13
+
+# Control register bits
+CONTROL_EOSC = 0x80
+CONTROL_BBSQW = 0x40
+CONTROL_CONV = 0x20
+CONTROL_RS2 = 0x10
+CONTROL_RS1 = 0x08
+CONTROL_INTCN = 0x04
+CONTROL_A2IE = 0x02
+CONTROL_A1IE = 0x01
+
+# Status register bits
+STATUS_OSF = 0x80
+STATUS_EN32KHZ = 0x08
+STATUS_BSY = 0x04
+STATUS_A2F = 0x02
+STATUS_A1F = 0x01
+STATUS_FLAGS = STATUS_OSF | STATUS_A2F | STATUS_A1F  # Latched flags, cleared by writing 0
+
+ALARM_MASK = 0x80  # Bit 7 of each alarm register: ignore this field
+ALARM_DY = 0x40  # Bit 6 of the day/date register: match the day of week (1-7), not the date
+
+class DS3231:
+    def __init__(self, i2c, address=RTC_ADDRESS):
+        self.i2c = i2c
+        self.address = address
+        self.regs = bytearray(NUM_REGISTERS)
+        self.dirty = set()
+        self.status_clear = 0  # Flag bits a pending status write clears
+        self.loaded_at = None  # time.monotonic() of the last burst read
+        self.bus_reads = 0
+        self.bus_writes = 0
+
+    # --- Register cache -------------------------------------------------
+
+    def refresh(self, start=REG_SECONDS, end=NUM_REGISTERS):
+        # Pending writes go out first so the burst read sees them
+        self.flush()
+        data = self.i2c.read(self.address, start, end - start)
+        self.regs[start:end] = bytes(data)
+        self.bus_reads += 1
+        if start == REG_SECONDS and end == NUM_REGISTERS:
+            self.loaded_at = time.monotonic()
+        return self.regs[start:end]
+
+    def load(self, data, start=REG_SECONDS):
+        # Fill the cache from a burst read done elsewhere (async or batched)
+        self.regs[start:start + len(data)] = bytes(data)
+        if start == REG_SECONDS and len(data) >= NUM_REGISTERS:
+            self.loaded_at = time.monotonic()
+
+    def cached(self, max_age=None):
+        # Refresh the whole register file unless the cache is recent enough
+        # (None: any cached copy will do, 0: always read the bus)
+        if self.loaded_at is None or (max_age is not None and time.monotonic() - self.loaded_at >= max_age):
+            self.refresh()
+        return self.regs
+
+    def set_register(self, register, value):
+        self.regs[register] = value & 0xFF
+        self.dirty.add(register)
+
+    def set_registers(self, register, values):
+        for i, value in enumerate(values):
+            self.set_register(register + i, value)
+
+    def flush(self):
+        # Write back each run of consecutive dirty registers in one transaction
+        if not self.dirty:
+            return
+        registers = sorted(self.dirty)
+        start = prev = registers[0]
+        for register in registers[1:] + [None]:
+            if register is not None and register == prev + 1:
+                prev = register
+                continue
+            data = self.regs[start:prev + 1]
+            if start <= REG_STATUS <= prev:
+                # Write 1 to the flags not being cleared: a flag that latched
+                # after the cache was loaded must survive the write
+                data[REG_STATUS - start] |= STATUS_FLAGS & ~self.status_clear
+            self.i2c.write_block(self.address, start, data)
+            self.bus_writes += 1
+            if register is not None:
+                start = prev = register
+        self.dirty.clear()
+        self.status_clear = 0
+
+    # --- Time -----------------------------------------------------------
+
+    def read_time(self, max_age=0):
+        # One burst serves the time, alarms, control, status and temperature
+        regs = self.cached(max_age)
+        return self.decode_time(regs), self.bcd_to_dec(regs[3])
+
+    def decode_time(self, regs):
+        seconds = self.bcd_to_dec(regs[0] & 0x7F)
+        minutes = self.bcd_to_dec(regs[1])
+        hours = self.bcd_to_dec(regs[2] & 0x3F)
+        day_of_month = self.bcd_to_dec(regs[4])
+        month = self.bcd_to_dec(regs[5] & 0x1F)
+        year = self.bcd_to_dec(regs[6]) + 2000
+        return datetime.datetime(year, month, day_of_month, hours, minutes, seconds)
+
+    def set_time(self, dt):
+        self.set_registers(REG_SECONDS, [
+            self.dec_to_bcd(dt.second),
+            self.dec_to_bcd(dt.minute),
+            self.dec_to_bcd(dt.hour),
+            self.dec_to_bcd(dt.isoweekday() % 7 + 1),  # DS3231: Sunday = 1, ISO: Monday = 1
+            self.dec_to_bcd(dt.day),
+            self.dec_to_bcd(dt.month),
+            self.dec_to_bcd(dt.year - 2000)
+        ])
+        self.flush()
+        print(f"RTC time set to {dt.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # --- Alarms ---------------------------------------------------------
+
+    def alarm_field(self, value):
+        return ALARM_MASK if value is None else self.dec_to_bcd(value)
+
+    def day_date_field(self, date, day):
+        # The last alarm register matches either the date or the day of week
+        if date is not None and day is not None:
+            raise Exception("An alarm matches a date or a day of week, not both")
+        if day is not None:
+            return ALARM_DY | day
+        return self.alarm_field(date)
+
+    def set_alarm1(self, second=None, minute=None, hour=None, date=None, day=None, flush=True):
+        # None leaves a field out of the match (all None fires every second)
+        self.set_registers(REG_ALARM1, [self.alarm_field(second), self.alarm_field(minute),
+                                        self.alarm_field(hour), self.day_date_field(date, day)])
+        if flush:
+            self.flush()
+
+    def set_alarm2(self, minute=None, hour=None, date=None, day=None, flush=True):
+        # None leaves a field out of the match (all None fires every minute)
+        self.set_registers(REG_ALARM2, [self.alarm_field(minute), self.alarm_field(hour),
+                                        self.day_date_field(date, day)])
+        if flush:
+            self.flush()
+
+    def alarm1(self, max_age=None):
+        return self.decode_alarm(self.cached(max_age)[REG_ALARM1:REG_ALARM2])
+
+    def alarm2(self, max_age=None):
+        return self.decode_alarm(self.cached(max_age)[REG_ALARM2:REG_CONTROL])
+
+    def decode_alarm(self, fields):
+        # [seconds,] minutes, hours, date, day: the time fields, then the
+        # day/date register as a date or as a day of week (the other is None)
+        *times, day_date = fields
+        masks = (0x7F, 0x7F, 0x3F)[-len(times):]
+        decoded = [None if value & ALARM_MASK else self.bcd_to_dec(value & mask)
+                   for value, mask in zip(times, masks)]
+        if day_date & ALARM_MASK:
+            return decoded + [None, None]
+        if day_date & ALARM_DY:
+            return decoded + [None, day_date & 0x07]
+        return decoded + [self.bcd_to_dec(day_date & 0x3F), None]
+
+    # --- Control, status, aging and temperature -------------------------
+
+    def control(self, max_age=None):
+        return self.cached(max_age)[REG_CONTROL]
+
+    def set_control(self, value, flush=True):
+        self.set_register(REG_CONTROL, value)
+        if flush:
+            self.flush()
+
+    def status(self, max_age=None):
+        return self.cached(max_age)[REG_STATUS]
+
+    def clear_status(self, bits, flush=True):
+        # OSF/A2F/A1F are cleared by writing 0; flush() writes 1 to the other
+        # flags so only these bits are cleared, whatever latched since the
+        # cached read
+        self.set_register(REG_STATUS, self.status() & ~bits)
+        self.status_clear |= bits & STATUS_FLAGS
+        if flush:
+            self.flush()
+
+    def aging_offset(self, max_age=None):
+        value = self.cached(max_age)[REG_AGING]
+        return value - 256 if value & 0x80 else value
+
+    def set_aging_offset(self, offset, flush=True):
+        self.set_register(REG_AGING, offset & 0xFF)
+        if flush:
+            self.flush()
+
+    def temperature(self, max_age=None):
+        # 10-bit two's complement in 0.25 degC steps
+        regs = self.cached(max_age)
+        raw = (regs[REG_TEMP_MSB] << 2) | (regs[REG_TEMP_LSB] >> 6)
+        if raw & 0x200:
+            raw -= 0x400
+        return raw / 4.0
+
+    @staticmethod
+    def bcd_to_dec(bcd):
+        return (bcd // 16 * 10) + (bcd % 16)
+
+    @staticmethod
+    def dec_to_bcd(dec):
+        return (dec // 10 * 16) + (dec % 10)
@@ -0,0 +1,228 @@
+import collections
+import gc
+import sys
+import time
+import tracemalloc
+from array import array
+
+# Frame-phase profiler for the game and animation loops. Named spans nest
+# (draw -> draw_rect), each frame's time per phase is kept for percentiles,
+# and self time per span stack is accumulated in collapsed-stack form
+# ("frame;draw;draw_rect 1234", microseconds) for flamegraph.pl / speedscope.
+# NULL_PROFILER has the same API and does nothing, so loops can call it
+# unconditionally. AllocationCounter (--alloc) uses the same hooks to count
+# memory allocated per frame with tracemalloc, and the GC collections that
+# allocation churn causes, which show up as frame hitches.
+
+PERCENTILES = (50, 90, 99)
+DEFAULT_FRAMES = 300
+ALLOC_WARMUP_FRAMES = 10  # Frames before steady state (lazy setup, first bullets)
+
+class Span:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.exit()
+        return False
+
+class FrameProfiler:
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.stack = []      # [name, start, child time] of open spans
+        self.spans = {}      # name -> reusable Span
+        self.current = collections.defaultdict(int)  # name -> inclusive ns this frame
+        self.phases = collections.defaultdict(list)  # name -> per-frame ns
+        self.frame_times = []
+        self.collapsed = collections.defaultdict(int)
+        self.frame_start = None  # Set by the first span, so setup time is not a frame
+        self.frame_child = 0
+
+    def span(self, name):
+        span = self.spans.get(name)
+        if span is None:
+            span = self.spans[name] = Span(self, name)
+        return span
+
+    def enter(self, name):
+        if self.frame_start is None:
+            self.frame_start = self.clock()
+        self.stack.append([name, self.clock(), 0])
+
+    def exit(self):
+        name, start, child = self.stack.pop()
+        elapsed = self.clock() - start
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        else:
+            self.frame_child += elapsed
+        # Recursive spans (draw_rect inside draw_rect) are counted once
+        if not any(s[0] == name for s in self.stack):
+            self.current[name] += elapsed
+        path = "frame;" + ";".join(s[0] for s in self.stack) + (";" if self.stack else "") + name
+        self.collapsed[path] += elapsed - child
+
+    def wrap(self, name, func):
+        def wrapped(*args, **kwargs):
+            with self.span(name):
+                return func(*args, **kwargs)
+        return wrapped
+
+    def instrument(self, obj, *names):
+        # Replace bound methods on one instance with profiled versions
+        for name in names:
+            setattr(obj, name, self.wrap(name, getattr(obj, name)))
+
+    def end_frame(self):
+        now = self.clock()
+        frame = now - (self.frame_start or now)
+        self.frame_times.append(frame)
+        self.collapsed["frame"] += frame - self.frame_child
+        for name in self.spans:
+            self.phases[name].append(self.current.get(name, 0))
+        self.current.clear()
+        self.frame_start = now
+        self.frame_child = 0
+
+    def frames(self):
+        return len(self.frame_times)
+
+    def report(self):
+        # {phase: {"p50": ms, "p90": ms, "p99": ms, "max": ms, "share": fraction}}
+        total = sum(self.frame_times) or 1
+        report = {}
+        rows = dict(self.phases)
+        rows["frame"] = self.frame_times
+        for name, values in rows.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            stats = {f"p{p}": ordered[min(len(ordered) - 1, len(ordered) * p // 100)] / 1e6 for p in PERCENTILES}
+            stats["max"] = ordered[-1] / 1e6
+            stats["share"] = sum(values) / total
+            report[name] = stats
+        return report
+
+    def print_report(self):
+        print(f"{self.frames()} frames")
+        print(f"{'phase':<24}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'share':>8}")
+        for name, stats in sorted(self.report().items(), key=lambda item: -item[1]["share"]):
+            print(f"{name:<24}{stats['p50']:9.3f}{stats['p90']:9.3f}{stats['p99']:9.3f}"
+                  f"{stats['max']:9.3f}{stats['share']:8.1%}")
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, ns in sorted(self.collapsed.items()):
+                if ns > 0:
+                    f.write(f"{stack} {ns // 1000}\n")
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class NullProfiler:
+    NULL_SPAN = NullSpan()
+
+    def span(self, name):
+        return self.NULL_SPAN
+
+    def wrap(self, name, func):
+        return func
+
+    def instrument(self, obj, *names):
+        pass
+
+    def end_frame(self):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+class AllocationCounter(NullProfiler):
+    # Per frame: peak transient bytes (tracemalloc peak above the level the
+    # frame started at, so temporaries count even when freed before the frame
+    # ends; memory freed and reallocated within the frame counts once), net
+    # blocks (change of sys.getallocatedblocks across the frame) and GC
+    # collections with their pause times. Neither is a count of allocations:
+    # CPython has no gross allocation counter that Python code can read
+    # without slowing every allocation, so a temporary that is freed inside
+    # the frame shows up only in the peak bytes.
+    def __init__(self, warmup=ALLOC_WARMUP_FRAMES):
+        self.warmup = warmup
+        self.seen = 0
+        self.frame_peak_bytes = array("q")  # Raw integers, so recording allocates no objects
+        self.frame_net_blocks = array("q")
+        self.gc_pauses = []
+        self.gc_start = None
+        gc.callbacks.append(self.on_gc)
+        tracemalloc.start()
+        self.start_bytes = tracemalloc.get_traced_memory()[0]
+        self.start_blocks = sys.getallocatedblocks()
+
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter_ns()
+        elif self.gc_start is not None and self.seen >= self.warmup:
+            self.gc_pauses.append(time.perf_counter_ns() - self.gc_start)
+
+    def end_frame(self):
+        # Blocks are sampled once per call, at the same point, so the
+        # counter's own objects cancel out
+        blocks = sys.getallocatedblocks()
+        current, peak = tracemalloc.get_traced_memory()
+        self.seen += 1
+        if self.seen > self.warmup:
+            self.frame_peak_bytes.append(peak - self.start_bytes)
+            self.frame_net_blocks.append(blocks - self.start_blocks)
+        self.start_blocks = blocks
+        tracemalloc.reset_peak()
+        self.start_bytes = tracemalloc.get_traced_memory()[0]
+
+    def frames(self):
+        return len(self.frame_peak_bytes)
+
+    def print_report(self):
+        tracemalloc.stop()
+        gc.callbacks.remove(self.on_gc)
+        n = self.frames() or 1
+        ordered = sorted(self.frame_peak_bytes) or [0]
+        print(f"{self.frames()} frames after {self.warmup} warmup frames")
+        print(f"peak transient bytes per frame: mean {sum(self.frame_peak_bytes) / n:.0f}, "
+              f"p99 {ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)]}, max {ordered[-1]}")
+        print(f"net blocks per frame: mean {sum(self.frame_net_blocks) / n:.2f}")
+        print(f"GC collections: {len(self.gc_pauses)}"
+              + (f", max pause {max(self.gc_pauses) / 1e6:.3f} ms" if self.gc_pauses else ""))
+
+def add_profile_arguments(parser, default_path):
+    parser.add_argument("--profile", metavar="PATH", nargs="?", const=default_path,
+                        help=f"profile frame phases, write collapsed stacks to PATH (default {default_path})")
+    parser.add_argument("--alloc", action="store_true",
+                        help="measure peak transient bytes, net blocks and GC collections per frame instead")
+    parser.add_argument("--profile-frames", type=int, default=DEFAULT_FRAMES, metavar="N",
+                        help="frames to profile before reporting and exiting")
+
+def profiler_from_args(args):
+    if args.alloc:
+        return AllocationCounter()
+    if args.profile:
+        return FrameProfiler()
+    return NULL_PROFILER
+
+def profile_frames(args):
+    # Frame limit for the main loop; None runs until interrupted
+    return args.profile_frames if args.alloc or args.profile else None
+
+def finish_profile(profiler, args):
+    if profiler is NULL_PROFILER:
+        return
+    profiler.print_report()
+    if isinstance(profiler, FrameProfiler):
+        profiler.write_collapsed(args.profile)
+        print(f"Collapsed stacks written to {args.profile}")
@@ -0,0 +1,127 @@
+import time
+
+# HT16K33 LED driver on an Adafruit 4-digit 7-segment backpack. The display
+# RAM (0x00-0x0F) is mirrored in buffer; shadow holds the RAM as last sent,
+# and update_dirty() writes only the span of bytes that differ in one burst,
+# so the once-a-second colon toggle is a single 1-byte register write.
+# The HT16K33 takes command bytes with no register:
+#   0x20 | 1           system setup, oscillator on
+#   0x80 | on | blink  display setup, blink rate in bits 1-2
+#   0xE0 | level       dimming, duty (level + 1)/16
+# A command byte 0x00-0x0F sets the RAM address; data bytes follow it and
+# the address auto-increments, so a RAM write looks like a register write.
+
+HT16K33_ADDRESS = 0x70
+RAM_SIZE = 16
+
+CMD_SYSTEM = 0x20
+OSCILLATOR_ON = 0x01
+CMD_DISPLAY = 0x80
+DISPLAY_ON = 0x01
+CMD_DIMMING = 0xE0
+
+BLINK_OFF = 0
+BLINK_2HZ = 1
+BLINK_1HZ = 2
+BLINK_HALF_HZ = 3
+
+# Backpack wiring: one RAM byte per digit, left to right, colon in between
+DIGIT_ADDRESSES = (0x00, 0x02, 0x06, 0x08)
+COLON_ADDRESS = 0x04
+COLON_BIT = 0x02
+DOT_BIT = 0x80  # Decimal point of a digit
+
+# Segments a-g in bits 0-6; unknown characters render blank
+SEGMENTS = {
+    " ": 0x00, "-": 0x40,
+    "0": 0x3F, "1": 0x06, "2": 0x5B, "3": 0x4F, "4": 0x66,
+    "5": 0x6D, "6": 0x7D, "7": 0x07, "8": 0x7F, "9": 0x6F,
+    "A": 0x77, "b": 0x7C, "C": 0x39, "d": 0x5E, "E": 0x79, "F": 0x71,
+}
+
+class HT16K33:
+    def __init__(self, i2c, address=HT16K33_ADDRESS, brightness=15, blink=BLINK_OFF,
+                 metrics=None, name="ht16k33"):
+        self.i2c = i2c
+        self.address = address
+        self.metrics = metrics  # i2c_metrics.Metrics for frame-time histograms
+        self.name = name
+        self.brightness = brightness
+        self.blink = blink
+        self.buffer = bytearray(RAM_SIZE)
+        self.shadow = bytearray(RAM_SIZE)  # Display RAM as last sent
+        self.frames = 0
+        self.bytes_sent = 0
+        self.initialize_display()
+
+    def initialize_display(self):
+        self.write_command(CMD_SYSTEM | OSCILLATOR_ON)
+        self.write_command(CMD_DISPLAY | DISPLAY_ON | self.blink << 1)
+        self.write_command(CMD_DIMMING | self.brightness)
+        self.clear_display()
+        self.update_display()
+
+    def restore(self):
+        # After a power loss: commands again, then the last sent RAM
+        self.write_command(CMD_SYSTEM | OSCILLATOR_ON)
+        self.write_command(CMD_DISPLAY | DISPLAY_ON | self.blink << 1)
+        self.write_command(CMD_DIMMING | self.brightness)
+        self.i2c.write_block(self.address, 0x00, self.shadow)
+
+    def write_command(self, command):
+        self.i2c.write_read(self.address, (command,))
+
+    def set_brightness(self, level):
+        self.brightness = max(0, min(15, level))
+        self.write_command(CMD_DIMMING | self.brightness)
+
+    def set_blink(self, rate):
+        self.blink = rate & 0x03
+        self.write_command(CMD_DISPLAY | DISPLAY_ON | self.blink << 1)
+
+    def clear_display(self):
+        self.buffer[:] = bytes(RAM_SIZE)
+
+    def set_digit(self, position, char, dot=False):
+        self.buffer[DIGIT_ADDRESSES[position]] = SEGMENTS.get(char, 0x00) | (DOT_BIT if dot else 0)
+
+    def set_colon(self, on):
+        if on:
+            self.buffer[COLON_ADDRESS] |= COLON_BIT
+        else:
+            self.buffer[COLON_ADDRESS] &= ~COLON_BIT & 0xFF
+
+    def print_text(self, text):
+        # Up to four characters, right-aligned
+        for position, char in enumerate(text[-4:].rjust(4)):
+            self.set_digit(position, char)
+
+    def print_time(self, hour, minute, colon=True):
+        self.print_text(f"{hour:2d}{minute:02d}")
+        self.set_colon(colon)
+
+    def update_display(self):
+        # Whole RAM in one write
+        start = time.perf_counter_ns()
+        self.i2c.write_block(self.address, 0x00, self.buffer)
+        self.shadow[:] = self.buffer
+        self.bytes_sent += RAM_SIZE
+        self.frames += 1
+        if self.metrics is not None:
+            self.metrics.frame(self.name, time.perf_counter_ns() - start)
+
+    def update_dirty(self):
+        # One burst from the first to the last changed byte; returns the
+        # number of RAM bytes sent (0 when nothing changed)
+        changed = [i for i in range(RAM_SIZE) if self.buffer[i] != self.shadow[i]]
+        if not changed:
+            return 0
+        start = time.perf_counter_ns()
+        first, last = changed[0], changed[-1] + 1
+        self.i2c.write_block(self.address, first, self.buffer[first:last])
+        self.shadow[first:last] = self.buffer[first:last]
+        self.bytes_sent += last - first
+        self.frames += 1
+        if self.metrics is not None:
+            self.metrics.frame(self.name, time.perf_counter_ns() - start)
+        return last - first
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from ch347 import WaveshareI2C
+from ch347_async import AsyncCH347Bus
+from dht12 import BACKOFF_MAX, BACKOFF_START, DHT12_ADDRESS, DHT12_MIN_INTERVAL, decode_dht12
+from ds3231 import DS3231, NUM_REGISTERS, RTC_ADDRESS
+
+# Sensor reads, a console clock and a local control socket on one event loop.
+# Control socket: connect to 127.0.0.1:8347 and send "get", "scan" or "stats".
+
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 8347
+
+latest = {}
+dht12_errors = {"i2c": 0, "checksum": 0}
+rtc_errors = {"i2c": 0}
+
+
+async def poll_dht12(bus):
+    # A failed read is retried with bounded exponential backoff, as in
+    # DHT12.read, instead of ending the task
+    delay = BACKOFF_START
+    while True:
+        try:
+            data = await bus.write_read(DHT12_ADDRESS, b"\x00", 5)
+        except Exception:
+            dht12_errors["i2c"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BACKOFF_MAX)
+            continue
+        reading = decode_dht12(data)
+        if reading is None:
+            dht12_errors["checksum"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BACKOFF_MAX)
+            continue
+        delay = BACKOFF_START
+        latest["humidity"], latest["temperature"] = reading
+        await asyncio.sleep(DHT12_MIN_INTERVAL)
+
+
+async def show_clock(bus, rtc):
+    # A failed RTC read is retried with backoff like poll_dht12
+    delay = BACKOFF_START
+    while True:
+        # One burst read serves the time and the RTC temperature
+        try:
+            data = await bus.write_read(RTC_ADDRESS, b"\x00", NUM_REGISTERS)
+        except Exception:
+            rtc_errors["i2c"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BACKOFF_MAX)
+            continue
+        delay = BACKOFF_START
+        rtc.load(data)
+        now, _ = rtc.read_time(max_age=None)
+        latest["time"] = now.isoformat()
+        latest["rtc_temperature"] = rtc.temperature()
+        line = now.strftime("%H:%M:%S")
+        if "humidity" in latest:
+            line += f"  {latest['humidity']:.1f} %RH  {latest['temperature']:.1f} C"
+        print(line)
+        await asyncio.sleep(1.0)
+
+
+async def handle_control(reader, writer, bus):
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        command = line.decode().strip()
+        if command == "get":
+            reply = latest
+        elif command == "scan":
+            reply = [f"0x{addr:02X}" for addr in await bus.scan()]
+        elif command == "stats":
+            reply = {"queued": bus.queued, "completed": bus.completed, "cancelled": bus.cancelled,
+                     "dht12_errors": dht12_errors, "rtc_errors": rtc_errors}
+        else:
+            reply = {"error": f"unknown command {command!r}"}
+        writer.write((json.dumps(reply) + "\n").encode())
+        await writer.drain()
+    writer.close()
+
+
+async def run():
+    bus = AsyncCH347Bus(WaveshareI2C())
+    rtc = DS3231(None)  # Register cache only; bursts are read through the async bus
+    server = await asyncio.start_server(lambda r, w: handle_control(r, w, bus), CONTROL_HOST, CONTROL_PORT)
+    print(f"Control socket on {CONTROL_HOST}:{CONTROL_PORT}")
+    try:
+        async with server:
+            await asyncio.gather(poll_dht12(bus), show_clock(bus, rtc))
+    finally:
+        await bus.close()
+
+
+def main():
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+
+if __name__ == "__main__":
+    main()
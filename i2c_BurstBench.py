@@ -0,0 +1,64 @@
+import argparse
+import time
+from ctypes import *
+
+from ch347 import WaveshareI2C
+from dht12 import DHT12_ADDRESS, decode_dht12_block
+
+# Burst sampling benchmark: the same register block read N times, once as a
+# loop of CH347StreamI2C calls and once as CH347WriteRead bursts
+# (iReadStep = block length, iReadTimes = samples per packet).
+# Run with CH347_SIMULATE=1 to measure against the simulated adapter.
+
+def bench_loop(i2c, addr, register, length, count, out):
+    tcmd = (c_ubyte * 2)(addr << 1, register)
+    start = time.perf_counter()
+    for i in range(count):
+        rbuf = (c_ubyte * length).from_buffer(out, i * length)
+        if not i2c.dll.CH347StreamI2C(i2c.usb_id, 2, tcmd, length, rbuf):
+            raise Exception(f"Failed to read from address {hex(addr)}")
+    return time.perf_counter() - start
+
+def bench_burst(i2c, addr, register, length, count, out):
+    transfers = i2c.usb_transfers
+    start = time.perf_counter()
+    i2c.burst_read(addr, register, length, count, out)
+    return time.perf_counter() - start, i2c.usb_transfers - transfers
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare looped and burst register reads")
+    parser.add_argument("--index", type=int, default=0, help="CH347 adapter index")
+    parser.add_argument("--address", type=lambda s: int(s, 0), default=DHT12_ADDRESS)
+    parser.add_argument("--register", type=lambda s: int(s, 0), default=0x00)
+    parser.add_argument("--length", type=int, default=5, help="bytes per sample")
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    i2c = WaveshareI2C(args.index)
+    try:
+        # Preallocated sample buffers, reused by both runs
+        loop_out = bytearray(args.length * args.samples)
+        burst_out = bytearray(args.length * args.samples)
+
+        loop_time = bench_loop(i2c, args.address, args.register, args.length, args.samples, loop_out)
+        burst_time, calls = bench_burst(i2c, args.address, args.register, args.length, args.samples, burst_out)
+
+        print(f"{args.samples} samples x {args.length} bytes from 0x{args.address:02X}")
+        print(f"CH347StreamI2C loop: {args.samples / loop_time:10.0f} samples/s  ({args.samples} DLL calls)")
+        print(f"CH347WriteRead burst:{args.samples / burst_time:10.0f} samples/s  ({calls} DLL calls)")
+        print(f"Speedup: {loop_time / burst_time:.1f}x")
+
+        if args.address == DHT12_ADDRESS and args.length == 5:
+            start = time.perf_counter()
+            humidity, temperature, valid = decode_dht12_block(burst_out)
+            decode_time = time.perf_counter() - start
+            good = sum(1 for v in valid if v)
+            print(f"Decoded {good}/{args.samples} valid readings in {decode_time * 1000:.2f} ms, "
+                  f"last {humidity[-1]:.1f} %RH {temperature[-1]:.1f} C")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        i2c.close_device()
+
+if __name__ == "__main__":
+    main()
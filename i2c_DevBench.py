@@ -0,0 +1,65 @@
+import argparse
+import time
+
+from ch347 import WaveshareI2C
+from ch347_sim import SimulatedCH347, SimulatedI2CDev
+from dht12 import DHT12, DHT12_ADDRESS
+from ds3231 import DS3231, RTC_ADDRESS, NUM_REGISTERS
+from i2c_dev import LinuxI2C
+from ssd1306 import OLED_ADDRESS
+
+# Host calls per frame for the CH347 DLL and the Linux i2c-dev backend, both
+# simulated. A frame is the page-by-page OLED update the scripts use (three
+# commands and one 128-byte data write per page) plus a DS3231 + DHT12 read.
+
+def frame_ops(frame):
+    ops = []
+    for page in range(8):
+        ops.append((OLED_ADDRESS, bytes([0x00, 0xB0 + page, 0x00, 0x10]), 0))
+        ops.append((OLED_ADDRESS, b"\x40" + bytes([frame & 0xFF]) * 128, 0))
+    ops.append((RTC_ADDRESS, b"\x00", NUM_REGISTERS))
+    ops.append((DHT12_ADDRESS, b"\x00", 5))
+    return ops
+
+def bench(i2c, counter, frames, packed):
+    calls = counter()
+    start = time.perf_counter()
+    for frame in range(frames):
+        i2c.transfer(frame_ops(frame), packed)
+    elapsed = time.perf_counter() - start
+    return (counter() - calls) / frames, frames / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare host calls per frame: CH347 DLL vs i2c-dev I2C_RDWR")
+    parser.add_argument("--frames", type=int, default=20)
+    args = parser.parse_args()
+
+    dll = SimulatedCH347(usb_latency=0.001)
+    ch347 = WaveshareI2C(0, dll=dll, mode=0x02)  # 400 kHz, the i2c-dev bus speed
+    dev = SimulatedI2CDev()
+    linux = LinuxI2C(1, ioctl=dev.ioctl, opener=dev.open, closer=dev.close)
+    try:
+        # The drivers run unchanged on the i2c-dev backend
+        rtc = DS3231(linux)
+        now, _ = rtc.read_time()
+        reading = DHT12(linux).read()
+        print(f"i2c-dev: DS3231 {now:%H:%M:%S}, {rtc.temperature():.2f} C; DHT12 {reading}")
+
+        print(f"{'backend':<28}{'calls/frame':>12}{'fps':>8}")
+        rows = [
+            ("CH347StreamI2C per op", lambda: dll.calls, ch347, False),
+            ("CH347WriteRead packed", lambda: dll.calls, ch347, True),
+            ("i2c-dev I2C_RDWR per op", lambda: dev.syscalls, linux, False),
+            ("i2c-dev I2C_RDWR batched", lambda: dev.syscalls, linux, True),
+        ]
+        for name, counter, i2c, packed in rows:
+            calls, fps = bench(i2c, counter, args.frames, packed)
+            print(f"{name:<28}{calls:>12.1f}{fps:>8.1f}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        ch347.close_device()
+        linux.close_device()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import argparse
 import time
 import math
 from ctypes import *
 
+from frame_profiler import NULL_PROFILER, add_profile_arguments, finish_profile, profile_frames, profiler_from_args
+
 # Load the CH347 DLL
 ch347_dll = windll.LoadLibrary("CH347DLLA64.dll")
 
@@ -19,7 +22,14 @@ class OLED:
         self.pages = self.height // 8
 
         # Create a buffer for the display
-        self.buffer = [0x00] * (self.width * self.pages)
+        self.buffer = bytearray(self.width * self.pages)
+        self.blank = bytearray(self.width * self.pages)
+
+        # Packets and page views are allocated once and reused every frame
+        self.cmd_packet = (c_byte * 3)(self.dev_addr << 1, 0x00)  # Address with write flag, command mode
+        self.data_packet = (c_byte * (self.width + 2))(self.dev_addr << 1, 0x40)  # Data mode
+        self.page_views = [memoryview(self.buffer)[page * self.width:(page + 1) * self.width]
+                           for page in range(self.pages)]
 
         # Open the USB device
         if ch347_dll.CH347OpenDevice(self.usb_id) != -1:
@@ -33,28 +43,24 @@ class OLED:
         print("USB CH347 Device Closed.")
 
     def write_command(self, command):
-        # Prepare the command buffer
-        cmd = (c_byte * 3)()
-        cmd[0] = self.dev_addr << 1  # I2C device address with write flag
-        cmd[1] = 0x00  # Command mode
-        cmd[2] = command  # Actual command
+        # Only the command byte of the packet changes
+        self.cmd_packet[2] = command
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, cmd, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, self.cmd_packet, 0, None)
         if result != 1:
             raise Exception(f"Failed to send command: {hex(command)}")
 
     def write_data(self, data):
-        # Prepare data buffer
-        data_packet = (c_byte * (len(data) + 2))()
-        data_packet[0] = self.dev_addr << 1  # I2C device address with write flag
-        data_packet[1] = 0x40  # Data mode
-
-        for i in range(len(data)):
-            data_packet[i + 2] = data[i]
+        # Copy into the data packet behind its header, growing it only for
+        # a longer write
+        length = len(data) + 2
+        if length > len(self.data_packet):
+            self.data_packet = (c_byte * length)(self.dev_addr << 1, 0x40)
+        self.data_packet[2:length] = data
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, len(data_packet), data_packet, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, length, self.data_packet, 0, None)
         if result != 1:
             raise Exception("Failed to write data to OLED")
 
@@ -99,16 +105,15 @@ class OLED:
             print(f"Initialization error: {e}")
 
     def clear_display(self):
-        # Clear the buffer
-        self.buffer = [0x00] * (self.width * self.pages)
+        # Clear the buffer in place
+        self.buffer[:] = self.blank
 
         # Write the buffer to the display
         for page in range(self.pages):
             self.write_command(0xB0 + page)  # Set page address
             self.write_command(0x00)         # Set lower column address
             self.write_command(0x10)         # Set higher column address
-            start = page * self.width
-            self.write_data(self.buffer[start:start + self.width])
+            self.write_data(self.page_views[page])
 
     def draw_pixel(self, x, y, color=1):
         if x < 0 or x >= self.width or y < 0 or y >= self.height:
@@ -149,10 +154,9 @@ class OLED:
             self.write_command(0xB0 + page)  # Set page address
             self.write_command(0x00)         # Set lower column address
             self.write_command(0x10)         # Set higher column address
-            start = page * self.width
-            self.write_data(self.buffer[start:start + self.width])
+            self.write_data(self.page_views[page])
 
-def rotate_point(point, angle_x, angle_y, angle_z):
+def rotate_point(point, angle_x, angle_y, angle_z, out=None):
     # Rotation matrices around x, y, and z axes
     sin_x, cos_x = math.sin(angle_x), math.cos(angle_x)
     sin_y, cos_y = math.sin(angle_y), math.cos(angle_y)
@@ -173,24 +177,43 @@ def rotate_point(point, angle_x, angle_y, angle_z):
     y3 = x2 * sin_z + y2 * cos_z
     z3 = z2
 
-    return (x3, y3, z3)
+    if out is None:
+        return (x3, y3, z3)
+    out[0] = x3
+    out[1] = y3
+    out[2] = z3
+    return out
 
-def project_point(point, center_x, center_y, scale):
+def project_point(point, center_x, center_y, scale, out=None):
     # Project a 3D point onto a 2D plane
     x = int(point[0] * scale + center_x)
     y = int(point[1] * scale + center_y)
-    return (x, y)
-
-def draw_cube(oled, cube_vertices, edges, angle_x, angle_y, angle_z):
-    # Create a temporary buffer to track changes
-    new_buffer = [0x00] * len(oled.buffer)
+    if out is None:
+        return (x, y)
+    out[0] = x
+    out[1] = y
+    return out
+
+class CubeScratch:
+    # Storage draw_cube reuses every frame instead of allocating
+    def __init__(self, oled, vertex_count=8):
+        self.buffer = bytearray(len(oled.buffer))
+        self.rotated = [0.0, 0.0, 0.0]
+        self.projected = [[0, 0] for _ in range(vertex_count)]
+
+def draw_cube(oled, cube_vertices, edges, angle_x, angle_y, angle_z, scratch=None):
+    if scratch is None:
+        scratch = CubeScratch(oled, len(cube_vertices))
+
+    # Draw into a second buffer to track changes
+    new_buffer = scratch.buffer
+    new_buffer[:] = oled.blank
 
     # Rotate and project each vertex of the cube
-    projected_vertices = []
-    for vertex in cube_vertices:
-        rotated_vertex = rotate_point(vertex, angle_x, angle_y, angle_z)
-        projected_vertex = project_point(rotated_vertex, center_x, center_y, 1)
-        projected_vertices.append(projected_vertex)
+    projected_vertices = scratch.projected
+    for i, vertex in enumerate(cube_vertices):
+        rotate_point(vertex, angle_x, angle_y, angle_z, scratch.rotated)
+        project_point(scratch.rotated, center_x, center_y, 1, projected_vertices[i])
 
     # Draw each edge of the cube
     for edge in edges:
@@ -201,7 +224,7 @@ def draw_cube(oled, cube_vertices, edges, angle_x, angle_y, angle_z):
 
     # Copy the new buffer to the OLED's buffer if there are changes
     if new_buffer != oled.buffer:
-        oled.buffer = new_buffer
+        oled.buffer[:] = new_buffer
         oled.update_display()
 
 def draw_line_in_buffer(buffer, x0, y0, x1, y1, color=1):
@@ -231,7 +254,7 @@ def draw_line_in_buffer(buffer, x0, y0, x1, y1, color=1):
             err += dx
             y0 += sy
 
-def main(oled):
+def main(oled, profiler=NULL_PROFILER, frames=None):
     # Define the vertices of a cube centered around the origin
     half_size = cube_size / 2
     cube_vertices = [
@@ -249,10 +272,13 @@ def main(oled):
     ]
 
     angle_x, angle_y, angle_z = 0, 0, 0  # Initial angles
+    scratch = CubeScratch(oled, len(cube_vertices))
+    profiler.instrument(oled, "update_display")
 
-    while True:
+    frame = 0
+    while frames is None or frame < frames:
         # Draw the rotating cube
-        draw_cube(oled, cube_vertices, edges, angle_x, angle_y, angle_z)
+        draw_cube(oled, cube_vertices, edges, angle_x, angle_y, angle_z, scratch)
 
         # Increment rotation angles faster for smoother animation
         angle_x += 0.1
@@ -260,12 +286,26 @@ def main(oled):
         angle_z += 0.05
 
         # Reduce sleep time for a smoother animation
-        time.sleep(0.05)
+        with profiler.span("sleep"):
+            time.sleep(0.05)
+        profiler.end_frame()
+        frame += 1
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rotating cube on the SSD1306 OLED")
+    add_profile_arguments(parser, "cube.folded")
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+    # Module-level functions are looked up at call time, so rebinding them
+    # here profiles the calls made from draw_cube
+    draw_cube = profiler.wrap("draw_cube", draw_cube)
+    rotate_point = profiler.wrap("rotate_point", rotate_point)
+    project_point = profiler.wrap("project_point", project_point)
+    draw_line_in_buffer = profiler.wrap("draw_line_in_buffer", draw_line_in_buffer)
     try:
         oled = OLED()
-        main(oled)
+        main(oled, profiler, profile_frames(args))
+        finish_profile(profiler, args)
     except Exception as e:
         print(e)
     finally:
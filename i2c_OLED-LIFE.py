@@ -1,7 +1,10 @@
+import argparse
 import time
 import random
 from ctypes import *
 
+from frame_profiler import NULL_PROFILER, add_profile_arguments, finish_profile, profile_frames, profiler_from_args
+
 # Load the CH347 DLL
 ch347_dll = windll.LoadLibrary("CH347DLLA64.dll")
 
@@ -19,7 +22,14 @@ class OLED:
         self.pages = self.height // 8
 
         # Create a buffer for the display
-        self.buffer = [0x00] * (self.width * self.pages)
+        self.buffer = bytearray(self.width * self.pages)
+        self.blank = bytearray(self.width * self.pages)
+
+        # Packets and page views are allocated once and reused every frame
+        self.cmd_packet = (c_byte * 3)(self.dev_addr << 1, 0x00)  # Address with write flag, command mode
+        self.data_packet = (c_byte * (self.width + 2))(self.dev_addr << 1, 0x40)  # Data mode
+        self.page_views = [memoryview(self.buffer)[page * self.width:(page + 1) * self.width]
+                           for page in range(self.pages)]
 
         # Open the USB device
         if ch347_dll.CH347OpenDevice(self.usb_id) != -1:
@@ -33,28 +43,24 @@ class OLED:
         print("USB CH347 Device Closed.")
 
     def write_command(self, command):
-        # Prepare the command buffer
-        cmd = (c_byte * 3)()
-        cmd[0] = self.dev_addr << 1  # I2C device address with write flag
-        cmd[1] = 0x00  # Command mode
-        cmd[2] = command  # Actual command
+        # Only the command byte of the packet changes
+        self.cmd_packet[2] = command
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, cmd, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, self.cmd_packet, 0, None)
         if result != 1:
             raise Exception(f"Failed to send command: {hex(command)}")
 
     def write_data(self, data):
-        # Prepare data buffer
-        data_packet = (c_byte * (len(data) + 2))()
-        data_packet[0] = self.dev_addr << 1  # I2C device address with write flag
-        data_packet[1] = 0x40  # Data mode
-
-        for i in range(len(data)):
-            data_packet[i + 2] = data[i]
+        # Copy into the data packet behind its header, growing it only for
+        # a longer write
+        length = len(data) + 2
+        if length > len(self.data_packet):
+            self.data_packet = (c_byte * length)(self.dev_addr << 1, 0x40)
+        self.data_packet[2:length] = data
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, len(data_packet), data_packet, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, length, self.data_packet, 0, None)
         if result != 1:
             raise Exception("Failed to write data to OLED")
 
@@ -99,16 +105,15 @@ class OLED:
             print(f"Initialization error: {e}")
 
     def clear_display(self):
-        # Clear the buffer
-        self.buffer = [0x00] * (self.width * self.pages)
+        # Clear the buffer in place
+        self.buffer[:] = self.blank
 
         # Write the buffer to the display
         for page in range(self.pages):
             self.write_command(0xB0 + page)  # Set page address
             self.write_command(0x00)         # Set lower column address
             self.write_command(0x10)         # Set higher column address
-            start = page * self.width
-            self.write_data(self.buffer[start:start + self.width])
+            self.write_data(self.page_views[page])
 
     def draw_pixel(self, x, y, color=1):
         if x < 0 or x >= self.width or y < 0 or y >= self.height:
@@ -134,25 +139,28 @@ class OLED:
             self.write_command(0xB0 + page)  # Set page address
             self.write_command(0x00)         # Set lower column address
             self.write_command(0x10)         # Set higher column address
-            start = page * self.width
-            self.write_data(self.buffer[start:start + self.width])
+            self.write_data(self.page_views[page])
 
 def initialize_grid(width, height):
     # Create a random initial state for the grid
     return [[random.choice([0, 1]) for _ in range(width)] for _ in range(height)]
 
+# Neighbor offsets, built once rather than on every count_neighbors call
+directions = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
 def count_neighbors(grid, x, y):
     # Count the live neighbors of a cell at position (x, y)
-    directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
     count = 0
     for dx, dy in directions:
         nx, ny = (x + dx) % len(grid[0]), (y + dy) % len(grid)
         count += grid[ny][nx]
     return count
 
-def update_grid(grid):
-    # Create a new grid to store the updated state
-    new_grid = [[0 for _ in range(len(grid[0]))] for _ in range(len(grid))]
+def update_grid(grid, new_grid=None):
+    # Write the next generation into new_grid, reusing its storage, or into
+    # a new grid when none is given; every cell is assigned
+    if new_grid is None:
+        new_grid = [[0 for _ in range(len(grid[0]))] for _ in range(len(grid))]
     for y in range(len(grid)):
         for x in range(len(grid[y])):
             neighbors = count_neighbors(grid, x, y)
@@ -166,6 +174,8 @@ def update_grid(grid):
                 # Any dead cell with exactly three live neighbors becomes a live cell
                 if neighbors == 3:
                     new_grid[y][x] = 1
+                else:
+                    new_grid[y][x] = 0
     return new_grid
 
 def display_grid(oled, current_grid, previous_grid, size):
@@ -179,26 +189,40 @@ def display_grid(oled, current_grid, previous_grid, size):
     # Update the OLED display
     oled.update_display()
 
-def game_of_life(oled, grid_width=32, grid_height=16, cell_size=4):
+def game_of_life(oled, grid_width=32, grid_height=16, cell_size=4, profiler=NULL_PROFILER, frames=None):
     # Initialize a grid with a random pattern
     grid = initialize_grid(grid_width, grid_height)
     previous_grid = [[0 for _ in range(grid_width)] for _ in range(grid_height)]
+    profiler.instrument(oled, "update_display")
 
-    while True:
+    frame = 0
+    while frames is None or frame < frames:
         # Display the current grid with only changes
         display_grid(oled, grid, previous_grid, cell_size)
 
-        # Update the grid to the next generation
-        previous_grid = grid
-        grid = update_grid(grid)
+        # Update the grid to the next generation, written over the storage
+        # of the generation before it
+        previous_grid, grid = grid, update_grid(grid, previous_grid)
 
         # Control the speed of the simulation
-        time.sleep(0.1)
+        with profiler.span("sleep"):
+            time.sleep(0.1)
+        profiler.end_frame()
+        frame += 1
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conway's Game of Life on the SSD1306 OLED")
+    add_profile_arguments(parser, "life.folded")
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+    # count_neighbors runs once per cell and stays inside update_grid's span
+    display_grid = profiler.wrap("display_grid", display_grid)
+    update_grid = profiler.wrap("update_grid", update_grid)
     try:
         oled = OLED()
-        game_of_life(oled, grid_width=grid_width, grid_height=grid_height, cell_size=cell_size)
+        game_of_life(oled, grid_width=grid_width, grid_height=grid_height, cell_size=cell_size,
+                     profiler=profiler, frames=profile_frames(args))
+        finish_profile(profiler, args)
     except Exception as e:
         print(e)
     finally:
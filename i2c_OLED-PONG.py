@@ -1,7 +1,10 @@
+import argparse
 import time
 from ctypes import *
 import random
 
+from frame_profiler import NULL_PROFILER, add_profile_arguments, finish_profile, profile_frames, profiler_from_args
+
 # Load the CH347 DLL
 ch347_dll = windll.LoadLibrary("CH347DLLA64.dll")
 
@@ -23,7 +26,14 @@ class OLED:
         self.pages = self.height // 8
 
         # Create a buffer for the display
-        self.buffer = [0x00] * (self.width * self.pages)
+        self.buffer = bytearray(self.width * self.pages)
+        self.blank = bytearray(self.width * self.pages)
+
+        # Packets and page views are allocated once and reused every frame
+        self.cmd_packet = (c_byte * 3)(self.dev_addr << 1, 0x00)  # Address with write flag, command mode
+        self.data_packet = (c_byte * (self.width + 2))(self.dev_addr << 1, 0x40)  # Data mode
+        self.page_views = [memoryview(self.buffer)[page * self.width:(page + 1) * self.width]
+                           for page in range(self.pages)]
 
         # Open the USB device
         if ch347_dll.CH347OpenDevice(self.usb_id) != -1:
@@ -37,28 +47,24 @@ class OLED:
         print("USB CH347 Device Closed.")
 
     def write_command(self, command):
-        # Prepare the command buffer
-        cmd = (c_byte * 3)()
-        cmd[0] = self.dev_addr << 1  # I2C device address with write flag
-        cmd[1] = 0x00  # Command mode
-        cmd[2] = command  # Actual command
+        # Only the command byte of the packet changes
+        self.cmd_packet[2] = command
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, cmd, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, self.cmd_packet, 0, None)
         if result != 1:
             raise Exception(f"Failed to send command: {hex(command)}")
 
     def write_data(self, data):
-        # Prepare data buffer
-        data_packet = (c_byte * (len(data) + 2))()
-        data_packet[0] = self.dev_addr << 1  # I2C device address with write flag
-        data_packet[1] = 0x40  # Data mode
-
-        for i in range(len(data)):
-            data_packet[i + 2] = data[i]
+        # Copy into the data packet behind its header, growing it only for
+        # a longer write
+        length = len(data) + 2
+        if length > len(self.data_packet):
+            self.data_packet = (c_byte * length)(self.dev_addr << 1, 0x40)
+        self.data_packet[2:length] = data
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, len(data_packet), data_packet, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, length, self.data_packet, 0, None)
         if result != 1:
             raise Exception("Failed to write data to OLED")
 
@@ -103,8 +109,8 @@ class OLED:
             print(f"Initialization error: {e}")
 
     def clear_display(self):
-        # Clear the buffer
-        self.buffer = [0x00] * (self.width * self.pages)
+        # Clear the buffer in place
+        self.buffer[:] = self.blank
 
     def draw_pixel(self, x, y, color=1):
         if x < 0 or x >= self.width or y < 0 or y >= self.height:
@@ -130,8 +136,7 @@ class OLED:
             self.write_command(0xB0 + page)  # Set page address
             self.write_command(0x00)         # Set lower column address
             self.write_command(0x10)         # Set higher column address
-            start = page * self.width
-            self.write_data(self.buffer[start:start + self.width])
+            self.write_data(self.page_views[page])
 
 class PongGame:
     def __init__(self, oled):
@@ -203,17 +208,28 @@ class PongGame:
         # Update the OLED display
         self.oled.update_display()
 
-def main(oled):
+def main(oled, profiler=NULL_PROFILER, frames=None):
     game = PongGame(oled)
-    while True:
+    profiler.instrument(game, "update", "draw")
+    profiler.instrument(oled, "clear_display", "draw_rect", "update_display")
+    frame = 0
+    while frames is None or frame < frames:
         game.update()
         game.draw()
-        time.sleep(0.005)  # Faster game loop
+        with profiler.span("sleep"):
+            time.sleep(0.005)  # Faster game loop
+        profiler.end_frame()
+        frame += 1
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pong on the SSD1306 OLED")
+    add_profile_arguments(parser, "pong.folded")
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
     try:
         oled = OLED()
-        main(oled)
+        main(oled, profiler, profile_frames(args))
+        finish_profile(profiler, args)
     except Exception as e:
         print(e)
     finally:
@@ -1,7 +1,10 @@
+import argparse
 import time
 from ctypes import *
 import random
 
+from frame_profiler import NULL_PROFILER, add_profile_arguments, finish_profile, profile_frames, profiler_from_args
+
 # Load the CH347 DLL
 ch347_dll = windll.LoadLibrary("CH347DLLA64.dll")
 
@@ -30,7 +33,14 @@ class OLED:
         self.pages = self.height // 8
 
         # Create a buffer for the display
-        self.buffer = [0x00] * (self.width * self.pages)
+        self.buffer = bytearray(self.width * self.pages)
+        self.blank = bytearray(self.width * self.pages)
+
+        # Packets and page views are allocated once and reused every frame
+        self.cmd_packet = (c_byte * 3)(self.dev_addr << 1, 0x00)  # Address with write flag, command mode
+        self.data_packet = (c_byte * (self.width + 2))(self.dev_addr << 1, 0x40)  # Data mode
+        self.page_views = [memoryview(self.buffer)[page * self.width:(page + 1) * self.width]
+                           for page in range(self.pages)]
 
         # Open the USB device
         if ch347_dll.CH347OpenDevice(self.usb_id) != -1:
@@ -44,28 +54,24 @@ class OLED:
         print("USB CH347 Device Closed.")
 
     def write_command(self, command):
-        # Prepare the command buffer
-        cmd = (c_byte * 3)()
-        cmd[0] = self.dev_addr << 1  # I2C device address with write flag
-        cmd[1] = 0x00  # Command mode
-        cmd[2] = command  # Actual command
+        # Only the command byte of the packet changes
+        self.cmd_packet[2] = command
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, cmd, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, self.cmd_packet, 0, None)
         if result != 1:
             raise Exception(f"Failed to send command: {hex(command)}")
 
     def write_data(self, data):
-        # Prepare data buffer
-        data_packet = (c_byte * (len(data) + 2))()
-        data_packet[0] = self.dev_addr << 1  # I2C device address with write flag
-        data_packet[1] = 0x40  # Data mode
-
-        for i in range(len(data)):
-            data_packet[i + 2] = data[i]
+        # Copy into the data packet behind its header, growing it only for
+        # a longer write
+        length = len(data) + 2
+        if length > len(self.data_packet):
+            self.data_packet = (c_byte * length)(self.dev_addr << 1, 0x40)
+        self.data_packet[2:length] = data
 
         # Perform the I2C write operation
-        result = ch347_dll.CH347StreamI2C(self.usb_id, len(data_packet), data_packet, 0, None)
+        result = ch347_dll.CH347StreamI2C(self.usb_id, length, self.data_packet, 0, None)
         if result != 1:
             raise Exception("Failed to write data to OLED")
 
@@ -109,8 +115,8 @@ class OLED:
             print(f"Initialization error: {e}")
 
     def clear_display(self):
-        # Clear the buffer
-        self.buffer = [0x00] * (self.width * self.pages)
+        # Clear the buffer in place
+        self.buffer[:] = self.blank
 
     def draw_pixel(self, x, y, color=1):
         if x < 0 or x >= self.width or y < 0 or y >= self.height:
@@ -188,21 +194,21 @@ class OLED:
             self.write_command(0xB0 + page)  # Set page address
             self.write_command(0x00)         # Set lower column address
             self.write_command(0x10)         # Set higher column address
-            start = page * self.width
-            self.write_data(self.buffer[start:start + self.width])
+            self.write_data(self.page_views[page])
 
 class SpaceInvadersGame:
     def __init__(self, oled):
         self.oled = oled
+        self.spare_bullets = []  # Retired [x, y] bullets, reused by spawn_bullet
         self.reset_game()
 
     def reset_game(self):
         self.player_x = screen_width // 2 - player_width // 2
         self.player_y = screen_height - player_height - 1
-        self.bullets = []  # Player bullets
+        self.bullets = []  # Player bullets, [x, y] lists moved in place
         self.enemy_bullets = []  # Enemy bullets
         self.enemies = [
-            (x * (enemy_width + 3), y * (enemy_height + 3))
+            [x * (enemy_width + 3), y * (enemy_height + 3)]
             for y in range(enemy_rows)
             for x in range(num_enemies // enemy_rows)
         ]
@@ -216,8 +222,14 @@ class SpaceInvadersGame:
     def move_player(self):
         # Move player towards the most threatening enemy
         if self.enemies:
-            # Choose enemy based on distance and potential threat
-            target_enemy = min(self.enemies, key=lambda e: (abs(e[0] - self.player_x), -e[1]))
+            # Choose enemy based on distance and potential threat: nearest
+            # column first, then the lowest enemy
+            target_enemy = self.enemies[0]
+            for enemy in self.enemies:
+                distance = abs(enemy[0] - self.player_x)
+                target_distance = abs(target_enemy[0] - self.player_x)
+                if distance < target_distance or (distance == target_distance and enemy[1] > target_enemy[1]):
+                    target_enemy = enemy
             if self.player_x < target_enemy[0]:
                 self.player_x += player_speed
             elif self.player_x > target_enemy[0]:
@@ -230,30 +242,47 @@ class SpaceInvadersGame:
         # Fire a bullet from the player's position if enough time has passed
         current_time = time.time()
         if len(self.bullets) < 3 and (current_time - self.player_last_fire_time > player_fire_rate):
-            self.bullets.append((self.player_x + player_width // 2, self.player_y))
+            self.spawn_bullet(self.bullets, self.player_x + player_width // 2, self.player_y)
             self.player_last_fire_time = current_time
 
+    def spawn_bullet(self, bullets, x, y):
+        # Reuse a retired bullet's list when there is one
+        if self.spare_bullets:
+            bullet = self.spare_bullets.pop()
+            bullet[0] = x
+            bullet[1] = y
+        else:
+            bullet = [x, y]
+        bullets.append(bullet)
+
     def move_bullets(self):
-        # Move player bullets
-        self.bullets = [(x, y - bullet_speed) for x, y in self.bullets if y > 0]
+        # Move player bullets in place, retiring those past the top
+        kept = 0
+        for bullet in self.bullets:
+            if bullet[1] > 0:
+                bullet[1] -= bullet_speed
+                self.bullets[kept] = bullet
+                kept += 1
+            else:
+                self.spare_bullets.append(bullet)
+        del self.bullets[kept:]
 
     def move_enemies(self):
         # Move enemies horizontally
         edge_hit = False  # Track if any enemy hits an edge
 
-        for i in range(len(self.enemies)):
-            x, y = self.enemies[i]
-            x += self.enemy_direction * enemy_speed
-            self.enemies[i] = (x, y)
+        for enemy in self.enemies:
+            enemy[0] += self.enemy_direction * enemy_speed
 
             # Check for edge hit
-            if x <= 0 or x >= screen_width - enemy_width:
+            if enemy[0] <= 0 or enemy[0] >= screen_width - enemy_width:
                 edge_hit = True
 
         # If any enemy hits an edge, change direction and move all down
         if edge_hit:
             self.enemy_direction *= -1
-            self.enemies = [(ex, ey + enemy_drop_speed) for ex, ey in self.enemies]
+            for enemy in self.enemies:
+                enemy[1] += enemy_drop_speed
 
         # Randomly change direction to make the game less predictable
         if random.random() < 0.05:  # 5% chance of changing direction
@@ -264,12 +293,20 @@ class SpaceInvadersGame:
         current_time = time.time()
         if current_time - self.enemy_last_fire_time > enemy_fire_rate:
             shooting_enemy = random.choice(self.enemies)
-            self.enemy_bullets.append((shooting_enemy[0] + enemy_width // 2, shooting_enemy[1] + enemy_height))
+            self.spawn_bullet(self.enemy_bullets, shooting_enemy[0] + enemy_width // 2, shooting_enemy[1] + enemy_height)
             self.enemy_last_fire_time = current_time
 
     def move_enemy_bullets(self):
-        # Move enemy bullets
-        self.enemy_bullets = [(x, y + bullet_speed) for x, y in self.enemy_bullets if y < screen_height]
+        # Move enemy bullets in place, retiring those past the bottom
+        kept = 0
+        for bullet in self.enemy_bullets:
+            if bullet[1] < screen_height:
+                bullet[1] += bullet_speed
+                self.enemy_bullets[kept] = bullet
+                kept += 1
+            else:
+                self.spare_bullets.append(bullet)
+        del self.enemy_bullets[kept:]
 
     def update_game_difficulty(self):
         # Increase difficulty based on elapsed time
@@ -285,20 +322,25 @@ class SpaceInvadersGame:
 
     def check_collisions(self):
         # Check for bullet collisions with enemies
-        new_bullets = []
-        for bx, by in self.bullets:
+        kept = 0
+        for bullet in self.bullets:
+            bx, by = bullet
             hit = False
-            for ex, ey in self.enemies:
+            for enemy in self.enemies:
+                ex, ey = enemy
                 if (
                     ex <= bx <= ex + enemy_width and
                     ey <= by <= ey + enemy_height
                 ):
-                    self.enemies.remove((ex, ey))
+                    self.enemies.remove(enemy)
                     hit = True
                     break
-            if not hit:
-                new_bullets.append((bx, by))
-        self.bullets = new_bullets
+            if hit:
+                self.spare_bullets.append(bullet)
+            else:
+                self.bullets[kept] = bullet
+                kept += 1
+        del self.bullets[kept:]
 
         # Check for enemy bullets hitting the player
         for bx, by in self.enemy_bullets:
@@ -361,15 +403,20 @@ class SpaceInvadersGame:
         self.draw()
         return False
 
-def main():
+def main(profiler=NULL_PROFILER, frames=None):
     oled = OLED()
     game = SpaceInvadersGame(oled)
+    profiler.instrument(game, "update", "move_player", "fire_bullet", "move_bullets", "move_enemies",
+                        "enemy_fire_bullet", "move_enemy_bullets", "update_game_difficulty",
+                        "check_collisions", "draw", "display_message")
+    profiler.instrument(oled, "clear_display", "draw_rect", "draw_text", "update_display")
 
     player_wins = 0
     invader_wins = 0
 
     try:
-        while True:
+        frame = 0
+        while frames is None or frame < frames:
             if game.update():
                 if game.victory:
                     player_wins += 1
@@ -386,9 +433,17 @@ def main():
                 
                 time.sleep(2)  # Pause before restarting
                 game.reset_game()
-            time.sleep(0.02)  # Frame rate control
+            with profiler.span("sleep"):
+                time.sleep(0.02)  # Frame rate control
+            profiler.end_frame()
+            frame += 1
     finally:
         oled.close_device()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Space Invaders on the SSD1306 OLED")
+    add_profile_arguments(parser, "sinvader.folded")
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+    main(profiler, profile_frames(args))
+    finish_profile(profiler, args)
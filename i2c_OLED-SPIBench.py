@@ -0,0 +1,46 @@
+import argparse
+import time
+
+from ch347 import WaveshareI2C
+from ssd1306 import SSD1306, I2CPanel, SPIPanel
+
+# Frame rate of the same SSD1306 framebuffer over I2C and over 4-wire SPI.
+# Run with CH347_SIMULATE=1 to compare the buses on the simulated adapter.
+
+def bench(oled, frames):
+    # A moving bar so every frame differs; returns frames per second
+    start = time.perf_counter()
+    for frame in range(frames):
+        oled.clear_display()
+        oled.draw_rect(frame % oled.width, 0, 8, oled.height)
+        oled.update_display()
+    return frames / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SSD1306 frame rates over I2C and SPI")
+    parser.add_argument("--index", type=int, default=0, help="CH347 adapter index")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--i2c-mode", type=lambda s: int(s, 0), default=0x03,
+                        help="CH347I2C_Set mode (0x03 = 750 kHz)")
+    args = parser.parse_args()
+
+    i2c = WaveshareI2C(args.index, mode=args.i2c_mode)
+    i2c_oled = SSD1306(I2CPanel(i2c))
+    spi = SPIPanel(args.index)
+    spi_oled = SSD1306(spi)
+    try:
+        i2c_fps = bench(i2c_oled, args.frames)
+        calls = spi.usb_transfers
+        spi_fps = bench(spi_oled, args.frames)
+        spi_calls = (spi.usb_transfers - calls) / args.frames
+        print(f"{args.frames} full frames of {len(i2c_oled.buffer)} bytes")
+        print(f"I2C: {i2c_fps:7.1f} fps  (2 DLL calls per frame)")
+        print(f"SPI: {spi_fps:7.1f} fps  ({spi_calls:.0f} DLL calls per frame)")
+        print(f"Speedup: {spi_fps / i2c_fps:.1f}x")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        i2c_oled.close_device()
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,14 @@
-import time
-import datetime
-from ctypes import *
+import argparse
 
-# Load the CH347 DLL
-ch347_dll = windll.LoadLibrary("CH347DLLA64.dll")
+from ch347 import WaveshareI2C
+from ds3231 import DS3231
+from ht16k33 import HT16K33, HT16K33_ADDRESS
+from i2c_coalesce import CoalescingI2C
+from rtc_clock import RTCClock, SQWTicker
 
-# I2C addresses for the DS3231 RTC and OLED display 128x64
-RTC_ADDRESS = 0x68
+# I2C address for the OLED display 128x64
 OLED_ADDRESS = 0x3C  # Verify this address
 
-class WaveshareI2C:
-    def __init__(self, usb_dev=0):
-        self.usb_id = usb_dev
-        if ch347_dll.CH347OpenDevice(self.usb_id) != -1:
-            print("Device Opened Successfully!")
-            self.initialize_i2c()
-        else:
-            raise Exception("Device Open Failed!")
-
-    def initialize_i2c(self):
-        if not ch347_dll.CH347I2C_Set(self.usb_id, 0x20):  # Set I2C speed
-            raise Exception("Failed to initialize I2C")
-
-    def close_device(self):
-        ch347_dll.CH347CloseDevice(self.usb_id)
-        print("Device Closed.")
-
-    def write(self, addr, register, data):
-        # Write to I2C device
-        tcmd = (c_ubyte * 3)()
-        ibuf = (c_ubyte * 1)()
-        tcmd[0] = addr << 1
-        tcmd[1] = register
-        tcmd[2] = data
-        result = ch347_dll.CH347StreamI2C(self.usb_id, 3, tcmd, 0, ibuf)
-        if not result:
-            raise Exception(f"Failed to write to address {hex(addr)}")
-
-    def read(self, addr, register, length):
-        # Read from I2C device
-        tcmd = (c_ubyte * 2)()
-        rbuf = (c_ubyte * length)()
-        tcmd[0] = addr << 1
-        tcmd[1] = register
-        result = ch347_dll.CH347StreamI2C(self.usb_id, 2, tcmd, length, rbuf)
-        if not result:
-            raise Exception(f"Failed to read from address {hex(addr)}")
-        return rbuf
-
-class DS3231:
-    def __init__(self, i2c, address=RTC_ADDRESS):
-        self.i2c = i2c
-        self.address = address
-
-    def read_time(self):
-        data = self.i2c.read(self.address, 0x00, 7)
-        seconds = self.bcd_to_dec(data[0] & 0x7F)
-        minutes = self.bcd_to_dec(data[1])
-        hours = self.bcd_to_dec(data[2] & 0x3F)
-        day_of_week = self.bcd_to_dec(data[3])
-        day_of_month = self.bcd_to_dec(data[4])
-        month = self.bcd_to_dec(data[5] & 0x1F)
-        year = self.bcd_to_dec(data[6]) + 2000
-        return datetime.datetime(year, month, day_of_month, hours, minutes, seconds), day_of_week
-
-    @staticmethod
-    def bcd_to_dec(bcd):
-        return (bcd // 16 * 10) + (bcd % 16)
-
-    @staticmethod
-    def dec_to_bcd(dec):
-        return (dec // 10 * 16) + (dec % 10)
-
 class OLED:
     def __init__(self, i2c, address=OLED_ADDRESS):
         self.i2c = i2c
@@ -144,17 +81,34 @@ class OLED:
                 self.i2c.write(self.address, 0x40, byte)
 
 def main():
+    parser = argparse.ArgumentParser(description="DS3231 clock on a 128x32 OLED")
+    parser.add_argument("--sqw-pin", type=int, help="CH347 GPIO wired to DS3231 INT/SQW: tick from the hardware edge")
+    parser.add_argument("--alarm", action="store_true", help="use the once-per-second alarm interrupt instead of the 1 Hz square wave")
+    parser.add_argument("--coalesce", action="store_true", help="merge the OLED's single-byte writes into batched transactions")
+    parser.add_argument("--segment", nargs="?", const=HT16K33_ADDRESS, type=lambda s: int(s, 0), metavar="ADDRESS",
+                        help="also show HH:MM on an HT16K33 7-segment backpack (default address 0x70)")
+    args = parser.parse_args()
+
     try:
         i2c_interface = WaveshareI2C()
-        rtc = DS3231(i2c_interface)
-        oled = OLED(i2c_interface)
+        # With --coalesce every device goes through the coalescer: its flush
+        # thread and the RTC, 7-segment and SQW pin calls then share its lock,
+        # and reads see the OLED writes queued before them
+        oled_bus = CoalescingI2C(i2c_interface, addresses=(OLED_ADDRESS,)) if args.coalesce else i2c_interface
+        rtc = DS3231(oled_bus)
+        oled = OLED(oled_bus)
+        segment = HT16K33(oled_bus, args.segment) if args.segment is not None else None
+        if args.sqw_pin is not None:
+            clock = SQWTicker(rtc, oled_bus, pin=args.sqw_pin, mode="alarm" if args.alarm else "sqw")
+        else:
+            clock = RTCClock(rtc)
 
         prev_time_str = ""
         prev_date_str = ""
         prev_day_str = ""
 
         while True:
-            now, day_of_week = rtc.read_time()
+            now, day_of_week = clock.read_time()
             date_str = now.strftime("%m/%d/%Y")
             time_str = now.strftime("%H:%M:%S")
             day_str = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"][day_of_week - 1]
@@ -172,11 +126,24 @@ def main():
                 oled.draw_text(date_str, 0, 2)
                 prev_date_str = date_str
 
-            time.sleep(1)
+            if segment is not None:
+                # Colon on for even seconds: most ticks send just its byte
+                segment.print_time(now.hour, now.minute, colon=now.second % 2 == 0)
+                segment.update_dirty()
+
+            clock.wait_next_second()
 
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
+        if 'oled_bus' in locals() and oled_bus is not i2c_interface:
+            try:
+                oled_bus.barrier()
+            except Exception as e:
+                print(f"Coalesced write failed: {e}")
+            print(f"Write coalescing: {oled_bus.stats()}")
+        if 'segment' in locals() and segment is not None:
+            print(f"7-segment: {segment.frames} updates, {segment.bytes_sent} RAM bytes sent")
         if 'i2c_interface' in locals():
             i2c_interface.close_device()
 
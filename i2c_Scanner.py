@@ -1,36 +1,58 @@
+import argparse
+import contextlib
 import ctypes
+import datetime
+import json
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_ADAPTERS = 16  # The CH347 DLL supports device indices 0-15
+
+# Devices identified by a register read rather than by address alone
+DS3231_ADDRESS = 0x68
+DHT12_ADDRESS = 0x5C
+SSD1306_ADDRESSES = (0x3C, 0x3D)
+AT24C32_ADDRESS = 0x57  # EEPROM on DS3231 modules
+HT16K33_ADDRESS = 0x70
+
+ch347_dll = None
+
+def load_dll(simulate=0):
+    global ch347_dll
+    if simulate:
+        from ch347_sim import SimulatedCH347, default_devices
+        ch347_dll = SimulatedCH347([default_devices() for _ in range(simulate)])
+    else:
+        # Load the Windows DLL for the CH347 device
+        dll_path = os.path.join(os.getcwd(), 'CH347DLLA64.DLL')  # Ensure the correct path
+        ch347_dll = ctypes.windll.LoadLibrary(dll_path)
+
+    # Define argument types and return types for the DLL functions
+    ch347_dll.CH347OpenDevice.argtypes = [ctypes.c_uint]
+    ch347_dll.CH347OpenDevice.restype = ctypes.c_int
+
+    ch347_dll.CH347CloseDevice.argtypes = [ctypes.c_uint]
+    ch347_dll.CH347CloseDevice.restype = None
+
+    ch347_dll.CH347StreamI2C.argtypes = [
+        ctypes.c_uint, ctypes.c_uint,
+        ctypes.POINTER(ctypes.c_ubyte), ctypes.c_uint,
+        ctypes.POINTER(ctypes.c_ubyte)
+    ]
+    ch347_dll.CH347StreamI2C.restype = ctypes.c_int
+
+    ch347_dll.CH347StreamI2C_RetACK.argtypes = [
+        ctypes.c_uint,
+        ctypes.c_uint,
+        ctypes.POINTER(ctypes.c_ubyte),
+        ctypes.c_uint,
+        ctypes.POINTER(ctypes.c_ubyte),
+        ctypes.POINTER(ctypes.c_uint),
+    ]
+    ch347_dll.CH347StreamI2C_RetACK.restype = ctypes.c_bool
 
-os.system('cls' if os.name == 'nt' else 'clear')  # Clear the console screen at the beginning
-
-# Load the Windows DLL for the CH347 device
-dll_path = os.path.join(os.getcwd(), 'CH347DLLA64.DLL')  # Ensure the correct path
-ch347_dll = ctypes.windll.LoadLibrary(dll_path)
-
-# Define argument types and return types for the DLL functions
-ch347_dll.CH347OpenDevice.argtypes = [ctypes.c_uint]
-ch347_dll.CH347OpenDevice.restype = ctypes.c_int
-
-ch347_dll.CH347CloseDevice.argtypes = [ctypes.c_uint]
-ch347_dll.CH347CloseDevice.restype = None
-
-ch347_dll.CH347StreamI2C.argtypes = [
-    ctypes.c_uint, ctypes.c_uint,
-    ctypes.POINTER(ctypes.c_ubyte), ctypes.c_uint,
-    ctypes.POINTER(ctypes.c_ubyte)
-]
-ch347_dll.CH347StreamI2C.restype = ctypes.c_int
-
-ch347_dll.CH347StreamI2C_RetACK.argtypes = [
-    ctypes.c_uint, 
-    ctypes.c_uint,
-    ctypes.POINTER(ctypes.c_ubyte), 
-    ctypes.c_uint,
-    ctypes.POINTER(ctypes.c_ubyte),
-    ctypes.POINTER(ctypes.c_uint),
-]
-ch347_dll.CH347StreamI2C_RetACK.restype = ctypes.c_bool
-    
 class USBI2C:
     def __init__(self, usb_dev_index=0):
         self.dev_index = usb_dev_index
@@ -48,44 +70,163 @@ class USBI2C:
             ch347_dll.CH347CloseDevice(self.dev_index)
             print(f"Closed device at index: {self.dev_index}")
 
-    def scan_i2c_bus(self):
-        print("Scanning I2C bus...")
-        grid = [['  ' for _ in range(16)] for _ in range(8)]
+    def probe(self, address, payload=()):
+        # Returns the number of acknowledged bytes (address byte included)
+        write_buffer = (ctypes.c_ubyte * (1 + len(payload)))(address << 1, *payload)
+        read_buffer = (ctypes.c_ubyte * 1)()
+        ack_num = ctypes.c_ulong()
+        result = ch347_dll.CH347StreamI2C_RetACK(self.dev_index, len(write_buffer), write_buffer, 0, read_buffer, ctypes.byref(ack_num))
+        return ack_num.value if result == 1 else 0
+
+    def read_registers(self, address, register, length):
+        write_buffer = (ctypes.c_ubyte * 2)(address << 1, register)
+        read_buffer = (ctypes.c_ubyte * length)()
+        result = ch347_dll.CH347StreamI2C(self.dev_index, 2, write_buffer, length, read_buffer)
+        return bytes(read_buffer) if result == 1 else None
+
+    def read_current(self, address, length):
+        # Read from the device's current address pointer; nothing is written
+        write_buffer = (ctypes.c_ubyte * 1)(address << 1)
+        read_buffer = (ctypes.c_ubyte * length)()
+        result = ch347_dll.CH347StreamI2C(self.dev_index, 1, write_buffer, length, read_buffer)
+        return bytes(read_buffer) if result == 1 else None
+
+    def scan_addresses(self):
         found_devices = []
-
         for address in range(0x0, 0x80):  # Scan I2C address range
-            write_buffer = (ctypes.c_ubyte * 1)(address << 1)  # Address as 7-bit write address
-            read_buffer = (ctypes.c_ubyte * 1)()
-            ack_num = ctypes.c_ulong()
-
             # Attempt to write a dummy command to see if the device acknowledges
-            result = ch347_dll.CH347StreamI2C_RetACK(self.dev_index, 1, write_buffer, 0, read_buffer , ctypes.byref(ack_num))
-
-            if (result == 1) and (ack_num.value != 0):  # Non-zero indicates a device was acknowledged
-                grid[address // 16][address % 16] = '*  '
+            if self.probe(address) != 0:  # Non-zero indicates a device was acknowledged
                 found_devices.append(address)
-            else:
-                grid[address // 16][address % 16] = '-  '            
-
-        print("\nI2C Address Grid (marked with * where devices are found):")
-        print("    " + "  ".join(f"{x:02X}" for x in range(16)))
-        for i, row in enumerate(grid):
-            print(f"{i * 16:02X}: " + " ".join(row))
+        return found_devices
+
+    def fingerprint(self, address):
+        # Minimal reads of known registers to tell devices apart
+        info = {"address": f"0x{address:02X}", "device": "unknown"}
+        if address == DS3231_ADDRESS:
+            regs = self.read_registers(address, 0x0E, 2)  # Control and status
+            # Status bits 4-6 always read as zero on a DS3231
+            if regs is not None and regs[1] & 0x70 == 0:
+                info.update(device="DS3231", control=f"0x{regs[0]:02X}", status=f"0x{regs[1]:02X}",
+                            oscillator_stopped=bool(regs[1] & 0x80))
+        elif address == DHT12_ADDRESS:
+            data = self.read_registers(address, 0x00, 5)
+            if data is not None and sum(data[:4]) & 0xFF == data[4]:
+                info.update(device="DHT12", checksum="ok")
+            elif data is not None:
+                info.update(device="DHT12?", checksum="bad")
+        elif address in SSD1306_ADDRESSES:
+            # Write-only controller: a command byte plus NOP (0xE3) must be fully acknowledged
+            if self.probe(address, (0x00, 0xE3)) == 3:
+                info.update(device="SSD1306", access="ack-only")
+        elif address == AT24C32_ADDRESS:
+            # Two address bytes with no data only set the pointer (no write
+            # cycle starts); the EEPROM then answers a read from 0x0000
+            if self.probe(address, (0x00, 0x00)) == 3:
+                data = self.read_current(address, 1)
+                if data is not None:
+                    info.update(device="AT24C32", first_byte=f"0x{data[0]:02X}")
+        elif address == HT16K33_ADDRESS:
+            # The LED driver answers reads with its 16 bytes of display RAM;
+            # a current-address read leaves the RAM pointer (and any other
+            # chip at 0x70, e.g. an I2C mux) untouched
+            ram = self.read_current(address, 16)
+            if ram is not None:
+                info.update(device="HT16K33", ram=ram.hex())
+        return info
 
-        if found_devices:
-            found_devices_str = ", ".join(f"0x{addr:02X}" for addr in found_devices)
-            print(f"\nFound Device(s) at Address: {found_devices_str}")
+    def scan_i2c_bus(self):
+        print("Scanning I2C bus...")
+        print_grid(self.dev_index, self.scan_addresses())
+
+def print_grid(index, found_devices, file=None):
+    grid = [['-  ' for _ in range(16)] for _ in range(8)]
+    for address in found_devices:
+        grid[address // 16][address % 16] = '*  '
+
+    print(f"\nI2C Address Grid for adapter {index} (marked with * where devices are found):", file=file)
+    print("    " + "  ".join(f"{x:02X}" for x in range(16)), file=file)
+    for i, row in enumerate(grid):
+        print(f"{i * 16:02X}: " + " ".join(row), file=file)
+
+    if found_devices:
+        found_devices_str = ", ".join(f"0x{addr:02X}" for addr in found_devices)
+        print(f"\nFound Device(s) at Address: {found_devices_str}", file=file)
+
+def enumerate_adapters():
+    indices = []
+    for index in range(MAX_ADAPTERS):
+        if ch347_dll.CH347OpenDevice(index) != -1:
+            ch347_dll.CH347CloseDevice(index)
+            indices.append(index)
+    return indices
+
+def scan_adapter(index):
+    # A failing adapter (unplugged mid-scan, open failed) gets an "error"
+    # entry instead of ending the scan of the others
+    start = time.perf_counter()
+    entry = {"index": index, "found": [], "devices": []}
+    try:
+        i2c_device = USBI2C(usb_dev_index=index)
+        try:
+            entry["found"] = i2c_device.scan_addresses()
+            entry["devices"] = [i2c_device.fingerprint(address) for address in entry["found"]]
+        finally:
+            i2c_device.close_device()
+    except Exception as e:
+        entry["error"] = str(e)
+    entry["scan_seconds"] = round(time.perf_counter() - start, 4)
+    return entry
+
+def scan_topology(indices):
+    # ctypes releases the GIL during DLL calls, so adapters are scanned in parallel
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, len(indices))) as pool:
+        adapters = list(pool.map(scan_adapter, indices))
+    return {
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(time.perf_counter() - start, 4),
+        "adapters": adapters,
+    }
 
 def main():
+    parser = argparse.ArgumentParser(description="Scan CH347 adapters for I2C devices")
+    parser.add_argument("--index", type=int, help="scan a single adapter index")
+    parser.add_argument("--json", default="i2c_topology.json", help="topology report path ('-' for stdout)")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N", help="use N simulated adapters")
+    args = parser.parse_args()
+
+    # With --json - stdout carries only the report; everything else goes to stderr
+    to_stdout = args.json == "-"
+    if not to_stdout:
+        os.system('cls' if os.name == 'nt' else 'clear')  # Clear the console screen at the beginning
+
     try:
-        # Initialize the I2C device
-        i2c_device = USBI2C(usb_dev_index=0)  # Adjust the index if necessary
-        i2c_device.scan_i2c_bus()
+        with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+            load_dll(args.simulate)
+            indices = [args.index] if args.index is not None else enumerate_adapters()
+            if not indices:
+                raise Exception("No CH347 adapters found!")
+            report = scan_topology(indices)
+
+            for adapter in report["adapters"]:
+                if "error" in adapter:
+                    print(f"\nAdapter {adapter['index']} failed: {adapter['error']}")
+                    continue
+                print_grid(adapter["index"], adapter["found"])
+                for device in adapter["devices"]:
+                    print(f"  {device['address']}: {device['device']}")
+            print(f"\nScanned {len(indices)} adapter(s) in {report['elapsed_seconds']:.2f} s")
+
+        text = json.dumps(report, indent=2)
+        if to_stdout:
+            print(text)
+        else:
+            with open(args.json, "w") as f:
+                f.write(text)
+            print(f"Topology report written to {args.json}")
 
     except Exception as e:
-        print(f"An error occurred: {e}")
-    finally:
-        i2c_device.close_device()
+        print(f"An error occurred: {e}", file=sys.stderr if to_stdout else sys.stdout)
 
 if __name__ == "__main__":
     main()
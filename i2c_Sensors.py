@@ -0,0 +1,134 @@
+import argparse
+import os
+import threading
+import time
+
+from ch347 import WaveshareI2C
+from dht12 import DHT12
+from ds3231 import DS3231
+from i2c_metrics import InstrumentedI2C, Metrics, MetricsServer
+from rtc_clock import RTCClock
+from sensor_cache import SensorCache
+from sensor_scheduler import PollingScheduler
+from telemetry import TelemetryStore, TelemetryWriter
+
+# DHT12 and DS3231 on one adapter: a single polling scheduler owns the bus
+# cadence and the clock runs from the extrapolated RTC time. Sensor reads go
+# through a SensorCache: the scheduler refreshes each entry on its period
+# (max_age=0), and the Prometheus gauges, read from the metrics server thread
+# or for the textfile, are served from the cache within the refresh period.
+# A scrape after a missed refresh reads the bus itself, and one that arrives
+# while the scheduler is on the bus waits for that read. bus_lock keeps such
+# a read off the adapter while the main thread is using it.
+
+DHT12_PERIOD = 2.0  # DHT12 refresh interval
+RTC_TEMP_PERIOD = 64.0  # DS3231 temperature conversion interval
+RTC_TEMP_TOLERANCE = 8.0
+REPORT_INTERVAL = 30  # Seconds between scheduler reports
+FLUSH_INTERVAL = 60  # Seconds between telemetry file flushes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DHT12 and DS3231 on one adapter")
+    parser.add_argument("--telemetry", metavar="DIR", help="append 1 min rollups to CSV files in DIR")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", help="serve Prometheus metrics on 127.0.0.1:PORT")
+    parser.add_argument("--metrics-file", metavar="PATH", help="write Prometheus metrics to PATH (textfile collector)")
+    args = parser.parse_args()
+
+    dht_store = TelemetryStore(["humidity", "temperature"])
+    rtc_store = TelemetryStore(["temperature"])
+    writers = []
+    if args.telemetry:
+        os.makedirs(args.telemetry, exist_ok=True)
+        writers = [TelemetryWriter(dht_store.ring(60.0), os.path.join(args.telemetry, "dht12_1min.csv")),
+                   TelemetryWriter(rtc_store.ring(60.0), os.path.join(args.telemetry, "ds3231_1min.csv"))]
+
+    bus_lock = threading.Lock()
+
+    def read_dht12():
+        with bus_lock:
+            sample = sensor.sample()
+        if sample is not None:
+            dht_store.append(sample.timestamp, (sample.humidity, sample.temperature))
+            return sample.humidity, sample.temperature
+
+    def read_rtc_temperature():
+        with bus_lock:
+            celsius = rtc.temperature(max_age=0)
+        rtc_store.append(time.time(), (celsius,))
+        return celsius
+
+    cache = SensorCache()
+    cache.register("dht12", read_dht12, DHT12_PERIOD)
+    cache.register("ds3231_temp", read_rtc_temperature, RTC_TEMP_PERIOD)
+
+    def cached_dht12(index):
+        reading = cache.get("dht12")
+        return None if reading is None else reading[index]
+
+    i2c_interface = WaveshareI2C()
+    bus = i2c_interface
+    metrics = server = None
+    if args.metrics_port or args.metrics_file:
+        metrics = Metrics()
+        bus = InstrumentedI2C(i2c_interface, metrics)
+        if args.metrics_port:
+            server = MetricsServer(metrics, args.metrics_port)
+        metrics.gauge("dht12_humidity_percent", "DHT12 relative humidity", lambda: cached_dht12(0))
+        metrics.gauge("dht12_temperature_celsius", "DHT12 temperature", lambda: cached_dht12(1))
+        metrics.gauge("ds3231_temperature_celsius", "DS3231 die temperature", lambda: cache.get("ds3231_temp"))
+    try:
+        rtc = DS3231(bus)
+        sensor = DHT12(bus, retries=1)
+        clock = RTCClock(rtc)
+
+        scheduler = PollingScheduler()
+        scheduler.add("dht12", lambda: cache.get("dht12", max_age=0), DHT12_PERIOD)
+        scheduler.add("ds3231_temp", lambda: cache.get("ds3231_temp", max_age=0), RTC_TEMP_PERIOD,
+                      tolerance=RTC_TEMP_TOLERANCE)
+
+        shown = None
+        ticks = 0
+        while True:
+            scheduler.run_pending()
+            with bus_lock:
+                now, _ = clock.read_time()
+            if now.replace(microsecond=0) != shown:
+                shown = now.replace(microsecond=0)
+                dht = scheduler.value("dht12")
+                rtc_temp = scheduler.value("ds3231_temp")
+                line = shown.strftime("%H:%M:%S")
+                if dht is not None:
+                    line += f"  {dht[0]:.1f} %RH  {dht[1]:.1f} C"
+                if rtc_temp is not None:
+                    line += f"  RTC {rtc_temp:.2f} C"
+                print(line)
+
+                ticks += 1
+                if ticks % REPORT_INTERVAL == 0:
+                    for name, stats in scheduler.report().items():
+                        print(f"  {name}: {stats['achieved_hz']:.3f}/{stats['target_hz']:.3f} Hz, "
+                              f"stale {stats['staleness']} s, late {stats['late']}, errors {stats['errors']}")
+                    for name, stats in cache.stats().items():
+                        print(f"  {name} cache: {stats['bus_reads']} bus reads, "
+                              f"{stats['bus_reads_avoided']} avoided")
+                if ticks % FLUSH_INTERVAL == 0:
+                    for writer in writers:
+                        writer.flush()
+                if args.metrics_file:
+                    metrics.write_textfile(args.metrics_file)
+            time.sleep(min(clock.seconds_to_next_tick(), scheduler.seconds_until_next()))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        for writer in writers:
+            writer.flush()
+        if server is not None:
+            server.close()
+        i2c_interface.close_device()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import time
+
+from ch347 import WaveshareI2C
+from ch347_link import ConnectionManager, DeviceLost
+from dht12 import DHT12, DHT12_MIN_INTERVAL
+from display_trace import Tracer
+from ds3231 import DS3231
+from i2c_retry import RetryingI2C, SPEED_NAMES
+from ssd1306 import SSD1306, I2CPanel
+
+# Status display: time, DHT12 and RTC temperature on a 128x64 OLED. Every
+# displayed value carries a trace from its bus read through formatting and
+# glyph rendering to the flush of its (dirty) page. The adapter sits behind a
+# ConnectionManager: unplugging it drops frames instead of ending the script,
+# and on reconnect the panel is re-initialized with its last frame. On top
+# of it RetryingI2C retries bus faults (NACKs on a long cable) and steps the
+# bus speed down when they exceed the error budget.
+
+TIME_PAGE = 0
+DHT12_PAGE = 3
+RTC_TEMP_PAGE = 5
+REPORT_INTERVAL = 30  # Seconds between latency reports
+
+def print_link_status(event, outage):
+    if event == "lost":
+        print("Adapter lost, reconnecting")
+    else:
+        print(f"Adapter back after {outage.duration():.2f} s, "
+              f"{outage.attempts} attempts, {outage.lost} operations lost")
+
+def render(oled, trace, page, text, pending):
+    with trace.span("render"):
+        oled.draw_text(text.ljust(21), 0, page)
+    pending.setdefault(page, []).append(trace)
+
+def flush(oled, tracer, pending):
+    # One dirty-page flush closes every trace waiting on a page
+    start = tracer.clock()
+    dirty = oled.update_dirty()
+    end = tracer.clock()
+    for page, traces in pending.items():
+        for trace in traces:
+            if page in dirty:
+                trace.add_span("flush", start, end)
+                trace.finish("flushed")
+            else:
+                trace.finish("unchanged")
+    pending.clear()
+
+def print_report(tracer):
+    for name in ("time", "dht12", "rtc_temp"):
+        stats = tracer.percentiles(name)
+        if stats["count"]:
+            print(f"  {name}: sensor-to-display p50 {stats['p50']:.2f} ms, p99 {stats['p99']:.2f} ms "
+                  f"({stats['count']} updates)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensor status display with sensor-to-display latency tracing")
+    parser.add_argument("--trace-json", metavar="PATH", help="write the traces to PATH on exit")
+    parser.add_argument("--seconds", type=int, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    tracer = Tracer()
+    link = ConnectionManager(WaveshareI2C)
+    link.on_status(print_link_status)
+    i2c_interface = RetryingI2C(link)
+    lost_frames = 0
+    downgrades = 0
+    try:
+        rtc = DS3231(i2c_interface)
+        sensor = DHT12(i2c_interface, retries=1)
+        oled = SSD1306(I2CPanel(i2c_interface))
+        link.on_reconnect(oled.restore)
+        pending = {}
+        started = time.monotonic()
+        next_dht = started
+        next_report = started + REPORT_INTERVAL
+
+        while args.seconds is None or time.monotonic() - started < args.seconds:
+            try:
+                time_trace = tracer.start("time")
+                temp_trace = tracer.start("rtc_temp")
+                with time_trace.span("read"):
+                    now, _ = rtc.read_time()  # The burst also refreshes the temperature
+                temp_trace.add_span("read", *time_trace.spans[-1][1:])
+                with time_trace.span("format"):
+                    time_text = now.strftime("%H:%M:%S")
+                render(oled, time_trace, TIME_PAGE, time_text, pending)
+                with temp_trace.span("format"):
+                    temp_text = f"RTC {rtc.temperature():.2f}C"
+                render(oled, temp_trace, RTC_TEMP_PAGE, temp_text, pending)
+
+                if time.monotonic() >= next_dht:
+                    next_dht += DHT12_MIN_INTERVAL
+                    trace = tracer.start("dht12")
+                    with trace.span("read"):
+                        reading = sensor.read()
+                    if reading is None:
+                        trace.finish("failed")
+                    else:
+                        with trace.span("format"):
+                            text = f"{reading[1]:.1f}C {reading[0]:.1f}%RH"
+                        render(oled, trace, DHT12_PAGE, text, pending)
+
+                flush(oled, tracer, pending)
+            except DeviceLost:
+                lost_frames += 1
+                for traces in pending.values():
+                    for trace in traces:
+                        trace.finish("lost")
+                pending.clear()
+
+            for _, mode in i2c_interface.downgrades[downgrades:]:
+                print(f"I2C error budget exceeded, bus speed down to {SPEED_NAMES[mode & 0x03]}")
+            downgrades = len(i2c_interface.downgrades)
+            if time.monotonic() >= next_report:
+                next_report += REPORT_INTERVAL
+                print_report(tracer)
+            time.sleep(1.0 - time.time() % 1.0)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        print_report(tracer)
+        stats = link.stats()
+        if stats["outages"]:
+            print(f"{stats['outages']} adapter outages, mean time to recover {stats['mttr']:.2f} s, "
+                  f"{lost_frames} frames lost")
+        stats = i2c_interface.stats()
+        retries = sum(counts["retries"] for counts in stats["classes"].values())
+        if retries:
+            print(f"{retries} bus retries, {stats['recoveries']} recoveries, "
+                  f"{stats['downgrades']} speed downgrades, bus at {stats['speed']}")
+        if args.trace_json:
+            count = tracer.export_json(args.trace_json)
+            print(f"{count} traces written to {args.trace_json}")
+        i2c_interface.close_device()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import threading
+import time
+
+# Opt-in write coalescing for the CH347 transport. Consecutive writes to the
+# same device and control prefix (SSD1306 0x00 command / 0x40 data streams)
+# are merged into one transaction, Nagle style: the run is sent when it
+# reaches max_bytes, when max_delay has passed since its first write, when
+# the address or prefix changes, or on any read or explicit barrier().
+#
+# Only enable it for addresses whose prefix byte is a control byte: on
+# register devices such as the DS3231 two writes to "register 0x00" must not
+# become one write to 0x00 and 0x01.
+#
+# The background flusher shares the adapter with the caller, so every call
+# on the transport, passthroughs included, is made under one lock: route all
+# of a script's traffic through the CoalescingI2C, not only the display's.
+# Bus operations are ordering points and send the pending run first; GPIO
+# calls (UNORDERED) only take the lock, so polling a pin every few ms does
+# not break up runs.
+#
+# A run is only dropped once its write succeeded. If the background flush
+# fails, the run stays pending and the exception is raised from the caller's
+# next write, read, barrier() or close_device(); the flush after that
+# resends the run.
+
+MAX_BYTES = 512
+MAX_DELAY = 0.002  # Seconds a write may wait for company
+UNORDERED = ("gpio_get", "gpio_set")  # Passthroughs that do not flush the pending run
+
+class CoalescingI2C:
+    def __init__(self, i2c, addresses, prefixes=(0x00, 0x40), max_bytes=MAX_BYTES, max_delay=MAX_DELAY):
+        self.i2c = i2c
+        self.addresses = set(addresses)
+        self.prefixes = set(prefixes)
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.lock = threading.Condition()
+        self.pending_key = None
+        self.pending = bytearray()
+        self.pending_since = None  # Enqueue time of the oldest pending write
+        self.pending_time_sum = 0.0  # Sum of the pending writes' enqueue times
+        self.pending_writes = 0
+        self.error = None  # Exception from a background flush, not yet reported
+        self.writes = 0
+        self.transactions = 0
+        self.total_delay = 0.0
+        self.max_added = 0.0
+        self.closed = False
+        self.flusher = threading.Thread(target=self.flush_expired, daemon=True)
+        self.flusher.start()
+
+    # --- WaveshareI2C interface -------------------------------------------
+
+    def write(self, addr, register, data):
+        self.write_block(addr, register, (data,))
+
+    def write_block(self, addr, register, data):
+        if addr not in self.addresses or register not in self.prefixes:
+            with self.lock:
+                self.check_error()
+                self.flush_locked()
+                self.i2c.write_block(addr, register, data)
+            return
+        with self.lock:
+            self.check_error()
+            key = (addr, register)
+            if key != self.pending_key or len(self.pending) + len(data) > self.max_bytes:
+                self.flush_locked()
+            now = time.perf_counter()
+            if self.pending_key is None:
+                self.pending_key = key
+                self.pending_since = now
+                self.lock.notify()
+            self.pending += bytes(data)
+            self.pending_time_sum += now
+            self.pending_writes += 1
+            self.writes += 1
+
+    def read(self, addr, register, length):
+        with self.lock:
+            self.check_error()
+            self.flush_locked()
+            return self.i2c.read(addr, register, length)
+
+    def write_read(self, addr, data, length=0):
+        with self.lock:
+            self.check_error()
+            self.flush_locked()
+            return self.i2c.write_read(addr, data, length)
+
+    def transfer(self, ops, packed=True):
+        with self.lock:
+            self.check_error()
+            self.flush_locked()
+            return self.i2c.transfer(ops, packed)
+
+    def barrier(self):
+        with self.lock:
+            self.check_error()
+            self.flush_locked()
+
+    def close_device(self):
+        try:
+            with self.lock:
+                self.check_error()
+                self.flush_locked()
+        finally:
+            with self.lock:
+                self.closed = True
+                self.lock.notify()
+            self.i2c.close_device()
+
+    def __getattr__(self, name):
+        # Everything else (GPIO, probe, stream_ack, ...) goes to the transport
+        # under the lock; attributes such as mode are read as they are
+        attr = getattr(self.i2c, name)
+        if not callable(attr):
+            return attr
+        def call(*args):
+            with self.lock:
+                self.check_error()
+                if name not in UNORDERED:
+                    self.flush_locked()
+                return attr(*args)
+        return call
+
+    # --- Coalescing ---------------------------------------------------------
+
+    def check_error(self):
+        # Report a failed background flush once; its run is still pending
+        error = self.error
+        if error is not None:
+            self.error = None
+            self.lock.notify()
+            raise error
+
+    def flush_locked(self):
+        if self.pending_key is None:
+            return
+        addr, register = self.pending_key
+        now = time.perf_counter()
+        self.i2c.write_block(addr, register, self.pending)
+        # Sent: each write waited from its own enqueue time
+        self.total_delay += self.pending_writes * now - self.pending_time_sum
+        self.max_added = max(self.max_added, now - self.pending_since)
+        self.pending_key = None
+        self.pending = bytearray()
+        self.pending_time_sum = 0.0
+        self.pending_writes = 0
+        self.transactions += 1
+
+    def flush_expired(self):
+        # Background flush once the oldest pending write reaches max_delay
+        with self.lock:
+            while not self.closed:
+                if self.pending_key is None or self.error is not None:
+                    self.lock.wait()  # An unreported failure waits for the caller
+                    continue
+                remaining = self.pending_since + self.max_delay - time.perf_counter()
+                if remaining > 0:
+                    self.lock.wait(remaining)
+                else:
+                    try:
+                        self.flush_locked()
+                    except Exception as e:
+                        self.error = e
+
+    def stats(self):
+        with self.lock:
+            return {
+                "writes": self.writes,
+                "transactions": self.transactions,
+                "coalescing_ratio": round(self.writes / self.transactions, 2) if self.transactions else 0.0,
+                "mean_added_latency_ms": round(self.total_delay / self.writes * 1000, 3) if self.writes else 0.0,
+                "max_added_latency_ms": round(self.max_added * 1000, 3),
+            }
@@ -0,0 +1,168 @@
+import os
+import time
+from ctypes import *
+
+from ch347 import RX_CAPACITY, Delay, whole_ms
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not on Windows; pass ioctl= explicitly there
+
+# Linux i2c-dev transport: /dev/i2c-N through the I2C_RDWR ioctl, with the
+# same interface as ch347.WaveshareI2C so the DS3231, DHT12 and OLED classes
+# run unchanged on gateways where the adapter has a kernel driver. Each
+# I2C_RDWR call carries up to RDWR_MAX_MSGS messages, so transfer() sends a
+# whole batch of operations in one syscall.
+
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+RDWR_MAX_MSGS = 42  # I2C_RDWR_IOCTL_MAX_MSGS in the kernel
+
+class I2CMsg(Structure):
+    _fields_ = [
+        ("addr", c_ushort),
+        ("flags", c_ushort),
+        ("len", c_ushort),
+        ("buf", POINTER(c_ubyte)),
+    ]
+
+class I2CRdwrData(Structure):
+    _fields_ = [
+        ("msgs", POINTER(I2CMsg)),
+        ("nmsgs", c_uint),
+    ]
+
+class LinuxI2C:
+    def __init__(self, bus=1, ioctl=None, opener=os.open, closer=os.close):
+        self.bus = bus
+        self.usb_id = bus  # Same attribute name as WaveshareI2C for logging
+        self.ioctl = ioctl or fcntl.ioctl
+        self.closer = closer
+        self.msgs = (I2CMsg * RDWR_MAX_MSGS)()
+        self.rdwr = I2CRdwrData(cast(self.msgs, POINTER(I2CMsg)), 0)
+        self.tx = (c_ubyte * RX_CAPACITY)()
+        self.rx = (c_ubyte * RX_CAPACITY)()
+        self.rx_view = memoryview(self.rx).cast("B")
+        self.syscalls = 0
+        try:
+            self.fd = opener(f"/dev/i2c-{bus}", os.O_RDWR)
+        except OSError as e:
+            raise Exception(f"Device Open Failed! ({e})")
+        print("Device Opened Successfully!")
+
+    def close_device(self):
+        self.closer(self.fd)
+        print("Device Closed.")
+
+    def submit(self, count):
+        # One I2C_RDWR syscall for the first count entries of self.msgs
+        self.rdwr.nmsgs = count
+        self.syscalls += 1
+        try:
+            self.ioctl(self.fd, I2C_RDWR, self.rdwr)
+        except OSError:
+            return False
+        return True
+
+    def set_msg(self, i, addr, flags, length, buffer, offset):
+        msg = self.msgs[i]
+        msg.addr = addr
+        msg.flags = flags
+        msg.len = length
+        msg.buf = cast(byref(buffer, offset), POINTER(c_ubyte))
+
+    def write(self, addr, register, data):
+        self.write_block(addr, register, (data,))
+
+    def write_block(self, addr, register, data):
+        if len(data) + 1 > RX_CAPACITY:
+            raise Exception(f"Write of {len(data) + 1} bytes exceeds {RX_CAPACITY}")
+        self.tx[0] = register
+        self.tx[1:len(data) + 1] = bytes(data)
+        self.set_msg(0, addr, 0, len(data) + 1, self.tx, 0)
+        if not self.submit(1):
+            raise Exception(f"Failed to write to address {hex(addr)}")
+
+    def read(self, addr, register, length):
+        view = self.write_read(addr, (register,), length)
+        return (c_ubyte * length)(*view)
+
+    def write_read(self, addr, data, length=0):
+        self.tx[:len(data)] = bytes(data)
+        count = 0
+        if data or not length:
+            self.set_msg(count, addr, 0, len(data), self.tx, 0)
+            count += 1
+        if length:
+            self.set_msg(count, addr, I2C_M_RD, length, self.rx, 0)
+            count += 1
+        if not self.submit(count):
+            raise Exception(f"Failed to transfer with address {hex(addr)}")
+        return bytes(self.rx[:length])
+
+    def probe(self, addr):
+        # Zero-length write: only the address byte goes on the bus
+        self.set_msg(0, addr, 0, 0, self.tx, 0)
+        return self.submit(1)
+
+    def stream_ack(self, write_buffer, write_length, read_buffer, read_length):
+        # WaveshareI2C.stream_ack semantics: write_buffer[0] is the 8-bit
+        # address; returns the bytes written on success, -1 on a NACK
+        addr = write_buffer[0] >> 1
+        count = 0
+        if write_length > 1 or not read_length:
+            self.set_msg(count, addr, 0, write_length - 1, write_buffer, 1)
+            count += 1
+        if read_length:
+            self.set_msg(count, addr, I2C_M_RD, read_length, read_buffer, 0)
+            count += 1
+        return write_length if self.submit(count) else -1
+
+    def transfer(self, ops, packed=True):
+        # Same contract as WaveshareI2C.transfer: (addr, write, read) ops and
+        # Delay(ms) entries; returns memoryviews into rx. Packed batches fill
+        # each I2C_RDWR up to RDWR_MAX_MSGS messages; a Delay ends the batch.
+        ops = [(None, b"", 0, whole_ms(op.ms)) if isinstance(op, Delay) else tuple(op) + (0,) for op in ops]
+        total_write = sum(len(op[1]) for op in ops)
+        total_read = sum(op[2] for op in ops)
+        if total_write > RX_CAPACITY or total_read > RX_CAPACITY:
+            raise Exception(f"Vectored transfer exceeds {RX_CAPACITY} bytes")
+        count = 0
+        tx_offset = 0
+        rx_offset = 0
+        for addr, write, read, delay in ops:
+            if addr is None:
+                if count and not self.submit(count):
+                    raise Exception("Vectored I2C transfer failed")
+                count = 0
+                time.sleep(delay / 1000.0)
+                continue
+            needed = (1 if write or not read else 0) + (1 if read else 0)
+            if count + needed > RDWR_MAX_MSGS or (count and not packed):
+                if not self.submit(count):
+                    raise Exception("Vectored I2C transfer failed")
+                count = 0
+            if write or not read:
+                self.tx[tx_offset:tx_offset + len(write)] = bytes(write)
+                self.set_msg(count, addr, 0, len(write), self.tx, tx_offset)
+                tx_offset += len(write)
+                count += 1
+            if read:
+                self.set_msg(count, addr, I2C_M_RD, read, self.rx, rx_offset)
+                rx_offset += read
+                count += 1
+        if count and not self.submit(count):
+            raise Exception("Vectored I2C transfer failed")
+        views = []
+        offset = 0
+        for op in ops:
+            views.append(self.rx_view[offset:offset + op[2]])
+            offset += op[2]
+        return views
+
+    def gpio_set(self, enable, dir_out, data_out):
+        raise Exception("GPIO is not available through i2c-dev")
+
+    def gpio_get(self):
+        raise Exception("GPIO is not available through i2c-dev")
@@ -0,0 +1,304 @@
+import os
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bus and display metrics in Prometheus text format.
+#
+# LatencyHistogram is HDR style: log-linear buckets with SUB_BUCKETS steps per
+# power of two of microseconds (about 6 % resolution from 1 us to minutes),
+# recorded with integer arithmetic into a fixed array. InstrumentedI2C wraps
+# a transport and records latency per operation and address, failures and
+# NACKs, and bytes moved; SSD1306(metrics=...) adds frame-time histograms.
+# gauge() adds a value read at scrape time, e.g. a sensor reading from a
+# SensorCache; gauges are read outside the metrics lock since the read may
+# go to an instrumented bus.
+# Expose with MetricsServer (localhost HTTP) or write_textfile() for the
+# node_exporter textfile collector.
+
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_EXPONENT = 26  # Up to 2**30 us, about 18 minutes
+EXPORT_POWERS = range(SUB_BITS, 25)  # le buckets 16 us ... 16.8 s
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9347
+RATE_WINDOW = 1.0  # Seconds per bytes-per-second gauge sample
+
+def bucket_index(us):
+    if us < SUB_BUCKETS:
+        return us
+    exponent = min(us.bit_length() - SUB_BITS - 1, MAX_EXPONENT - 1)
+    return (exponent + 1) * SUB_BUCKETS + min((us >> exponent) - SUB_BUCKETS, SUB_BUCKETS - 1)
+
+def bucket_upper(index):
+    # Exclusive upper bound of a bucket in microseconds
+    if index < SUB_BUCKETS:
+        return index + 1
+    exponent = index // SUB_BUCKETS - 1
+    return (index % SUB_BUCKETS + SUB_BUCKETS + 1) << exponent
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * (MAX_EXPONENT + 1) * SUB_BUCKETS))
+        self.count = 0
+        self.total_ns = 0
+
+    def record_ns(self, ns):
+        self.counts[bucket_index(ns // 1000)] += 1
+        self.count += 1
+        self.total_ns += ns
+
+    def percentile(self, p):
+        # Upper bound (seconds) of the bucket holding the p-th percentile
+        if not self.count:
+            return 0.0
+        target = max(1, round(self.count * p / 100.0))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return bucket_upper(index) / 1e6
+        return bucket_upper(len(self.counts) - 1) / 1e6
+
+    def cumulative(self):
+        # (le seconds, cumulative count) at power-of-two boundaries, which
+        # coincide with bucket edges so the counts are exact
+        out = []
+        seen = 0
+        index = 0
+        for power in EXPORT_POWERS:
+            edge = 1 << power
+            while index < len(self.counts) and bucket_upper(index) <= edge:
+                seen += self.counts[index]
+                index += 1
+            out.append((edge / 1e6, seen))
+        return out
+
+class RateGauge:
+    # Bytes per second over the last complete RATE_WINDOW
+    def __init__(self):
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.rate = 0.0
+
+    def add(self, nbytes, now):
+        elapsed = now - self.window_start
+        if elapsed >= RATE_WINDOW:
+            self.rate = self.window_bytes / elapsed if elapsed < 2 * RATE_WINDOW else 0.0
+            self.window_start = now
+            self.window_bytes = 0
+        self.window_bytes += nbytes
+
+    def value(self, now):
+        return self.rate if now - self.window_start < 2 * RATE_WINDOW else 0.0
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}      # (op, address) -> LatencyHistogram
+        self.failures = {}     # (op, address) -> count
+        self.nacks = {}        # address -> count
+        self.bytes = {}        # (address, direction) -> count
+        self.rates = {}        # address -> RateGauge
+        self.frames = {}       # display -> LatencyHistogram
+        self.gauges = {}       # name -> (help text, read)
+
+    def record(self, op, address, ns, written=0, read=0):
+        with self.lock:
+            histogram = self.latency.get((op, address))
+            if histogram is None:
+                histogram = self.latency[(op, address)] = LatencyHistogram()
+            histogram.record_ns(ns)
+            self.add_bytes_locked(address, written, read)
+
+    def add_bytes(self, address, written, read):
+        with self.lock:
+            self.add_bytes_locked(address, written, read)
+
+    def add_bytes_locked(self, address, written, read):
+        if written:
+            self.bytes[(address, "write")] = self.bytes.get((address, "write"), 0) + written
+        if read:
+            self.bytes[(address, "read")] = self.bytes.get((address, "read"), 0) + read
+        if not written and not read:
+            return
+        rate = self.rates.get(address)
+        if rate is None:
+            rate = self.rates[address] = RateGauge()
+        rate.add(written + read, time.monotonic())
+
+    def failure(self, op, address):
+        with self.lock:
+            self.failures[(op, address)] = self.failures.get((op, address), 0) + 1
+
+    def nack(self, address):
+        with self.lock:
+            self.nacks[address] = self.nacks.get(address, 0) + 1
+
+    def frame(self, display, ns):
+        with self.lock:
+            histogram = self.frames.get(display)
+            if histogram is None:
+                histogram = self.frames[display] = LatencyHistogram()
+            histogram.record_ns(ns)
+
+    def gauge(self, name, help_text, read):
+        # read() returns the value, or None when there is none to report
+        with self.lock:
+            self.gauges[name] = (help_text, read)
+
+    def render(self):
+        # Prometheus text exposition format 0.0.4
+        now = time.monotonic()
+        lines = []
+        with self.lock:
+            gauges = sorted(self.gauges.items())
+        for name, (help_text, read) in gauges:
+            try:
+                value = read()
+            except Exception:
+                value = None
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            if value is not None:
+                lines.append(f"{name} {value}")
+        with self.lock:
+            lines += histogram_lines("ch347_i2c_latency_seconds", "I2C call latency by operation and address",
+                                     {(("op", op), ("address", addr)): h
+                                      for (op, addr), h in sorted(self.latency.items())})
+            lines += ["# HELP ch347_i2c_failures_total I2C calls that raised or returned failure",
+                      "# TYPE ch347_i2c_failures_total counter"]
+            for (op, addr), n in sorted(self.failures.items()):
+                lines.append(f'ch347_i2c_failures_total{{op="{op}",address="{addr}"}} {n}')
+            lines += ["# HELP ch347_i2c_nacks_total Transfers not acknowledged by the device",
+                      "# TYPE ch347_i2c_nacks_total counter"]
+            for addr, n in sorted(self.nacks.items()):
+                lines.append(f'ch347_i2c_nacks_total{{address="{addr}"}} {n}')
+            lines += ["# HELP ch347_i2c_bytes_total Payload bytes moved",
+                      "# TYPE ch347_i2c_bytes_total counter"]
+            for (addr, direction), n in sorted(self.bytes.items()):
+                lines.append(f'ch347_i2c_bytes_total{{address="{addr}",direction="{direction}"}} {n}')
+            lines += ["# HELP ch347_i2c_bytes_per_second Payload bytes per second over the last window",
+                      "# TYPE ch347_i2c_bytes_per_second gauge"]
+            for addr, rate in sorted(self.rates.items()):
+                lines.append(f'ch347_i2c_bytes_per_second{{address="{addr}"}} {rate.value(now):.1f}')
+            lines += histogram_lines("oled_frame_seconds", "Display flush (update_display) time",
+                                     {(("display", name),): h for name, h in sorted(self.frames.items())})
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Atomic replace so the collector never reads a partial file
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+def histogram_lines(name, help_text, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms.items():
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+        for le, n in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{label_text},le="{le:g}"}} {n}')
+        lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{label_text}}} {histogram.total_ns / 1e9:.9f}")
+        lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
+    return lines
+
+def address_label(addr):
+    return f"0x{addr:02X}"
+
+class InstrumentedI2C:
+    # Transport wrapper (WaveshareI2C, LinuxI2C, ...) that feeds a Metrics
+    def __init__(self, i2c, metrics):
+        self.i2c = i2c
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.i2c, name)
+
+    def timed(self, op, addr, func, args, written, read):
+        label = address_label(addr)
+        start = time.perf_counter_ns()
+        try:
+            result = func(*args)
+        except Exception:
+            self.metrics.failure(op, label)
+            raise
+        self.metrics.record(op, label, time.perf_counter_ns() - start, written, read)
+        return result
+
+    def write(self, addr, register, data):
+        self.write_block(addr, register, (data,))
+
+    def write_block(self, addr, register, data):
+        return self.timed("write_block", addr, self.i2c.write_block, (addr, register, data), len(data) + 1, 0)
+
+    def read(self, addr, register, length):
+        return self.timed("read", addr, self.i2c.read, (addr, register, length), 1, length)
+
+    def write_read(self, addr, data, length=0):
+        return self.timed("write_read", addr, self.i2c.write_read, (addr, data, length), len(data), length)
+
+    def burst_read(self, addr, register, length, count, out=None):
+        return self.timed("burst_read", addr, self.i2c.burst_read, (addr, register, length, count, out),
+                          count, length * count)
+
+    def probe(self, addr):
+        return self.timed("probe", addr, self.i2c.probe, (addr,), 0, 0)
+
+    def stream_ack(self, write_buffer, write_length, read_buffer, read_length):
+        addr = write_buffer[0] >> 1
+        label = address_label(addr)
+        start = time.perf_counter_ns()
+        acks = self.i2c.stream_ack(write_buffer, write_length, read_buffer, read_length)
+        ns = time.perf_counter_ns() - start
+        if acks < 0:
+            self.metrics.failure("stream_ack", label)
+        elif acks < write_length:
+            self.metrics.nack(label)
+            self.metrics.record("stream_ack", label, ns)
+        else:
+            self.metrics.record("stream_ack", label, ns, write_length - 1, read_length)
+        return acks
+
+    def transfer(self, ops, packed=True):
+        # One latency sample for the batch; bytes are attributed per address
+        start = time.perf_counter_ns()
+        try:
+            views = self.i2c.transfer(ops, packed)
+        except Exception:
+            self.metrics.failure("transfer", "batch")
+            raise
+        self.metrics.record("transfer", "batch", time.perf_counter_ns() - start)
+        for op in ops:
+            if len(op) == 3:
+                self.metrics.add_bytes(address_label(op[0]), len(op[1]), op[2])
+        return views
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the console
+
+class MetricsServer:
+    # /metrics on localhost from a daemon thread
+    def __init__(self, metrics, port=METRICS_PORT, host=METRICS_HOST):
+        self.httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.httpd.metrics = metrics
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Metrics on http://{host}:{port}/metrics")
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,219 @@
+import collections
+import time
+from ctypes import c_ubyte
+
+from ch347_link import DeviceLost
+
+# Transport-level retries for marginal buses (long cables, sporadic NACKs).
+# RetryingI2C wraps a transport (WaveshareI2C or a ConnectionManager) with
+# the same API and classes each operation by what a resend costs:
+#   frame - writes to display controllers (FRAME_ADDRESSES): display RAM and
+#           setup commands land the same way twice, so they are sent again
+#   read  - register reads and read transfers; sent again
+#   write - register writes; before a resend the registers are read back,
+#           and if they already hold the data only the ACK was lost and the
+#           write is not repeated (a pointer, FIFO or clear-on-write register
+#           must not see it twice). Writes that cannot be read back, e.g.
+#           packed transfers that write to a register device, get a single
+#           attempt.
+# Between attempts the bus is recovered: CH347I2C_Set is re-issued to reset
+# the adapter's I2C engine, then nine SCL clocks let a slave stuck mid-byte
+# release SDA (a 0xFF address byte, or scl_pin toggled through the GPIOs if
+# SCL is also wired to one). DeviceLost from ch347_link is never retried here.
+#
+# The error budget watches the last BUDGET_WINDOW operations; when more than
+# BUDGET_RATE of them needed a retry the bus speed steps down one notch
+# (750 -> 400 -> 100 -> 20 kHz) and the window starts over. Each step is
+# appended to downgrades as (time, new mode); callers report them.
+
+FRAME_ADDRESSES = (0x3C, 0x3D, 0x70)  # SSD1306, HT16K33
+SPEED_NAMES = {0: "20 kHz", 1: "100 kHz", 2: "400 kHz", 3: "750 kHz"}  # CH347I2C_Set mode bits 0-1
+BUDGET_WINDOW = 200
+BUDGET_MIN_OPS = 50  # Operations seen before the budget is judged
+BUDGET_RATE = 0.05
+
+class RetryPolicy:
+    def __init__(self, attempts=3, backoff_start=0.0, backoff_max=0.05):
+        self.attempts = attempts
+        self.backoff_start = backoff_start  # Seconds before the second attempt, doubled per failure
+        self.backoff_max = backoff_max
+
+def default_policies():
+    return {
+        "frame": RetryPolicy(3),
+        "read": RetryPolicy(3, 0.001),
+        "write": RetryPolicy(3, 0.001),
+    }
+
+class RetryingI2C:
+    def __init__(self, i2c, policies=None, frame_addresses=FRAME_ADDRESSES, scl_pin=None,
+                 budget_window=BUDGET_WINDOW, budget_rate=BUDGET_RATE):
+        self.i2c = i2c
+        self.policies = policies or default_policies()
+        self.frame_addresses = frame_addresses
+        self.scl_pin = scl_pin
+        self.budget_rate = budget_rate
+        self.window = collections.deque(maxlen=budget_window)  # True per operation that failed once
+        self.window_failures = 0
+        self.counts = {name: {"ops": 0, "retries": 0, "verified": 0, "failed": 0} for name in self.policies}
+        self.recoveries = 0
+        self.downgrades = []  # (time, new mode) per speed step
+
+    def __getattr__(self, name):
+        # gpio_get, close_device, ... go straight to the transport
+        return getattr(self.i2c, name)
+
+    def write(self, addr, register, data):
+        self.write_block(addr, register, (data,))
+
+    def write_block(self, addr, register, data):
+        if addr in self.frame_addresses:
+            self.run("frame", lambda: self.i2c.write_block(addr, register, data))
+            return
+        def verify():
+            return bytes(self.i2c.read(addr, register, len(data))) == bytes(data)
+        self.run("write", lambda: self.i2c.write_block(addr, register, data), verify)
+
+    def read(self, addr, register, length):
+        return self.run("read", lambda: self.i2c.read(addr, register, length))
+
+    def write_read(self, addr, data, length=0):
+        op = lambda: self.i2c.write_read(addr, data, length)
+        if length:
+            return self.run("read", op)
+        if addr in self.frame_addresses:
+            return self.run("frame", op)
+        verify = None
+        if len(data) > 1:
+            def verify():
+                return bytes(self.i2c.read(addr, data[0], len(data) - 1)) == bytes(data[1:])
+        return self.run("write", op, verify)
+
+    def probe(self, addr):
+        # A missing device is an answer, not a fault
+        return self.i2c.probe(addr)
+
+    def stream_ack(self, write_buffer, write_length, read_buffer, read_length):
+        # Keeps the -1/short-ACK convention: the last result is returned
+        # once the attempts run out. write_buffer starts with the address byte.
+        if read_length:
+            name = "read"
+        elif write_length and write_buffer[0] >> 1 in self.frame_addresses:
+            name = "frame"
+        else:
+            name = "write"
+        policy = self.policies[name]
+        attempts = 1 if name == "write" else policy.attempts
+        acks = -1
+        for attempt in range(attempts):
+            acks = self.i2c.stream_ack(write_buffer, write_length, read_buffer, read_length)
+            if acks >= write_length:
+                self.record(name, attempt)
+                return acks
+            if attempt < attempts - 1:
+                self.recover()
+                self.pause(policy, attempt)
+        self.record(name, attempts)
+        self.counts[name]["failed"] += 1
+        return acks
+
+    def transfer(self, ops, packed=True):
+        # Resent blindly unless a write goes to a register device; reads
+        # and display writes may land twice
+        transactions = [op for op in ops if not hasattr(op, "ms")]
+        if any(not op[2] and op[0] not in self.frame_addresses for op in transactions):
+            name = "write"
+        elif any(op[2] for op in transactions):
+            name = "read"
+        else:
+            name = "frame"
+        return self.run(name, lambda: self.i2c.transfer(ops, packed), None)
+
+    def burst_read(self, addr, register, length, count, out=None):
+        return self.run("read", lambda: self.i2c.burst_read(addr, register, length, count, out))
+
+    def run(self, name, op, verify=None):
+        policy = self.policies[name]
+        attempts = 1 if name == "write" and verify is None else policy.attempts
+        for attempt in range(attempts):
+            try:
+                result = op()
+            except DeviceLost:
+                raise
+            except Exception:
+                if attempt == attempts - 1:
+                    self.record(name, attempts)
+                    self.counts[name]["failed"] += 1
+                    raise
+                self.recover()
+                if verify is not None and self.verified(verify):
+                    # Landed, only the ACK was lost
+                    self.record(name, attempt + 1)
+                    self.counts[name]["verified"] += 1
+                    return None
+                self.pause(policy, attempt)
+                continue
+            self.record(name, attempt)
+            return result
+
+    def verified(self, verify):
+        try:
+            return verify()
+        except DeviceLost:
+            raise
+        except Exception:
+            return False
+
+    def pause(self, policy, attempt):
+        delay = min(policy.backoff_start * 2 ** attempt, policy.backoff_max)
+        if delay > 0:
+            time.sleep(delay)
+
+    def recover(self):
+        self.recoveries += 1
+        try:
+            self.i2c.initialize_i2c()
+            if self.scl_pin is None:
+                self.i2c.stream_ack((c_ubyte * 1)(0xFF), 1, None, 0)
+            else:
+                mask = 1 << self.scl_pin
+                for _ in range(9):
+                    self.i2c.gpio_set(mask, mask, 0)
+                    self.i2c.gpio_set(mask, mask, mask)
+                self.i2c.gpio_set(mask, 0, 0)  # Release SCL back to the I2C engine
+        except DeviceLost:
+            raise
+        except Exception:
+            pass  # The next attempt tells whether the bus is back
+
+    def record(self, name, retries):
+        self.counts[name]["ops"] += 1
+        self.counts[name]["retries"] += retries
+        failed = retries > 0
+        if len(self.window) == self.window.maxlen and self.window[0]:
+            self.window_failures -= 1
+        self.window.append(failed)
+        self.window_failures += failed
+        if len(self.window) >= min(BUDGET_MIN_OPS, self.window.maxlen) and \
+                self.window_failures > self.budget_rate * len(self.window):
+            self.downgrade()
+
+    def downgrade(self):
+        mode = self.i2c.mode
+        speed = mode & 0x03
+        self.window.clear()
+        self.window_failures = 0
+        if speed == 0:
+            return  # Already at the slowest clock
+        mode = (mode & ~0x03) | (speed - 1)
+        self.i2c.set_mode(mode)
+        self.downgrades.append((time.monotonic(), mode))
+
+    def stats(self):
+        return {
+            "classes": {name: dict(counts) for name, counts in self.counts.items()},
+            "recoveries": self.recoveries,
+            "downgrades": len(self.downgrades),
+            "speed": SPEED_NAMES[self.i2c.mode & 0x03],
+            "error_rate": self.window_failures / len(self.window) if self.window else 0.0,
+        }
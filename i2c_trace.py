@@ -0,0 +1,289 @@
+import argparse
+import atexit
+import collections
+import mmap
+import struct
+import threading
+import time
+from ctypes import *
+
+from ch347 import I2C_STREAM, STM_END, STM_IN, STM_OUT, STM_STO
+
+# Binary trace of the CH347 I2C calls, for post-mortems on field units.
+#
+# TraceRecorder wraps the DLL (set CH347_TRACE=path for ch347.load_dll to do
+# it) and appends one record per CH347StreamI2C, CH347StreamI2C_RetACK,
+# CH347I2C_Set and CH347WriteRead call to an in-memory buffer that is written
+# out in large blocks, so a call costs one struct pack and two buffer copies.
+# A daemon thread also writes the buffer out at most FLUSH_INTERVAL seconds
+# after its oldest record, even if no further calls come; failed calls are
+# written out right away and the rest at interpreter exit, so the calls
+# leading up to an error or a crash reach the file. Calls from several
+# threads (async executors, the coalescer, the metrics server) and the flush
+# thread share one lock.
+#
+# File: MAGIC, wall-clock start time (<d), then records:
+#   RECORD header, write payload (write_len bytes), read payload (read_len bytes)
+# aux holds the mode for I2C_Set and iReadStep for WriteRead.
+
+MAGIC = b"CH7T"
+START = struct.Struct("<d")
+RECORD = struct.Struct("<dBBBHHHi")  # time, op, index, address, aux, write_len, read_len, result
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0  # Seconds a record may wait in the buffer
+
+OP_STREAM = 1
+OP_STREAM_ACK = 2
+OP_SET = 3
+OP_WRITE_READ = 4
+NO_ADDRESS = 0xFF
+
+Record = collections.namedtuple("Record", "time op index address aux write read result")
+
+def _payload(buffer, length):
+    if not length or buffer is None:
+        return b""
+    return memoryview(buffer).cast("B")[:length]
+
+def _deref(ref):
+    target = getattr(ref, "_obj", None)
+    return target if target is not None else ref.contents
+
+class TraceRecorder:
+    def __init__(self, dll, path, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL):
+        self.dll = dll
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.lock = threading.Condition()
+        self.t0 = time.perf_counter()
+        self.buffer = bytearray(MAGIC + START.pack(time.time()))
+        self.file = open(path, "wb")
+        self.pending_since = None  # Time of the oldest record not yet written
+        self.records = 0
+        self.flusher = threading.Thread(target=self.flush_expired, daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    def __getattr__(self, name):
+        # Untraced exports (OpenDevice, GPIO, ...) go straight to the DLL
+        return getattr(self.dll, name)
+
+    def record(self, op, index, address, aux, write, read, result):
+        # A result of 0 (or -1/0 acks for StreamI2C_RetACK) is a failed call
+        now = time.perf_counter()
+        with self.lock:
+            if self.file.closed:
+                return
+            buffer = self.buffer
+            buffer += RECORD.pack(now - self.t0, op, index, address, aux, len(write), len(read), result)
+            buffer += write
+            buffer += read
+            self.records += 1
+            if len(buffer) >= self.flush_bytes or result <= 0:
+                self.flush_locked()
+            elif self.pending_since is None:
+                self.pending_since = now
+                self.lock.notify()
+
+    def flush(self):
+        with self.lock:
+            if not self.file.closed:
+                self.flush_locked()
+
+    def flush_locked(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer = bytearray()
+        self.pending_since = None
+
+    def flush_expired(self):
+        # Background flush once the oldest buffered record is flush_interval old
+        with self.lock:
+            while not self.file.closed:
+                if self.pending_since is None:
+                    self.lock.wait()
+                    continue
+                remaining = self.pending_since + self.flush_interval - time.perf_counter()
+                if remaining > 0:
+                    self.lock.wait(remaining)
+                else:
+                    self.flush_locked()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.flush_locked()
+                self.file.close()
+                self.lock.notify()
+
+    def CH347StreamI2C(self, index, write_length, write_buffer, read_length, read_buffer):
+        result = self.dll.CH347StreamI2C(index, write_length, write_buffer, read_length, read_buffer)
+        write = _payload(write_buffer, write_length)
+        self.record(OP_STREAM, index, write[0] >> 1 if write_length else NO_ADDRESS, 0,
+                    write, _payload(read_buffer, read_length), int(result))
+        return result
+
+    def CH347StreamI2C_RetACK(self, index, write_length, write_buffer, read_length, read_buffer, ack_ref):
+        result = self.dll.CH347StreamI2C_RetACK(index, write_length, write_buffer, read_length, read_buffer, ack_ref)
+        write = _payload(write_buffer, write_length)
+        self.record(OP_STREAM_ACK, index, write[0] >> 1 if write_length else NO_ADDRESS, 0,
+                    write, _payload(read_buffer, read_length), _deref(ack_ref).value if result else -1)
+        return result
+
+    def CH347I2C_Set(self, index, mode):
+        result = self.dll.CH347I2C_Set(index, mode)
+        self.record(OP_SET, index, NO_ADDRESS, mode, b"", b"", int(result))
+        return result
+
+    def CH347WriteRead(self, index, write_length, write_buffer, read_step, read_times, read_length_ref, read_buffer):
+        result = self.dll.CH347WriteRead(index, write_length, write_buffer, read_step, read_times,
+                                         read_length_ref, read_buffer)
+        read_length = _deref(read_length_ref).value
+        self.record(OP_WRITE_READ, index, NO_ADDRESS, read_step,
+                    _payload(write_buffer, write_length), _payload(read_buffer, read_length), int(result))
+        return result
+
+class TraceReader:
+    # Iterates a trace through mmap without loading it into memory
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:4] != MAGIC:
+            raise ValueError(f"{path} is not a CH347 trace")
+        (self.start,) = START.unpack_from(self.map, 4)
+
+    def __iter__(self):
+        offset = 4 + START.size
+        end = len(self.map)
+        while offset + RECORD.size <= end:
+            t, op, index, address, aux, wlen, rlen, result = RECORD.unpack_from(self.map, offset)
+            offset += RECORD.size
+            write = self.map[offset:offset + wlen]
+            read = self.map[offset + wlen:offset + wlen + rlen]
+            offset += wlen + rlen
+            yield Record(t, op, index, address, aux, write, read, result)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+def stream_transactions(packet):
+    # (address, bytes on the bus) for each transaction in a WriteRead stream packet
+    transactions = []
+    current = None
+    i = 1 if packet and packet[0] == I2C_STREAM else 0
+    while i < len(packet):
+        cmd = packet[i]
+        i += 1
+        if cmd == STM_END:
+            break
+        if cmd == STM_STO:
+            current = None  # A repeated start stays in the same transaction
+        elif cmd & 0xC0 == STM_OUT:
+            n = cmd & 0x3F
+            if current is None and n:
+                current = [packet[i] >> 1, 0]
+                transactions.append(current)
+            if current is not None:
+                current[1] += n
+            i += n
+        elif cmd & 0xC0 == STM_IN and current is not None:
+            current[1] += max(cmd & 0x3F, 1)
+    return [tuple(t) for t in transactions]
+
+def analyze(path):
+    # Per address: transactions and bus bytes in each whole second of the trace
+    per_second = collections.defaultdict(lambda: collections.defaultdict(lambda: [0, 0]))
+    reader = TraceReader(path)
+    last = 0.0
+    try:
+        for rec in reader:
+            last = rec.time
+            if rec.op == OP_WRITE_READ:
+                transactions = stream_transactions(rec.write)
+            elif rec.op in (OP_STREAM, OP_STREAM_ACK) and rec.address != NO_ADDRESS:
+                transactions = [(rec.address, len(rec.write) + len(rec.read))]
+            else:
+                continue
+            bucket = per_second[int(rec.time)]
+            for address, nbytes in transactions:
+                bucket[address][0] += 1
+                bucket[address][1] += nbytes
+    finally:
+        reader.close()
+    return per_second, last
+
+def replay(path, dll, max_speed=False, index=None):
+    # Re-drive a trace; returns (calls, result mismatches, read data mismatches)
+    reader = TraceReader(path)
+    ack = c_uint()
+    read_length = c_uint()
+    calls = mismatched = data_mismatched = 0
+    start = time.perf_counter()
+    try:
+        for rec in reader:
+            if not max_speed:
+                delay = start + rec.time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            adapter = rec.index if index is None else index
+            wbuf = (c_ubyte * max(len(rec.write), 1)).from_buffer_copy(bytes(rec.write) or b"\x00")
+            rbuf = (c_ubyte * max(len(rec.read), 1))()
+            if rec.op == OP_STREAM:
+                result = int(dll.CH347StreamI2C(adapter, len(rec.write), wbuf, len(rec.read), rbuf))
+            elif rec.op == OP_STREAM_ACK:
+                ok = dll.CH347StreamI2C_RetACK(adapter, len(rec.write), wbuf, len(rec.read), rbuf, byref(ack))
+                result = ack.value if ok else -1
+            elif rec.op == OP_SET:
+                result = int(dll.CH347I2C_Set(adapter, rec.aux))
+            elif rec.op == OP_WRITE_READ:
+                step = rec.aux or 1
+                result = int(dll.CH347WriteRead(adapter, len(rec.write), wbuf, step, len(rec.read) // step,
+                                                byref(read_length), rbuf))
+            else:
+                continue
+            calls += 1
+            if result != rec.result:
+                mismatched += 1
+            elif rec.read and bytes(rbuf[:len(rec.read)]) != bytes(rec.read):
+                data_mismatched += 1
+    finally:
+        reader.close()
+    return calls, mismatched, data_mismatched
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze or replay a CH347 I2C trace (record with CH347_TRACE=path)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("analyze", help="transactions and bytes per address per second")
+    p.add_argument("trace")
+    p.add_argument("--per-second", action="store_true", help="print every second, not just totals")
+    p = sub.add_parser("replay", help="re-drive the trace against an adapter")
+    p.add_argument("trace")
+    p.add_argument("--max-speed", action="store_true", help="ignore the recorded timing")
+    p.add_argument("--index", type=int, default=None, help="replay every call on this adapter")
+    args = parser.parse_args()
+
+    if args.command == "analyze":
+        per_second, duration = analyze(args.trace)
+        totals = collections.defaultdict(lambda: [0, 0])
+        for second in sorted(per_second):
+            for address, (count, nbytes) in sorted(per_second[second].items()):
+                totals[address][0] += count
+                totals[address][1] += nbytes
+                if args.per_second:
+                    print(f"{second:6d}s  0x{address:02X}  {count:6d} transactions  {nbytes:8d} bytes")
+        duration = max(duration, 1e-9)
+        print(f"Trace length {duration:.3f} s")
+        for address, (count, nbytes) in sorted(totals.items()):
+            print(f"0x{address:02X}: {count:7d} transactions ({count / duration:8.1f}/s), "
+                  f"{nbytes:9d} bytes ({nbytes / duration:9.1f} B/s)")
+    else:
+        from ch347 import load_dll
+        started = time.perf_counter()
+        calls, mismatched, data_mismatched = replay(args.trace, load_dll(), args.max_speed, args.index)
+        print(f"Replayed {calls} calls in {time.perf_counter() - started:.3f} s: "
+              f"{mismatched} result mismatches, {data_mismatched} read data mismatches")
+
+if __name__ == "__main__":
+    main()
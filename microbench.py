@@ -0,0 +1,303 @@
+import argparse
+import contextlib
+import ctypes
+import gc
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Microbenchmarks for the framebuffer, rendering and packet-packing
+# primitives of the OLED scripts and shared drivers. The device is never
+# touched: scripts are loaded as modules and their DLL handle is replaced by
+# NullCH347, so write_data / update_display measure only the Python packing.
+#
+# Timing: the inner loop count is calibrated to MIN_TIME, then WARMUP seconds
+# of warmup and REPEATS timed runs with the GC disabled; the fastest run
+# gives ops/s (slower runs are other processes, not the code). "peak B/op"
+# is the tracemalloc peak during one call, i.e. the transient memory an
+# operation allocates; "net blk/op" is the mean change of
+# sys.getallocatedblocks per call (blocks the operation leaves allocated).
+# CPython keeps no gross allocation counter readable from Python, so a
+# temporary freed within the call shows up only in the bytes. --save
+# writes the results as the baseline, --check fails when an op is more than --tolerance slower. The
+# check compares "score", ops/s relative to a fixed pure-Python reference
+# loop: each repeat times the reference and the benchmark back to back for
+# the same duration, and the score is the median of the per-pair ratios, so
+# a slower machine or a busy host does not read as a regression.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "microbench_baseline.json")
+MIN_TIME = 0.01
+WARMUP = 0.1
+REPEATS = 31
+TOLERANCE = 0.25
+BLOCK_CALLS = 100
+
+class NullCH347:
+    # Accepts every call; stands in for the DLL so only Python work is timed
+    def __getattr__(self, name):
+        return lambda *args: 1
+
+class NullLoader:
+    def LoadLibrary(self, name):
+        return NullCH347()
+
+def load_script(filename):
+    # The scripts load the DLL at import; without windll (not Windows) hand
+    # them NullCH347 instead
+    if not hasattr(ctypes, "windll"):
+        ctypes.windll = NullLoader()
+    name = "bench_" + filename.replace("-", "_").replace(".py", "")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.ch347_dll = NullCH347()
+    return module
+
+def make_oled(module):
+    # An OLED object from a script, opened and initialized on NullCH347
+    with contextlib.redirect_stdout(io.StringIO()):
+        return module.OLED()
+
+class NullPanel:
+    def command(self, commands):
+        pass
+
+    def data(self, data):
+        pass
+
+def benchmarks():
+    # name -> zero-argument callable performing one operation
+    random.seed(1)
+    pong = load_script("i2c_OLED-PONG.py")
+    sinvader = load_script("i2c_OLED-SInvader-new.py")
+    timedate = load_script("i2c_OLED-TimeDate.py")
+    animation = load_script("i2c_OLED-Animation.py")
+    good = load_script("i2c_OLED-Good.py")
+    prime = load_script("i2c_OLED-Prime.py")
+    ball = load_script("i2c_OLED-BALL.py")
+    cube = load_script("i2c_OLED-Cube.py")
+    life = load_script("i2c_OLED-LIFE.py")
+    from ch347 import encode_op
+    from ssd1306 import SSD1306
+
+    pong_oled = make_oled(pong)
+    invader_oled = make_oled(sinvader)
+    timedate_oled = make_oled(timedate)
+    ball_oled = make_oled(ball)
+    game = animation.SpaceInvadersGame(make_oled(animation))
+    game.bullets = [(10, 40), (60, 50), (100, 45)]  # Below the enemies: no hits
+    game.enemy_bullets = [(20, 30), (90, 20)]
+    good_oled = make_oled(good)
+    prime_oled = make_oled(prime)
+    page = [0x55] * 128
+    line_buffer = bytearray(1024)
+    vertices = [(x, y, z) for x in (-15, 15) for y in (-15, 15) for z in (-15, 15)]
+    grid = [[random.choice([0, 1]) for _ in range(128)] for _ in range(64)]
+    shared = SSD1306(NullPanel())
+
+    def rotate_project():
+        for vertex in vertices:
+            cube.project_point(cube.rotate_point(vertex, 0.3, 0.2, 0.1), 64, 32, 1)
+
+    def dirty_flush():
+        shared.buffer[0] ^= 1
+        shared.update_dirty()
+
+    return {
+        "pong.draw_pixel": lambda: pong_oled.draw_pixel(64, 32),
+        "pong.draw_rect": lambda: pong_oled.draw_rect(10, 10, 2, 12),
+        "pong.clear_display": pong_oled.clear_display,
+        "pong.write_data": lambda: pong_oled.write_data(page),
+        "pong.write_command": lambda: pong_oled.write_command(0xB0),
+        "pong.update_display": pong_oled.update_display,
+        "sinvader.draw_text": lambda: invader_oled.draw_text("PLAYER WINS", 0, 28),
+        "timedate.draw_text": lambda: timedate_oled.draw_text(0, 0, "12:34:56", 2),
+        "timedate.draw_text_size1": lambda: timedate_oled.draw_text(0, 0, "12:34:56", 1),
+        "timedate.draw_text_size3": lambda: timedate_oled.draw_text(0, 0, "12:34", 3),
+        "animation.draw": game.draw,
+        "animation.move_player": game.move_player,
+        "animation.move_enemies": game.move_enemies,
+        "animation.check_collisions": game.check_collisions,
+        "good.display_number": lambda: good_oled.display_number(7919),
+        "prime.display_number": lambda: prime_oled.display_number(104729),
+        "ball.draw_ball": lambda: ball_oled.draw_ball(64, 32, 3),
+        "cube.draw_line_in_buffer": lambda: cube.draw_line_in_buffer(line_buffer, 10, 5, 117, 58),
+        "cube.rotate_project": rotate_project,
+        "life.count_neighbors": lambda: life.count_neighbors(grid, 10, 10),
+        "life.update_grid": lambda: life.update_grid(grid),
+        "ssd1306.draw_pixel": lambda: shared.draw_pixel(64, 32),
+        "ssd1306.draw_text": lambda: shared.draw_text("12:34:56", 0, 0),
+        "ssd1306.update_display": shared.update_display,
+        "ssd1306.update_dirty": dirty_flush,
+        "ch347.encode_op": lambda: encode_op(0x3C, page, 0),
+    }
+
+class ReferenceCells:
+    def __init__(self):
+        self.buffer = [0] * 64
+
+    def set(self, i, value):
+        self.buffer[i & 63] |= value << (i & 7)
+
+reference_cells = ReferenceCells()
+
+def reference():
+    # Fixed interpreter workload for normalising machine speed: method
+    # calls, attribute access and list indexing like the benchmarked ops, so
+    # that host contention slows it the same way
+    total = 0
+    for i in range(200):
+        reference_cells.set(i, 1)
+        total += reference_cells.buffer[i & 63] & 7
+    return total
+
+def time_loop(func, n):
+    loop = range(n)
+    start = time.perf_counter()
+    for _ in loop:
+        func()
+    return time.perf_counter() - start
+
+def calibrate(func, min_time):
+    n = 1
+    while True:
+        elapsed = time_loop(func, n)
+        if elapsed >= min_time:
+            return n
+        n = max(n * 2, int(n * min_time / max(elapsed, 1e-9)))
+
+def noop():
+    pass
+
+def net_blocks(func, n=BLOCK_CALLS):
+    # Mean change of the allocated block count per call, GC off so that
+    # collections in between do not show up as negative counts
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        for _ in range(n):
+            func()
+        return (sys.getallocatedblocks() - before) / n
+    finally:
+        if enabled:
+            gc.enable()
+
+def measure(func, repeats=REPEATS, min_time=MIN_TIME, warmup=WARMUP):
+    n = calibrate(func, min_time)
+    ref_n = calibrate(reference, min_time)  # Same duration as the func run
+    deadline = time.perf_counter() + warmup
+    while time.perf_counter() < deadline:
+        time_loop(func, n)
+    enabled = gc.isenabled()
+    gc.disable()
+    samples = []
+    ratios = []
+    try:
+        for i in range(repeats):
+            # Each pair runs back to back, in alternating order, so a slow
+            # spell of the host hits both halves of a pair
+            if i % 2:
+                sample = time_loop(func, n) / n
+                ratios.append(time_loop(reference, ref_n) / ref_n / sample)
+            else:
+                ref = time_loop(reference, ref_n) / ref_n
+                sample = time_loop(func, n) / n
+                ratios.append(ref / sample)
+            samples.append(sample)
+    finally:
+        if enabled:
+            gc.enable()
+    blocks = net_blocks(func) - net_blocks(noop)
+    tracemalloc.start()
+    func()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(samples)
+    return {
+        "ops_per_s": 1.0 / best,
+        "score": statistics.median(ratios),
+        "us_per_op": best * 1e6,
+        "spread": (statistics.median(samples) - best) / best,
+        "alloc_bytes": max(0, peak - before),
+        "net_blocks": round(blocks, 2),
+    }
+
+def pin_cpu(cpu):
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    allowed = sorted(os.sched_getaffinity(0))
+    cpu = allowed[0] if cpu is None else cpu
+    os.sched_setaffinity(0, {cpu})
+    return cpu
+
+def check(results, baseline, tolerance):
+    # Returns the names of ops whose score is below baseline by more than
+    # tolerance
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["score"] / base["score"]
+        flag = "REGRESSION" if ratio < 1 - tolerance else ""
+        print(f"{name:<28}{ratio:8.2f}x baseline {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for rendering and packing primitives")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per timed run")
+    parser.add_argument("--cpu", type=int, default=None, help="CPU to pin to (default: first allowed)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown fraction")
+    args = parser.parse_args()
+
+    cpu = pin_cpu(args.cpu)
+    print(f"Python {platform.python_version()} on {platform.machine()}, "
+          + (f"pinned to CPU {cpu}" if cpu is not None else "CPU pinning not available"))
+    print(f"{'benchmark':<28}{'ops/s':>12}{'us/op':>10}{'score':>10}{'spread':>8}{'peak B/op':>11}{'net blk/op':>11}")
+    results = {}
+    for name, func in benchmarks().items():
+        if args.filter not in name:
+            continue
+        result = measure(func, args.repeats, args.min_time)
+        results[name] = result
+        print(f"{name:<28}{result['ops_per_s']:12.0f}{result['us_per_op']:10.2f}{result['score']:10.4f}"
+              f"{result['spread']:8.1%}{result['alloc_bytes']:11d}{result['net_blocks']:11.2f}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": {k: {"ops_per_s": round(v["ops_per_s"], 1), "score": round(v["score"], 6),
+                                       "alloc_bytes": v["alloc_bytes"], "net_blocks": v["net_blocks"]}
+                                   for k, v in results.items()}}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
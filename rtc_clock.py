@@ -0,0 +1,193 @@
+import datetime
+import time
+
+from ds3231 import (CONTROL_A1IE, CONTROL_A2IE, CONTROL_INTCN, CONTROL_RS1, CONTROL_RS2,
+                    STATUS_A1F, STATUS_A2F)
+
+# Clock service that reads the DS3231 once, anchors it to time.monotonic()
+# and extrapolates in-process, so consumers no longer poll the RTC over I2C
+# every second. The RTC is re-read every resync_interval seconds to correct
+# drift between the host oscillator and the DS3231.
+
+RESYNC_INTERVAL = 600.0  # Seconds between RTC reads
+EDGE_POLL = 0.005  # Seconds between reads while waiting for the RTC seconds edge
+MIN_DRIFT_WINDOW = 60.0  # Shortest interval used to estimate drift
+
+class RTCClock:
+    def __init__(self, rtc, resync_interval=RESYNC_INTERVAL, align=True, clock=time.monotonic, sleep=time.sleep):
+        self.rtc = rtc
+        self.resync_interval = resync_interval
+        self.align = align
+        self.clock = clock
+        self.sleep = sleep
+        self.anchor_time = None  # RTC time at the anchor
+        self.anchor_mono = None  # Host monotonic time at the anchor
+        self.rate = 0.0  # Fractional rate correction (RTC seconds per host second - 1)
+        self.last_error = 0.0  # Seconds the extrapolation was off at the last resync
+        self.syncs = 0
+
+    def sync(self):
+        # Anchor on the RTC seconds edge; the DS3231 only has 1 s resolution
+        rtc_time, _ = self.rtc.read_time()
+        mono = self.clock()
+        if self.align:
+            start_second = rtc_time
+            while rtc_time == start_second:
+                self.sleep(EDGE_POLL)
+                rtc_time, _ = self.rtc.read_time()
+                mono = self.clock()
+
+        if self.anchor_mono is not None:
+            elapsed = mono - self.anchor_mono
+            self.last_error = (rtc_time - self.extrapolate(mono)).total_seconds()
+            if self.align and elapsed >= MIN_DRIFT_WINDOW:
+                self.rate += self.last_error / elapsed
+
+        self.anchor_time = rtc_time
+        self.anchor_mono = mono
+        self.syncs += 1
+        return rtc_time
+
+    def extrapolate(self, mono):
+        elapsed = (mono - self.anchor_mono) * (1.0 + self.rate)
+        return self.anchor_time + datetime.timedelta(seconds=elapsed)
+
+    def resync_due(self):
+        return self.anchor_mono is None or self.clock() - self.anchor_mono >= self.resync_interval
+
+    def now(self):
+        if self.resync_due():
+            self.sync()
+        return self.extrapolate(self.clock())
+
+    def read_time(self):
+        # Drop-in replacement for DS3231.read_time()
+        now = self.now()
+        return now, now.isoweekday() % 7 + 1
+
+    @property
+    def drift_ppm(self):
+        return self.rate * 1e6
+
+    def seconds_to_next_tick(self):
+        now = self.now()
+        return 1.0 - now.microsecond / 1e6
+
+    def wait_next_second(self):
+        # Sleep until the extrapolated clock crosses the next whole second
+        if self.resync_due():
+            rtc_time = self.sync()
+            if self.align:
+                return rtc_time  # An aligned resync ends on a seconds edge
+        target = self.now().replace(microsecond=0) + datetime.timedelta(seconds=1)
+        while True:
+            remaining = (target - self.extrapolate(self.clock())).total_seconds()
+            if remaining <= 0:
+                return target
+            self.sleep(remaining)
+
+    def ticks(self):
+        # Yields the time at each second boundary
+        while True:
+            yield self.wait_next_second()
+
+
+# Hardware tick source: the DS3231 INT/SQW pin is wired to a CH347 GPIO and
+# each edge advances the displayed time by one second. The RTC is read at
+# start-up and then only to resync: when the edges counted since the last
+# read disagree with the monotonic time elapsed by more than half a period
+# (a missed or extra edge from a polling gap or USB stall), and every
+# resync_interval seconds regardless.
+
+SQW_GPIO_PIN = 0
+GPIO_POLL = 0.002  # Seconds between GPIO polls (cheap USB control transfer)
+
+class SQWTicker:
+    def __init__(self, rtc, i2c, pin=SQW_GPIO_PIN, mode="sqw", poll_interval=GPIO_POLL,
+                 resync_interval=RESYNC_INTERVAL, clock=time.monotonic, sleep=time.sleep):
+        # mode "sqw": 1 Hz square wave, a tick on each falling edge
+        # mode "alarm": alarm 1 every second, INT asserted low until A1F is cleared
+        self.rtc = rtc
+        self.i2c = i2c
+        self.mask = 1 << pin
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.level = None
+        self.current = None
+        self.anchor_mono = None  # Host monotonic time of the last RTC read
+        self.anchor_ticks = 0  # ticks_seen at the last RTC read
+        self.ticks_seen = 0
+        self.polls = 0
+        self.resyncs = 0
+        self.corrections = 0  # Resyncs that changed the counted time
+
+    def start(self):
+        control = self.rtc.control(max_age=0)
+        if self.mode == "alarm":
+            self.rtc.set_alarm1(flush=False)  # All fields masked: fire every second
+            self.rtc.set_control((control | CONTROL_INTCN | CONTROL_A1IE) & ~CONTROL_A2IE, flush=False)
+            self.rtc.clear_status(STATUS_A1F | STATUS_A2F)
+        else:
+            self.rtc.set_control(control & ~(CONTROL_INTCN | CONTROL_RS2 | CONTROL_RS1))
+
+        self.i2c.gpio_set(self.mask, 0x00, 0x00)  # Pin as input
+        self.level = self.i2c.gpio_get() & self.mask
+
+        # Read the time once, right after the first edge, then count edges
+        self.wait_edge()
+        self.current, _ = self.rtc.read_time()
+        self.anchor_mono = self.clock()
+        self.anchor_ticks = self.ticks_seen
+        return self.current
+
+    def resync(self):
+        # Right after an edge the RTC has just turned over its seconds
+        counted = self.current
+        self.current, _ = self.rtc.read_time()
+        self.anchor_mono = self.clock()
+        self.anchor_ticks = self.ticks_seen
+        self.resyncs += 1
+        if self.current != counted:
+            self.corrections += 1
+
+    def observe(self, data):
+        # Feed GPIO levels read elsewhere (e.g. batched with other traffic);
+        # returns True on a tick edge
+        level = data & self.mask
+        edge = self.level and not level  # Falling edge (SQW) or INT asserted (alarm)
+        self.level = level
+        if edge and self.mode == "alarm":
+            self.rtc.clear_status(STATUS_A1F)  # Cached status: a write, no read
+        return bool(edge)
+
+    def poll(self):
+        self.polls += 1
+        return self.observe(self.i2c.gpio_get())
+
+    def wait_edge(self):
+        while not self.poll():
+            self.sleep(self.poll_interval)
+
+    def wait_next_second(self):
+        if self.current is None:
+            return self.start()
+        self.wait_edge()
+        self.current += datetime.timedelta(seconds=1)
+        self.ticks_seen += 1
+        elapsed = self.clock() - self.anchor_mono
+        if abs(elapsed - (self.ticks_seen - self.anchor_ticks)) > 0.5 or elapsed >= self.resync_interval:
+            self.resync()
+        return self.current
+
+    def read_time(self):
+        # Same interface as RTCClock.read_time(), no bus traffic
+        if self.current is None:
+            self.start()
+        return self.current, self.current.isoweekday() % 7 + 1
+
+    def ticks(self):
+        while True:
+            yield self.wait_next_second()
@@ -0,0 +1,105 @@
+import threading
+import time
+
+# Shared sensor value cache. Each device gets a TTL matched to how often it
+# refreshes internally (the DHT12 only updates about every 2 s), so any number
+# of consumers can ask for a value while the bus sees at most one read per TTL.
+# Readers arriving while a bus read is in flight wait for that read instead of
+# starting their own (single flight). Each bus read is a Flight: the leader
+# stores its result there under the lock before waking the waiters, and the
+# waiters read it back under the lock, so they get the result of the read
+# they waited for even if a newer read has started since. get(key, max_age=0)
+# always goes to the bus (or joins the read in flight); the owner of a
+# sensor's cadence refreshes with it while other consumers read within the TTL.
+
+class Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class CacheEntry:
+    def __init__(self, read, ttl):
+        self.read = read
+        self.ttl = ttl
+        self.value = None
+        self.error = None
+        self.read_at = None
+        self.inflight = None  # Flight while a bus read is running
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.bus_reads = 0
+        self.bus_errors = 0
+
+class SensorCache:
+    def __init__(self, clock=time.monotonic):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.clock = clock
+
+    def register(self, key, read, ttl):
+        self.entries[key] = CacheEntry(read, ttl)
+
+    def get(self, key, max_age=None):
+        entry = self.entries[key]
+        ttl = entry.ttl if max_age is None else max_age
+        with self.lock:
+            if entry.read_at is not None and self.clock() - entry.read_at < ttl:
+                entry.hits += 1
+                return entry.value
+            if entry.inflight is not None:
+                # Someone is already on the bus for this key
+                entry.waits += 1
+                flight = entry.inflight
+                leader = False
+            else:
+                entry.misses += 1
+                flight = entry.inflight = Flight()
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            with self.lock:
+                error, value = flight.error, flight.value
+            if error is not None:
+                raise error
+            return value
+
+        try:
+            value = entry.read()
+        except Exception as e:
+            with self.lock:
+                flight.error = entry.error = e
+                entry.bus_errors += 1
+                entry.inflight = None
+            flight.event.set()
+            raise
+        with self.lock:
+            flight.value = entry.value = value
+            entry.error = None
+            # A failed read (None) is handed to the waiters but not cached
+            entry.read_at = self.clock() if value is not None else None
+            entry.bus_reads += 1
+            entry.inflight = None
+        flight.event.set()
+        return value
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries[key].read_at = None
+
+    def stats(self):
+        stats = {}
+        with self.lock:
+            for key, entry in self.entries.items():
+                stats[key] = {
+                    "ttl": entry.ttl,
+                    "hits": entry.hits,
+                    "misses": entry.misses,
+                    "single_flight_waits": entry.waits,
+                    "bus_reads": entry.bus_reads,
+                    "bus_errors": entry.bus_errors,
+                    "bus_reads_avoided": entry.hits + entry.waits,
+                }
+        return stats
@@ -0,0 +1,138 @@
+import time
+
+# Polling scheduler for several sensors sharing one adapter. Each sensor has
+# a period and a deadline tolerance; when one sensor falls due, every sensor
+# within its tolerance window is read in the same back-to-back batch, so the
+# bus sees a few short bursts instead of scattered reads. While the display
+# is flushing (busy() returns True) only reads past their deadline run.
+
+DEFAULT_TOLERANCE = 0.25  # Fraction of the period a read may move early or late
+BUSY_POLL = 0.01  # Seconds between busy() checks while due reads are deferred
+
+class PolledSensor:
+    def __init__(self, name, read, period, tolerance):
+        self.name = name
+        self.read = read
+        self.period = period
+        self.tolerance = tolerance
+        self.next_due = None
+        self.value = None
+        self.read_at = None
+        self.first_read_at = None
+        self.reads = 0
+        self.errors = 0
+        self.late = 0
+        self.max_lateness = 0.0
+
+    def deadline(self):
+        return self.next_due + self.tolerance
+
+class PollingScheduler:
+    def __init__(self, busy=None, clock=time.monotonic, sleep=time.sleep):
+        self.sensors = []
+        self.busy = busy or (lambda: False)
+        self.clock = clock
+        self.sleep = sleep
+        self.started_at = None
+        self.batches = 0
+        self.deferred = 0
+
+    def add(self, name, read, period, tolerance=None):
+        if tolerance is None:
+            tolerance = period * DEFAULT_TOLERANCE
+        sensor = PolledSensor(name, read, period, tolerance)
+        self.sensors.append(sensor)
+        return sensor
+
+    def start(self):
+        # Stagger first reads so sensors with equal periods do not align
+        now = self.clock()
+        if self.sensors:
+            spread = min(s.period for s in self.sensors) / len(self.sensors)
+            for i, sensor in enumerate(self.sensors):
+                sensor.next_due = now + i * spread
+        self.started_at = now
+
+    def due(self, now):
+        if not any(now >= s.next_due for s in self.sensors):
+            return []
+        # Pack every sensor already inside its early window into this batch
+        batch = [s for s in self.sensors if now >= s.next_due - s.tolerance]
+        if self.busy():
+            urgent = [s for s in batch if now >= s.deadline()]
+            self.deferred += len(batch) - len(urgent)
+            batch = urgent
+        return batch
+
+    def run_pending(self):
+        if self.started_at is None:
+            self.start()
+        batch = self.due(self.clock())
+        for sensor in batch:
+            now = self.clock()
+            try:
+                sensor.value = sensor.read()
+            except Exception:
+                sensor.errors += 1
+            else:
+                sensor.read_at = now
+                if sensor.first_read_at is None:
+                    sensor.first_read_at = now
+                sensor.reads += 1
+            lateness = now - sensor.next_due
+            sensor.max_lateness = max(sensor.max_lateness, lateness)
+            if lateness > sensor.tolerance:
+                sensor.late += 1
+            sensor.next_due += sensor.period
+            if sensor.next_due < now:
+                sensor.next_due = now + sensor.period  # Fell a whole period behind
+        if batch:
+            self.batches += 1
+        return batch
+
+    def seconds_until_next(self):
+        # None when no sensor is scheduled. A sensor still due after
+        # run_pending() was deferred by busy(): wake at its deadline, or
+        # after BUSY_POLL to see whether the flush has ended
+        if self.started_at is None:
+            return 0.0
+        if not self.sensors:
+            return None
+        now = self.clock()
+        wake = min(s.next_due if s.next_due > now else min(s.deadline(), now + BUSY_POLL)
+                   for s in self.sensors)
+        return max(0.0, wake - now)
+
+    def run(self, duration=None):
+        end = None if duration is None else self.clock() + duration
+        while end is None or self.clock() < end:
+            self.run_pending()
+            wait = self.seconds_until_next()
+            if wait is None:
+                if end is None:
+                    return  # Nothing to poll
+                wait = end - self.clock()
+            self.sleep(wait)
+
+    def value(self, name):
+        for sensor in self.sensors:
+            if sensor.name == name:
+                return sensor.value
+        raise KeyError(name)
+
+    def report(self):
+        now = self.clock()
+        report = {}
+        for sensor in self.sensors:
+            elapsed = sensor.read_at - sensor.first_read_at if sensor.reads > 1 else 0.0
+            report[sensor.name] = {
+                "period": sensor.period,
+                "reads": sensor.reads,
+                "errors": sensor.errors,
+                "late": sensor.late,
+                "achieved_hz": round((sensor.reads - 1) / elapsed, 4) if elapsed > 0 else 0.0,
+                "target_hz": round(1.0 / sensor.period, 4),
+                "staleness": round(now - sensor.read_at, 3) if sensor.read_at is not None else None,
+                "max_lateness": round(sensor.max_lateness, 4),
+            }
+        return report
@@ -0,0 +1,246 @@
+import time
+from ctypes import *
+
+from ch347 import load_dll
+
+# SSD1306 128x64 OLED driver with a framebuffer, over either bus:
+#   I2CPanel - control byte 0x00 (commands) / 0x40 (data) through WaveshareI2C
+#   SPIPanel - 4-wire SPI via CH347SPI_Write, D/C line on a CH347 GPIO
+# Both panels take commands and data as byte strings, so SSD1306 keeps the
+# same framebuffer API (clear_display, draw_pixel, draw_rect, update_display)
+# as the OLED classes in the scripts whichever way the module is wired.
+
+OLED_ADDRESS = 0x3C
+WIDTH = 128
+HEIGHT = 64
+
+INIT_SEQUENCE = [
+    0xAE,        # Display OFF (sleep mode)
+    0xD5, 0x80,  # Display clock divide ratio/oscillator frequency
+    0xA8, 0x3F,  # Multiplex ratio 1/64 duty
+    0xD3, 0x00,  # Display offset: none
+    0x40,        # Start line address
+    0x8D, 0x14,  # Enable charge pump
+    0x20, 0x00,  # Horizontal addressing mode
+    0xA1,        # Segment re-map 0 to 127
+    0xC8,        # COM output scan direction
+    0xDA, 0x12,  # COM pins hardware configuration
+    0x81, 0xCF,  # Contrast
+    0xD9, 0xF1,  # Pre-charge period
+    0xDB, 0x40,  # VCOMH deselect level
+    0xA4,        # Entire display ON (follow RAM)
+    0xA6,        # Normal display
+    0xAF,        # Display ON
+]
+
+# 5x7 glyphs, one byte per column (bit 0 = top row)
+FONT_5X7 = {
+    " ": (0x00, 0x00, 0x00, 0x00, 0x00),
+    "0": (0x3E, 0x51, 0x49, 0x45, 0x3E),
+    "1": (0x00, 0x42, 0x7F, 0x40, 0x00),
+    "2": (0x42, 0x61, 0x51, 0x49, 0x46),
+    "3": (0x21, 0x41, 0x45, 0x4B, 0x31),
+    "4": (0x18, 0x14, 0x12, 0x7F, 0x10),
+    "5": (0x27, 0x45, 0x45, 0x45, 0x39),
+    "6": (0x3C, 0x4A, 0x49, 0x49, 0x30),
+    "7": (0x01, 0x71, 0x09, 0x05, 0x03),
+    "8": (0x36, 0x49, 0x49, 0x49, 0x36),
+    "9": (0x06, 0x49, 0x49, 0x29, 0x1E),
+    ":": (0x00, 0x36, 0x36, 0x00, 0x00),
+    ".": (0x00, 0x60, 0x60, 0x00, 0x00),
+    "-": (0x08, 0x08, 0x08, 0x08, 0x08),
+    "/": (0x20, 0x10, 0x08, 0x04, 0x02),
+    "%": (0x23, 0x13, 0x08, 0x64, 0x62),
+    "C": (0x3E, 0x41, 0x41, 0x41, 0x22),
+    "H": (0x7F, 0x08, 0x08, 0x08, 0x7F),
+    "R": (0x7F, 0x09, 0x19, 0x29, 0x46),
+    "T": (0x01, 0x01, 0x7F, 0x01, 0x01),
+}
+GLYPH_WIDTH = 6  # 5 columns plus one blank
+
+# CH347 SPI settings (mSpiCfgS in CH347DLL.H)
+SPI_CLOCK = 3        # iClock: 60 MHz >> 3 = 7.5 MHz, under the SSD1306's 10 MHz limit
+SPI_CHIP_SELECT = 0x80  # Bit 7 set: drive CS0 around each write
+SPI_WRITE_STEP = 512    # iWriteStep: bytes per USB packet inside one CH347SPI_Write
+DC_PIN = 4           # GPIO wired to the panel's D/C input
+
+class SpiConfig(Structure):
+    _pack_ = 1
+    _fields_ = [
+        ("iMode", c_ubyte),                  # 0-3: SPI mode 0/1/2/3
+        ("iClock", c_ubyte),                 # 0: 60 MHz ... 7: 468.75 kHz
+        ("iByteOrder", c_ubyte),             # 0: LSB first, 1: MSB first
+        ("iSpiWriteReadInterval", c_ushort),
+        ("iSpiOutDefaultData", c_ubyte),
+        ("iChipSelect", c_uint),
+        ("CS1Polarity", c_ubyte),
+        ("CS2Polarity", c_ubyte),
+        ("iIsAutoDeativeCS", c_ushort),
+        ("iActiveDelay", c_ushort),
+        ("iDelayDeactive", c_uint),
+    ]
+
+class I2CPanel:
+    def __init__(self, i2c, address=OLED_ADDRESS):
+        self.i2c = i2c
+        self.address = address
+
+    def command(self, commands):
+        self.i2c.write_block(self.address, 0x00, commands)
+
+    def data(self, data):
+        self.i2c.write_block(self.address, 0x40, data)
+
+    def close_device(self):
+        self.i2c.close_device()
+
+class SPIPanel:
+    def __init__(self, usb_dev=0, dll=None, dc_pin=DC_PIN, clock=SPI_CLOCK,
+                 chip_select=SPI_CHIP_SELECT, write_step=SPI_WRITE_STEP):
+        self.usb_id = usb_dev
+        self.dll = dll or load_dll()
+        self.dc_mask = 1 << dc_pin
+        self.dc = None  # Unknown until the first write
+        self.chip_select = chip_select
+        self.write_step = write_step
+        self.tx = (c_ubyte * (WIDTH * HEIGHT // 8))()
+        self.usb_transfers = 0
+        if self.dll.CH347OpenDevice(self.usb_id) == -1:
+            raise Exception("Device Open Failed!")
+        config = SpiConfig(iMode=0, iClock=clock, iByteOrder=1, iChipSelect=chip_select)
+        if not self.dll.CH347SPI_Init(self.usb_id, byref(config)):
+            raise Exception("Failed to initialize SPI")
+        print("Device Opened Successfully!")
+
+    def set_dc(self, level):
+        # The D/C line only changes between command and data runs
+        if self.dc == level:
+            return
+        if not self.dll.CH347GPIO_Set(self.usb_id, self.dc_mask, self.dc_mask,
+                                      self.dc_mask if level else 0):
+            raise Exception("Failed to set D/C line")
+        self.usb_transfers += 1
+        self.dc = level
+
+    def write(self, data):
+        length = len(data)
+        if length > len(self.tx):
+            self.tx = (c_ubyte * length)()
+        self.tx[:length] = bytes(data)
+        if not self.dll.CH347SPI_Write(self.usb_id, self.chip_select, length, self.write_step, self.tx):
+            raise Exception("Failed to write SPI data")
+        self.usb_transfers += 1
+
+    def command(self, commands):
+        self.set_dc(0)
+        self.write(commands)
+
+    def data(self, data):
+        self.set_dc(1)
+        self.write(data)
+
+    def close_device(self):
+        self.dll.CH347CloseDevice(self.usb_id)
+        print("Device Closed.")
+
+class SSD1306:
+    def __init__(self, panel, width=WIDTH, height=HEIGHT, metrics=None, name="ssd1306"):
+        self.panel = panel
+        self.metrics = metrics  # i2c_metrics.Metrics for frame-time histograms
+        self.name = name
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.buffer = bytearray(self.width * self.pages)
+        self.shadow = bytearray(self.width * self.pages)  # Panel RAM as last flushed
+        self.frames = 0
+        self.initialize_display()
+
+    def initialize_display(self):
+        self.panel.command(INIT_SEQUENCE)
+        self.clear_display()
+        self.update_display()
+
+    def close_device(self):
+        self.panel.close_device()
+
+    def restore(self):
+        # Bring a panel that lost power back to the last flushed frame: the
+        # init sequence, then the shadow rather than the buffer, which may
+        # hold a frame that was never sent. The next update_dirty() sends
+        # whatever changed since.
+        self.panel.command(INIT_SEQUENCE)
+        self.panel.command((0x21, 0, self.width - 1, 0x22, 0, self.pages - 1))
+        self.panel.data(self.shadow)
+
+    def write_command(self, command):
+        self.panel.command((command,))
+
+    def write_data(self, data):
+        self.panel.data(data)
+
+    def clear_display(self):
+        self.buffer[:] = bytes(len(self.buffer))
+
+    def draw_pixel(self, x, y, color=1):
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return  # Out of bounds
+        index = x + (y // 8) * self.width
+        if color:
+            self.buffer[index] |= 1 << (y % 8)
+        else:
+            self.buffer[index] &= ~(1 << (y % 8)) & 0xFF
+
+    def draw_rect(self, x, y, width, height, color=1):
+        for i in range(width):
+            for j in range(height):
+                self.draw_pixel(x + i, y + j, color)
+
+    def draw_text(self, text, x, page):
+        # Glyphs straight into one page row; unknown characters render blank
+        for char in text:
+            if x >= self.width:
+                break
+            glyph = bytes(FONT_5X7.get(char, FONT_5X7[" "])) + b"\x00"
+            n = min(GLYPH_WIDTH, self.width - x)
+            start = page * self.width + x
+            self.buffer[start:start + n] = glyph[:n]
+            x += GLYPH_WIDTH
+        return x
+
+    def update_display(self):
+        # Whole frame in one data write: column and page windows span the
+        # panel, so horizontal addressing wraps through every page
+        start = time.perf_counter_ns()
+        self.panel.command((0x21, 0, self.width - 1, 0x22, 0, self.pages - 1))
+        self.panel.data(self.buffer)
+        self.shadow[:] = self.buffer
+        self.frames += 1
+        if self.metrics is not None:
+            self.metrics.frame(self.name, time.perf_counter_ns() - start)
+
+    def dirty_pages(self):
+        w = self.width
+        return [p for p in range(self.pages) if self.buffer[p * w:(p + 1) * w] != self.shadow[p * w:(p + 1) * w]]
+
+    def update_dirty(self):
+        # Flush only pages that differ from the panel, one window write per
+        # run of consecutive dirty pages; returns the pages sent
+        dirty = self.dirty_pages()
+        if not dirty:
+            return dirty
+        start = time.perf_counter_ns()
+        w = self.width
+        first = prev = dirty[0]
+        for page in dirty[1:] + [None]:
+            if page is not None and page == prev + 1:
+                prev = page
+                continue
+            self.panel.command((0x21, 0, w - 1, 0x22, first, prev))
+            self.panel.data(self.buffer[first * w:(prev + 1) * w])
+            self.shadow[first * w:(prev + 1) * w] = self.buffer[first * w:(prev + 1) * w]
+            first = prev = page
+        self.frames += 1
+        if self.metrics is not None:
+            self.metrics.frame(self.name, time.perf_counter_ns() - start)
+        return dirty
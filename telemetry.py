@@ -0,0 +1,242 @@
+import os
+import struct
+from array import array
+
+# Time-series store for sensor telemetry. Samples live in fixed-size typed
+# arrays (array module ring buffers, no per-sample objects) and are rolled up
+# into 1 s -> 1 min -> 1 h buckets holding min/max/mean per channel. Each ring
+# remembers how many rows it has ever received, so writers can append only
+# the rows added since their last flush instead of rewriting the file.
+
+RAW_CAPACITY = 4096
+ROLLUPS = (
+    (1.0, 3600),        # 1 s buckets, one hour
+    (60.0, 7 * 1440),   # 1 min buckets, one week
+    (3600.0, 400 * 24), # 1 h buckets, a bit over a year
+)
+
+class RingBuffer:
+    def __init__(self, capacity, fields, typecode="f"):
+        self.capacity = capacity
+        self.fields = list(fields)
+        self.time = array("d", bytes(8 * capacity))
+        self.columns = [array(typecode, bytes(array(typecode).itemsize * capacity)) for _ in self.fields]
+        self.head = 0   # Next physical slot to write
+        self.count = 0  # Rows currently held
+        self.total = 0  # Rows ever appended
+
+    def append(self, timestamp, values):
+        slot = self.head
+        self.time[slot] = timestamp
+        for column, value in zip(self.columns, values):
+            column[slot] = value
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, timestamps, columns):
+        # Bulk append: copy contiguous runs with slice assignment
+        n = len(timestamps)
+        if n > self.capacity:
+            skip = n - self.capacity
+            self.total += skip
+            timestamps = timestamps[skip:]
+            columns = [c[skip:] for c in columns]
+            n = self.capacity
+        done = 0
+        while done < n:
+            run = min(n - done, self.capacity - self.head)
+            end = self.head + run
+            self.time[self.head:end] = array("d", timestamps[done:done + run])
+            for column, values in zip(self.columns, columns):
+                column[self.head:end] = array(column.typecode, values[done:done + run])
+            self.head = end % self.capacity
+            done += run
+        self.count = min(self.count + n, self.capacity)
+        self.total += n
+
+    def physical(self, i):
+        # Logical index 0 is the oldest row held
+        return (self.head - self.count + i) % self.capacity
+
+    def search(self, timestamp):
+        # First logical index with time >= timestamp (rows are time ordered)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time[self.physical(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slice(self, first, last):
+        # Copy logical rows [first, last) out as (times, [columns])
+        if last <= first:
+            return array("d"), [array(c.typecode) for c in self.columns]
+        a = self.physical(first)
+        b = self.physical(last - 1) + 1
+        if a < b:
+            return self.time[a:b], [c[a:b] for c in self.columns]
+        return self.time[a:] + self.time[:b], [c[a:] + c[:b] for c in self.columns]
+
+    def query(self, start=None, end=None):
+        first = 0 if start is None else self.search(start)
+        last = self.count if end is None else self.search(end)
+        return self.slice(first, last)
+
+    def since(self, total):
+        # Rows appended after the ring had received `total` rows;
+        # returns (rows lost to wraparound, times, columns)
+        oldest = self.total - self.count
+        lost = max(0, oldest - total)
+        first = max(total, oldest) - oldest
+        times, columns = self.slice(first, self.count)
+        return lost, times, columns
+
+class Rollup:
+    # Accumulates one bucket per channel and emits it into its ring
+    def __init__(self, interval, capacity, channels):
+        self.interval = interval
+        fields = []
+        for name in channels:
+            fields += [f"{name}_min", f"{name}_max", f"{name}_mean"]
+        self.ring = RingBuffer(capacity, fields + ["count"])
+        self.channels = len(channels)
+        self.bucket = None
+        self.reset()
+
+    def reset(self):
+        self.mins = [float("inf")] * self.channels
+        self.maxs = [float("-inf")] * self.channels
+        self.sums = [0.0] * self.channels
+        self.weight = 0
+
+    def add(self, timestamp, mins, maxs, means, weight):
+        # Returns the closed bucket as (start, mins, maxs, means, weight) or None
+        bucket = timestamp - timestamp % self.interval
+        closed = None
+        if self.bucket is not None and bucket != self.bucket:
+            closed = self.close()
+        self.bucket = bucket
+        for i in range(self.channels):
+            if mins[i] < self.mins[i]:
+                self.mins[i] = mins[i]
+            if maxs[i] > self.maxs[i]:
+                self.maxs[i] = maxs[i]
+            self.sums[i] += means[i] * weight
+        self.weight += weight
+        return closed
+
+    def close(self):
+        means = [s / self.weight for s in self.sums]
+        row = []
+        for i in range(self.channels):
+            row += [self.mins[i], self.maxs[i], means[i]]
+        self.ring.append(self.bucket, row + [self.weight])
+        closed = (self.bucket, self.mins, self.maxs, means, self.weight)
+        self.reset()
+        return closed
+
+class TelemetryStore:
+    def __init__(self, channels, raw_capacity=RAW_CAPACITY, rollups=ROLLUPS):
+        self.channels = list(channels)
+        self.raw = RingBuffer(raw_capacity, self.channels)
+        self.rollups = [Rollup(interval, capacity, self.channels) for interval, capacity in rollups]
+
+    def append(self, timestamp, values):
+        self.raw.append(timestamp, values)
+        self.roll(timestamp, values)
+
+    def extend(self, timestamps, columns):
+        # Bulk append from a sampler: one slice copy into the raw ring
+        self.raw.extend(timestamps, columns)
+        for i, timestamp in enumerate(timestamps):
+            self.roll(timestamp, [c[i] for c in columns])
+
+    def extend_samples(self, samples, fields):
+        # samples: namedtuples with a timestamp (e.g. dht12.Sample)
+        timestamps = [s.timestamp for s in samples]
+        self.extend(timestamps, [[getattr(s, f) for s in samples] for f in fields])
+
+    def roll(self, timestamp, values):
+        bucket = (timestamp, values, values, values, 1)
+        for rollup in self.rollups:
+            bucket = rollup.add(*bucket)
+            if bucket is None:
+                break
+
+    def query(self, start=None, end=None, resolution=None):
+        # resolution: None for raw samples, else a rollup interval in seconds
+        if resolution is None:
+            return self.raw.query(start, end)
+        for rollup in self.rollups:
+            if rollup.interval == resolution:
+                return rollup.ring.query(start, end)
+        raise ValueError(f"No rollup at {resolution} s")
+
+    def ring(self, resolution=None):
+        if resolution is None:
+            return self.raw
+        for rollup in self.rollups:
+            if rollup.interval == resolution:
+                return rollup.ring
+        raise ValueError(f"No rollup at {resolution} s")
+
+class TelemetryWriter:
+    # Appends rows added since the last flush to a CSV or compact binary file
+    MAGIC = b"TLM1"
+
+    def __init__(self, ring, path, binary=None):
+        self.ring = ring
+        self.path = path
+        self.binary = path.endswith(".bin") if binary is None else binary
+        self.flushed = ring.total - ring.count  # Only rows held from now on
+        self.lost = 0
+        self.rows_written = 0
+        self.record = struct.Struct("<d" + "f" * len(ring.fields))
+
+    def write_header(self, f):
+        if self.binary:
+            names = ",".join(self.ring.fields).encode()
+            f.write(self.MAGIC + struct.pack("<H", len(names)) + names)
+        else:
+            f.write(("time," + ",".join(self.ring.fields) + "\n").encode())
+
+    def flush(self):
+        lost, times, columns = self.ring.since(self.flushed)
+        self.lost += lost
+        if not len(times):
+            return 0
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "ab") as f:
+            if new_file:
+                self.write_header(f)
+            if self.binary:
+                pack = self.record.pack
+                f.write(b"".join(pack(t, *row) for t, row in zip(times, zip(*columns))))
+            else:
+                f.write("".join(f"{t:.3f}," + ",".join(f"{v:.6g}" for v in row) + "\n"
+                                for t, row in zip(times, zip(*columns))).encode())
+        self.flushed = self.ring.total
+        self.rows_written += len(times)
+        return len(times)
+
+def read_binary(path):
+    # Returns (fields, times, columns) from a file written by TelemetryWriter
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != TelemetryWriter.MAGIC:
+        raise ValueError(f"{path} is not a telemetry file")
+    (length,) = struct.unpack_from("<H", data, 4)
+    fields = data[6:6 + length].decode().split(",")
+    record = struct.Struct("<d" + "f" * len(fields))
+    body = memoryview(data)[6 + length:]
+    rows = len(body) // record.size
+    times = array("d")
+    columns = [array("f") for _ in fields]
+    for t, *values in record.iter_unpack(body[:rows * record.size]):
+        times.append(t)
+        for column, value in zip(columns, values):
+            column.append(value)
+    return fields, times, columns
@@ -0,0 +1,52 @@
+from ch347 import (STM_IN, STM_MAX, STM_MS, STM_OUT, STM_STA, STM_STO, Delay, WaveshareI2C,
+                   encode_delay, encode_op)
+from ch347_sim import SimulatedCH347
+
+def test_encode_op_write_then_read():
+    units = encode_op(0x68, b"\x00", 3)
+    assert units == [
+        (bytes([STM_STA]), 0),
+        (bytes([STM_OUT | 2, 0x68 << 1, 0x00]), 0),
+        (bytes([STM_STA]), 0),
+        (bytes([STM_OUT | 1, (0x68 << 1) | 1]), 0),
+        (bytes([STM_IN | 2]), 2),
+        (bytes([STM_IN]), 1),
+        (bytes([STM_STO]), 0),
+    ]
+
+def test_encode_op_splits_long_writes_and_reads():
+    units = encode_op(0x3C, bytes(100), 0)
+    writes = [cmd for cmd, _ in units if cmd[0] & 0xC0 == STM_OUT]
+    assert [cmd[0] & STM_MAX for cmd in writes] == [STM_MAX, 101 - STM_MAX]
+    units = encode_op(0x57, b"", 100)
+    assert sum(read for _, read in units) == 100
+    assert all(read <= STM_MAX for _, read in units)
+
+def test_encode_op_probe_is_address_only():
+    assert encode_op(0x3C) == [(bytes([STM_STA]), 0), (bytes([STM_OUT | 1, 0x3C << 1]), 0),
+                               (bytes([STM_STO]), 0)]
+
+def test_encode_delay_splits_into_15_ms_commands():
+    assert encode_delay(0) == []
+    assert encode_delay(20) == [(bytes([STM_MS | 15]), 0), (bytes([STM_MS | 5]), 0)]
+
+def test_encode_delay_rounds_fractional_ms_up():
+    assert encode_delay(0.5) == [(bytes([STM_MS | 1]), 0)]
+    assert encode_delay(2.2) == [(bytes([STM_MS | 3]), 0)]
+
+def test_transfer_with_fractional_delay():
+    # 4.2 ms runs as 5 ms, enough for the EEPROM's 5 ms write cycle
+    i2c = WaveshareI2C(dll=SimulatedCH347(usb_latency=0))
+    for packed in (True, False):
+        views = i2c.transfer([(0x57, b"\x00\x20\x5A", 0), Delay(4.2), (0x57, b"\x00\x20", 1)], packed)
+        assert bytes(views[2]) == b"\x5A"
+
+def test_transfer_write_longer_than_the_tx_packet():
+    # A whole SSD1306 frame in one op does not fit the 512-byte tx
+    sim = SimulatedCH347(usb_latency=0)
+    i2c = WaveshareI2C(dll=sim)
+    frame = bytes(range(256)) * 4
+    for packed in (True, False):
+        views = i2c.transfer([(0x3C, b"\x40" + frame, 0), (0x68, b"\x00", 1)], packed)
+        assert bytes(sim.device(0x3C).gddram) == frame
+        assert len(views[1]) == 1
@@ -0,0 +1,68 @@
+import pytest
+
+from ch347 import WaveshareI2C
+from ch347_link import ConnectionManager, DeviceLost
+from ch347_sim import SimulatedCH347
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_link():
+    sim = SimulatedCH347(usb_latency=0)
+    clock = Clock()
+    link = ConnectionManager(lambda: WaveshareI2C(dll=sim), clock=clock)
+    events = []
+    link.on_status(lambda event, outage: events.append(event))
+    return link, sim, clock, events
+
+def test_outage_is_reported_through_listeners_not_stdout(capsys):
+    link, sim, clock, events = make_link()
+    capsys.readouterr()
+    sim.unplug()
+    with pytest.raises(DeviceLost):
+        link.read(0x68, 0x00, 7)
+    assert events == ["lost"]
+    sim.replug()
+    clock.now += 1.0
+    assert len(link.read(0x68, 0x00, 7)) == 7
+    assert events == ["lost", "back"]
+    assert link.stats()["outages"] == 1
+    assert "Adapter" not in capsys.readouterr().out
+
+def test_mode_set_through_the_manager_survives_a_reopen():
+    link, sim, clock, events = make_link()
+    link.set_mode(0x21)
+    sim.unplug()
+    with pytest.raises(DeviceLost):
+        link.read(0x68, 0x00, 7)
+    sim.replug()
+    clock.now += 1.0
+    link.read(0x68, 0x00, 7)
+    assert link.mode == 0x21
+    assert sim.speeds[0] == 100000
+
+class FailingTransport:
+    # Adapter present (GPIO answers) but every transfer fails
+    def gpio_get(self):
+        return 0
+
+    def stream_ack(self, write_buffer, write_length, read_buffer, read_length):
+        return -1
+
+    def read(self, addr, register, length):
+        raise Exception(f"Failed to read from address {hex(addr)}")
+
+def test_failures_with_the_link_up_are_bus_errors():
+    link = ConnectionManager(FailingTransport)
+    events = []
+    link.on_status(lambda event, outage: events.append(event))
+    assert link.stream_ack(None, 1, None, 0) == -1
+    with pytest.raises(Exception):
+        link.read(0x42, 0x00, 1)
+    assert link.stats()["bus_errors"] == 2
+    assert link.stats()["connected"]
+    assert events == []
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from i2c_coalesce import CoalescingI2C
+
+class FlakyI2C:
+    def __init__(self):
+        self.writes = []
+        self.fail = 0  # Number of write_block calls still to fail
+
+    def write_block(self, addr, register, data):
+        if self.fail:
+            self.fail -= 1
+            raise Exception(f"Failed to write to address {hex(addr)}")
+        self.writes.append((addr, register, bytes(data)))
+
+    def close_device(self):
+        pass
+
+def test_writes_merge_into_one_transaction():
+    i2c = FlakyI2C()
+    bus = CoalescingI2C(i2c, addresses=(0x3C,), max_delay=10.0)
+    bus.write_block(0x3C, 0x40, b"\x01\x02")
+    bus.write_block(0x3C, 0x40, b"\x03")
+    bus.barrier()
+    assert i2c.writes == [(0x3C, 0x40, b"\x01\x02\x03")]
+    bus.close_device()
+
+def test_failed_barrier_keeps_the_run():
+    i2c = FlakyI2C()
+    bus = CoalescingI2C(i2c, addresses=(0x3C,), max_delay=10.0)
+    bus.write_block(0x3C, 0x40, b"\x01")
+    i2c.fail = 1
+    with pytest.raises(Exception):
+        bus.barrier()
+    bus.barrier()
+    assert i2c.writes == [(0x3C, 0x40, b"\x01")]
+    bus.close_device()
+
+def test_background_failure_is_raised_on_the_next_call():
+    i2c = FlakyI2C()
+    bus = CoalescingI2C(i2c, addresses=(0x3C,), max_delay=0.001)
+    i2c.fail = 1
+    bus.write_block(0x3C, 0x40, b"\x01")
+    deadline = time.monotonic() + 2.0
+    while bus.error is None and time.monotonic() < deadline:
+        time.sleep(0.001)
+    with pytest.raises(Exception, match="0x3c"):
+        bus.write_block(0x3C, 0x40, b"\x02")
+    bus.barrier()  # The unsent run goes out now
+    assert i2c.writes == [(0x3C, 0x40, b"\x01")]
+    bus.close_device()
+
+def test_added_latency_is_per_write():
+    i2c = FlakyI2C()
+    bus = CoalescingI2C(i2c, addresses=(0x3C,), max_delay=10.0)
+    bus.write_block(0x3C, 0x40, b"\x01")
+    time.sleep(0.05)
+    for _ in range(9):
+        bus.write_block(0x3C, 0x40, b"\x02")
+    bus.barrier()
+    stats = bus.stats()
+    # One write waited ~50 ms, nine waited ~0: the mean is ~5 ms, not ~50
+    assert stats["max_added_latency_ms"] >= 50
+    assert stats["mean_added_latency_ms"] < 20
+    bus.close_device()
+
+class ConcurrencyCheckI2C(FlakyI2C):
+    # Fails if two calls are on the "adapter" at the same time
+    def __init__(self):
+        super().__init__()
+        self.busy = False
+        self.overlaps = 0
+        self.gpio_reads = 0
+
+    def enter(self):
+        if self.busy:
+            self.overlaps += 1
+        self.busy = True
+        time.sleep(0.0005)
+        self.busy = False
+
+    def write_block(self, addr, register, data):
+        self.enter()
+        super().write_block(addr, register, data)
+
+    def read(self, addr, register, length):
+        self.enter()
+        return bytes(length)
+
+    def gpio_get(self):
+        self.enter()
+        self.gpio_reads += 1
+        return 0
+
+def test_passthrough_calls_share_the_flusher_lock():
+    i2c = ConcurrencyCheckI2C()
+    bus = CoalescingI2C(i2c, addresses=(0x3C,), max_delay=0.001)
+    for n in range(200):
+        bus.write_block(0x3C, 0x40, bytes([n]))
+        bus.gpio_get()
+    bus.barrier()
+    assert i2c.overlaps == 0
+    assert i2c.gpio_reads == 200
+    assert b"".join(data for _, _, data in i2c.writes) == bytes(range(200))
+    bus.close_device()
+
+def test_reads_and_passthroughs_flush_the_pending_run():
+    i2c = FlakyI2C()
+    i2c.probe = lambda addr: i2c.writes[:]
+    bus = CoalescingI2C(i2c, addresses=(0x3C,), max_delay=10.0)
+    bus.write_block(0x3C, 0x40, b"\x01")
+    assert bus.probe(0x68) == [(0x3C, 0x40, b"\x01")]
+    bus.close_device()
@@ -0,0 +1,35 @@
+import pytest
+
+from ch347 import WaveshareI2C
+from ch347_sim import SimDHT12, SimulatedCH347
+from dht12 import DHT12, decode_dht12, decode_dht12_block
+
+def frame(humidity, tenths, temperature, temperature_tenths):
+    data = [humidity, tenths, temperature, temperature_tenths]
+    return bytes(data + [sum(data) & 0xFF])
+
+@pytest.mark.parametrize("data, expected", [
+    (frame(45, 6, 23, 4), (45.6, 23.4)),
+    (frame(80, 0, 5, 0x80 | 3), (80.0, -5.3)),  # Bit 7 of the tenths byte: below zero
+    (frame(90, 1, 0, 0x80 | 5), (90.1, -0.5)),
+    (frame(30, 0, 0, 0x80), (30.0, 0.0)),
+])
+def test_decode_sign(data, expected):
+    assert decode_dht12(data) == expected
+
+def test_decode_rejects_bad_checksum():
+    data = bytearray(frame(45, 6, 23, 4))
+    data[4] ^= 0x01
+    assert decode_dht12(data) is None
+
+def test_block_decode_matches_single_frames():
+    frames = frame(45, 6, 23, 4) + frame(80, 0, 5, 0x83) + b"\x01\x02\x03\x04\x05"
+    humidity, temperature, valid = decode_dht12_block(bytearray(frames))
+    assert list(valid) == [True, True, False]
+    assert [round(float(t), 1) for t in temperature[:2]] == [23.4, -5.3]
+    assert [round(float(h), 1) for h in humidity[:2]] == [45.6, 80.0]
+
+def test_read_below_zero_through_the_simulator():
+    sim = SimulatedCH347([[SimDHT12(humidity=60.0, temperature=-12.7)]], usb_latency=0)
+    sensor = DHT12(WaveshareI2C(dll=sim), sleep=lambda s: None)
+    assert sensor.read() == (60.0, -12.7)
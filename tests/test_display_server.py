@@ -0,0 +1,57 @@
+from display_server import FRAME_OFFSET, SEQ, ClientSlot
+
+def write_frame(slot, seq, data):
+    # What DisplayClient.begin/write/publish do to the segment
+    SEQ.pack_into(slot.shm.buf, 0, seq - 1)
+    slot.shm.buf[FRAME_OFFSET:FRAME_OFFSET + len(data)] = data
+    SEQ.pack_into(slot.shm.buf, 0, seq)
+
+class WriterDuringCopy(bytearray):
+    # Frame copy target that lets the client start its next frame while the
+    # server is copying, as another process could
+    def __init__(self, size, slot):
+        super().__init__(size)
+        self.slot = slot
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        seq = SEQ.unpack_from(self.slot.shm.buf, 0)[0]
+        SEQ.pack_into(self.slot.shm.buf, 0, seq + 1)
+
+def test_new_even_sequence_is_copied_once():
+    slot = ClientSlot(1, "test", 16)
+    try:
+        assert not slot.read_frame()  # Nothing published yet
+        write_frame(slot, 2, b"\x01" * 16)
+        assert slot.read_frame()
+        assert slot.frame == b"\x01" * 16
+        assert not slot.read_frame()  # Same sequence
+        assert slot.frames == 1
+    finally:
+        slot.close()
+
+def test_odd_sequence_is_skipped():
+    slot = ClientSlot(1, "test", 16)
+    try:
+        SEQ.pack_into(slot.shm.buf, 0, 1)  # Client inside begin() ... publish()
+        slot.shm.buf[FRAME_OFFSET] = 0xFF
+        assert not slot.read_frame()
+        assert slot.frame == bytes(16)
+    finally:
+        slot.close()
+
+def test_copy_torn_by_a_concurrent_write_is_discarded():
+    slot = ClientSlot(1, "test", 16)
+    try:
+        write_frame(slot, 2, b"\x01" * 16)
+        slot.frame = WriterDuringCopy(16, slot)
+        assert not slot.read_frame()
+        assert slot.torn == 1
+        assert slot.seq == 0
+        slot.frame = bytearray(16)
+        write_frame(slot, 4, b"\x02" * 16)
+        assert slot.read_frame()
+        assert slot.frame == b"\x02" * 16
+        assert slot.seq == 4
+    finally:
+        slot.close()
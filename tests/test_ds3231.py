@@ -0,0 +1,52 @@
+import datetime
+
+from ch347 import WaveshareI2C
+from ch347_sim import SimDS3231, SimulatedCH347
+from ds3231 import DS3231, REG_STATUS, STATUS_A1F, STATUS_A2F
+
+class RecordingI2C:
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.writes = []
+
+    def write_block(self, addr, register, data):
+        self.writes.append((register, bytes(data)))
+        self.i2c.write_block(addr, register, data)
+
+    def read(self, addr, register, length):
+        return self.i2c.read(addr, register, length)
+
+def make_rtc():
+    device = SimDS3231(start=datetime.datetime(2024, 5, 6, 7, 8, 9))
+    sim = SimulatedCH347([[device]], usb_latency=0)
+    i2c = RecordingI2C(WaveshareI2C(dll=sim))
+    return DS3231(i2c), device, i2c
+
+def test_flush_writes_one_transaction_per_dirty_run():
+    rtc, device, i2c = make_rtc()
+    rtc.set_register(0x08, 0x12)
+    rtc.set_register(0x07, 0x11)
+    rtc.set_register(0x10, 0x05)
+    rtc.flush()
+    assert i2c.writes == [(0x07, b"\x11\x12"), (0x10, b"\x05")]
+    assert device.regs[0x07:0x09] == b"\x11\x12"
+    assert device.regs[0x10] == 0x05
+    rtc.flush()
+    assert len(i2c.writes) == 2  # Nothing dirty left
+
+def test_clear_status_keeps_flags_latched_after_the_cached_read():
+    rtc, device, i2c = make_rtc()
+    device.regs[REG_STATUS] = STATUS_A1F
+    rtc.refresh()
+    device.regs[REG_STATUS] |= STATUS_A2F  # Alarm 2 fires after the read
+    rtc.clear_status(STATUS_A1F)
+    assert device.regs[REG_STATUS] & STATUS_A2F
+    assert not device.regs[REG_STATUS] & STATUS_A1F
+    assert not rtc.status() & STATUS_A1F
+
+def test_decode_alarm_day_and_date():
+    rtc, device, i2c = make_rtc()
+    rtc.set_alarm1(second=45, minute=59, hour=23, day=3)
+    rtc.set_alarm2(minute=40, date=31)
+    assert rtc.alarm1(max_age=0) == [45, 59, 23, None, 3]
+    assert rtc.alarm2(max_age=0) == [40, None, 31, None]
@@ -0,0 +1,33 @@
+from ch347 import WaveshareI2C
+from ch347_sim import SimHT16K33, SimulatedCH347
+from ht16k33 import COLON_ADDRESS, COLON_BIT, DIGIT_ADDRESSES, HT16K33, SEGMENTS
+
+def make_display():
+    device = SimHT16K33()
+    sim = SimulatedCH347([[device]], usb_latency=0)
+    return HT16K33(WaveshareI2C(dll=sim)), device
+
+def test_nothing_changed_sends_nothing():
+    display, device = make_display()
+    writes = device.ram_writes
+    assert display.update_dirty() == 0
+    assert device.ram_writes == writes
+
+def test_colon_toggle_is_one_byte():
+    display, device = make_display()
+    display.set_colon(True)
+    assert display.update_dirty() == 1
+    assert device.ram[COLON_ADDRESS] == COLON_BIT
+
+def test_span_runs_from_first_to_last_changed_byte():
+    display, device = make_display()
+    display.print_time(12, 34)
+    display.update_dirty()
+    sent = display.bytes_sent
+    display.print_time(12, 35)  # Only the last digit changes
+    assert display.update_dirty() == 1
+    display.print_time(13, 36)  # Second and last digit: 0x02 .. 0x08
+    assert display.update_dirty() == DIGIT_ADDRESSES[3] - DIGIT_ADDRESSES[1] + 1
+    assert display.bytes_sent == sent + 1 + 7
+    assert bytes(device.ram) == bytes(display.buffer)
+    assert device.ram[DIGIT_ADDRESSES[3]] == SEGMENTS["6"]
@@ -0,0 +1,79 @@
+import errno
+from ctypes import c_ubyte
+
+import pytest
+
+from ch347 import Delay
+from ch347_sim import SimDS3231, SimulatedI2CDev, default_devices
+from i2c_dev import I2C_M_RD, I2C_RDWR, LinuxI2C
+
+class RecordingI2CDev(SimulatedI2CDev):
+    # Keeps (addr, flags, len, written bytes) per message, one list per ioctl
+    def __init__(self, devices=None):
+        super().__init__(devices, syscall_latency=0)
+        self.calls = []
+
+    def ioctl(self, fd, request, arg):
+        msgs = []
+        for i in range(arg.nmsgs):
+            msg = arg.msgs[i]
+            written = b"" if msg.flags & I2C_M_RD else bytes(msg.buf[:msg.len])
+            msgs.append((msg.addr, msg.flags, msg.len, written))
+        self.calls.append((request, msgs))
+        return super().ioctl(fd, request, arg)
+
+def make_bus(devices=None):
+    dev = RecordingI2CDev(devices)
+    return LinuxI2C(1, ioctl=dev.ioctl, opener=dev.open, closer=dev.close), dev
+
+def test_write_block_is_one_message_with_the_register_first():
+    i2c, dev = make_bus()
+    i2c.write_block(0x68, 0x07, b"\x11\x12")
+    assert dev.calls == [(I2C_RDWR, [(0x68, 0, 3, b"\x07\x11\x12")])]
+    assert dev.bus[0x68].regs[0x07:0x09] == b"\x11\x12"
+
+def test_read_is_write_then_repeated_start_read_in_one_ioctl():
+    i2c, dev = make_bus()
+    data = i2c.read(0x5C, 0x00, 5)
+    assert dev.calls == [(I2C_RDWR, [(0x5C, 0, 1, b"\x00"), (0x5C, I2C_M_RD, 5, b"")])]
+    assert (sum(data[:4]) & 0xFF) == data[4]
+
+def test_stream_ack_drops_the_address_byte():
+    i2c, dev = make_bus()
+    wbuf = (c_ubyte * 3)(0x3C << 1, 0x00, 0xAF)
+    assert i2c.stream_ack(wbuf, 3, None, 0) == 3
+    assert dev.calls[-1][1] == [(0x3C, 0, 2, b"\x00\xaf")]
+
+def test_probe():
+    i2c, dev = make_bus()
+    assert i2c.probe(0x68)
+    assert dev.calls[-1][1] == [(0x68, 0, 0, b"")]
+    assert not i2c.probe(0x42)
+
+def test_errors_become_exceptions():
+    i2c, dev = make_bus([SimDS3231()])
+    with pytest.raises(Exception, match="0x42"):
+        i2c.write_block(0x42, 0x00, b"\x01")
+    with pytest.raises(Exception, match="0x42"):
+        i2c.read(0x42, 0x00, 1)
+    with pytest.raises(Exception, match="Vectored"):
+        i2c.transfer([(0x68, b"\x00", 7), (0x42, b"\x00", 1)])
+
+def test_unknown_ioctl_is_rejected_by_the_mock():
+    dev = SimulatedI2CDev(syscall_latency=0)
+    with pytest.raises(OSError) as e:
+        dev.ioctl(3, 0x0703, None)
+    assert e.value.errno == errno.EINVAL
+
+def test_open_failure():
+    def opener(path, flags):
+        raise FileNotFoundError(errno.ENOENT, "No such file", path)
+    with pytest.raises(Exception, match="Device Open Failed"):
+        LinuxI2C(7, ioctl=lambda *args: 0, opener=opener)
+
+def test_transfer_packs_ops_and_splits_at_delays():
+    i2c, dev = make_bus(default_devices())
+    views = i2c.transfer([(0x68, b"\x00", 7), (0x5C, b"\x00", 5), Delay(1), (0x3C, b"\x00\xaf", 0)])
+    assert [len(msgs) for _, msgs in dev.calls] == [4, 1]
+    assert dev.calls[0][1][1] == (0x68, I2C_M_RD, 7, b"")
+    assert len(views[0]) == 7 and len(views[1]) == 5
@@ -0,0 +1,38 @@
+from i2c_metrics import MAX_EXPONENT, SUB_BUCKETS, LatencyHistogram, Metrics, bucket_index, bucket_upper
+
+def test_every_value_falls_inside_its_bucket():
+    for us in list(range(2000)) + [1 << n for n in range(11, 30)] + [(1 << n) - 1 for n in range(11, 30)]:
+        index = bucket_index(us)
+        lower = bucket_upper(index - 1) if index else 0
+        assert lower <= us < bucket_upper(index)
+
+def test_buckets_are_contiguous_with_bounded_width():
+    for index in range(1, (MAX_EXPONENT + 1) * SUB_BUCKETS):
+        lower, upper = bucket_upper(index - 1), bucket_upper(index)
+        assert upper > lower
+        if lower >= SUB_BUCKETS:
+            assert (upper - lower) / lower <= 1.0 / SUB_BUCKETS
+
+def test_percentile_and_cumulative():
+    histogram = LatencyHistogram()
+    for us in [100] * 90 + [5000] * 10:
+        histogram.record_ns(us * 1000)
+    assert bucket_upper(bucket_index(100)) / 1e6 == histogram.percentile(50)
+    assert 0.005 < histogram.percentile(99) <= 0.005 * (1 + 1.0 / SUB_BUCKETS)
+    cumulative = dict(histogram.cumulative())
+    assert cumulative[128 / 1e6] == 90  # Power-of-two edges are exact
+    assert cumulative[4096 / 1e6] == 90
+    assert cumulative[8192 / 1e6] == 100
+    assert histogram.total_ns == (90 * 100 + 10 * 5000) * 1000
+
+def test_gauges_are_read_at_render_time():
+    metrics = Metrics()
+    values = [21.5]
+    metrics.gauge("dht12_temperature_celsius", "DHT12 temperature", lambda: values[-1])
+    metrics.gauge("ds3231_temperature_celsius", "DS3231 die temperature", lambda: None)
+    text = metrics.render()
+    assert "dht12_temperature_celsius 21.5\n" in text
+    assert "# TYPE ds3231_temperature_celsius gauge" in text
+    assert "\nds3231_temperature_celsius " not in text
+    values.append(22.0)
+    assert "dht12_temperature_celsius 22.0\n" in metrics.render()
@@ -0,0 +1,70 @@
+from ctypes import c_ubyte
+
+from ch347 import WaveshareI2C
+from ch347_sim import SimulatedCH347
+from i2c_retry import RetryingI2C
+
+class Faults:
+    # Stands in for the simulator's fault_random, one entry per transfer:
+    # a fault draws (hit, stuck, kind), None and the end of the script draw
+    # no fault
+    def __init__(self, *faults):
+        self.draws = []
+        for kind in faults:
+            if kind is None:
+                self.draws.append(1.0)
+            else:
+                self.draws += [0.0, 1.0, 0.0 if kind == "nack" else 1.0]
+
+    def random(self):
+        return self.draws.pop(0) if self.draws else 1.0
+
+def make_bus(*faults, mode=0x03, **kwargs):
+    sim = SimulatedCH347(usb_latency=0)
+    sim.inject_faults(1.0, stuck_rate=0.0)
+    sim.fault_random = Faults(*faults)
+    return RetryingI2C(WaveshareI2C(dll=sim, mode=mode), **kwargs), sim
+
+def test_frame_write_is_sent_again():
+    i2c, sim = make_bus("nack")
+    i2c.write_block(0x3C, 0x40, b"\x01\x02")
+    assert i2c.counts["frame"] == {"ops": 1, "retries": 1, "verified": 0, "failed": 0}
+    assert sim.faults == 1
+
+def test_lost_ack_on_register_write_is_verified_not_resent():
+    i2c, sim = make_bus("ack_lost")
+    i2c.write_block(0x68, 0x07, b"\x11\x12")
+    assert i2c.counts["write"] == {"ops": 1, "retries": 1, "verified": 1, "failed": 0}
+    assert sim.device(0x68).regs[0x07:0x09] == b"\x11\x12"
+
+def test_write_only_stream_ack_to_a_display_is_retried():
+    i2c, sim = make_bus("nack")
+    data = (c_ubyte * 3)(0x3C << 1, 0x40, 0xAA)
+    assert i2c.stream_ack(data, 3, None, 0) == 3
+    assert i2c.counts["frame"]["retries"] == 1
+    assert i2c.counts["write"]["ops"] == 0
+
+def test_write_only_stream_ack_to_a_register_gets_one_attempt():
+    i2c, sim = make_bus("nack")
+    data = (c_ubyte * 3)(0x68 << 1, 0x07, 0x11)
+    assert i2c.stream_ack(data, 3, None, 0) < 3
+    assert i2c.counts["write"] == {"ops": 1, "retries": 1, "verified": 0, "failed": 1}
+
+def test_transfer_with_display_writes_and_reads_is_retried():
+    i2c, sim = make_bus("nack")
+    views = i2c.transfer([(0x3C, b"\x40\x01", 0), (0x68, b"\x00", 7)])
+    assert len(views[1]) == 7
+    assert i2c.counts["read"]["retries"] == 1
+    assert i2c.counts["write"]["ops"] == 0
+
+def test_budget_steps_the_speed_down_without_printing(capsys):
+    # Two reads out of 20 need a second attempt; the recovery between
+    # attempts is a transfer too
+    i2c, sim = make_bus("nack", None, None, "nack", budget_window=20)
+    capsys.readouterr()
+    for _ in range(20):
+        i2c.read(0x68, 0x00, 7)
+    assert len(i2c.downgrades) == 1
+    assert i2c.stats()["speed"] == "400 kHz"
+    assert sim.speeds[0] == 400000
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from ctypes import c_ubyte
+
+from ch347_sim import SimulatedCH347
+from i2c_trace import TraceReader, TraceRecorder, OP_STREAM
+
+def stream(recorder, addr, payload):
+    wbuf = (c_ubyte * (len(payload) + 1))(addr << 1, *payload)
+    return recorder.CH347StreamI2C(0, len(wbuf), wbuf, 0, None)
+
+def records(path):
+    reader = TraceReader(path)
+    try:
+        return [(rec.op, rec.address, bytes(rec.write), rec.result) for rec in reader]
+    finally:
+        reader.close()
+
+def test_failed_call_is_on_disk_before_close(tmp_path):
+    path = tmp_path / "trace.bin"
+    recorder = TraceRecorder(SimulatedCH347(usb_latency=0), str(path), flush_interval=3600)
+    assert stream(recorder, 0x3C, b"\x00\xaf")
+    assert path.stat().st_size == 0  # Still buffered
+    assert not stream(recorder, 0x22, b"\x00")  # Nothing at 0x22: NACK
+    assert records(path) == [(OP_STREAM, 0x3C, b"\x78\x00\xaf", 1), (OP_STREAM, 0x22, b"\x44\x00", 0)]
+    recorder.close()
+
+def test_idle_buffer_is_flushed_by_the_timer(tmp_path):
+    path = tmp_path / "trace.bin"
+    recorder = TraceRecorder(SimulatedCH347(usb_latency=0), str(path), flush_interval=0.05)
+    stream(recorder, 0x3C, b"\x00\xaf")
+    assert path.stat().st_size == 0  # Buffered, and no further calls come
+    deadline = time.monotonic() + 2.0
+    while path.stat().st_size == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert records(path) == [(OP_STREAM, 0x3C, b"\x78\x00\xaf", 1)]
+    recorder.close()
+
+def test_concurrent_records_are_all_kept(tmp_path):
+    path = tmp_path / "trace.bin"
+    recorder = TraceRecorder(SimulatedCH347(usb_latency=0), str(path), flush_bytes=256, flush_interval=3600)
+
+    def writer(value):
+        for _ in range(200):
+            stream(recorder, 0x3C, bytes([0x40, value]))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    recorder.close()
+    written = records(path)
+    assert len(written) == recorder.records == 800
+    assert all(write[:2] == b"\x78\x40" and len(write) == 3 for _, _, write, _ in written)
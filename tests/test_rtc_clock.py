@@ -0,0 +1,57 @@
+import datetime
+
+from rtc_clock import SQWTicker
+
+START = datetime.datetime(2024, 5, 6, 7, 8, 9)
+
+class FakeRTC:
+    def __init__(self):
+        self.time = START
+        self.reads = 0
+
+    def read_time(self):
+        self.reads += 1
+        return self.time, 1
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def make_ticker():
+    rtc = FakeRTC()
+    clock = FakeClock()
+    ticker = SQWTicker(rtc, None, clock=clock, resync_interval=600)
+    ticker.wait_edge = lambda: None  # Edges are driven by the test
+    ticker.current, _ = rtc.read_time()
+    ticker.anchor_mono = clock()
+    return ticker, rtc, clock
+
+def tick(ticker, rtc, clock, seconds=1):
+    clock.now += seconds
+    rtc.time += datetime.timedelta(seconds=seconds)
+    return ticker.wait_next_second()
+
+def test_counted_edges_need_no_rtc_reads():
+    ticker, rtc, clock = make_ticker()
+    for _ in range(10):
+        now = tick(ticker, rtc, clock)
+    assert now == START + datetime.timedelta(seconds=10)
+    assert rtc.reads == 1
+
+def test_missed_edge_resyncs_from_the_rtc():
+    ticker, rtc, clock = make_ticker()
+    tick(ticker, rtc, clock)
+    now = tick(ticker, rtc, clock, seconds=2)  # One edge lost in a USB stall
+    assert now == START + datetime.timedelta(seconds=3)
+    assert ticker.corrections == 1
+    assert tick(ticker, rtc, clock) == START + datetime.timedelta(seconds=4)
+
+def test_resync_interval():
+    ticker, rtc, clock = make_ticker()
+    for _ in range(600):
+        tick(ticker, rtc, clock)
+    assert ticker.resyncs == 1
+    assert ticker.corrections == 0
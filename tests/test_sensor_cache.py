@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from sensor_cache import SensorCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_hit_and_expiry():
+    clock = FakeClock()
+    cache = SensorCache(clock=clock)
+    reads = []
+    cache.register("dht12", lambda: reads.append(clock.now) or len(reads), 2.0)
+    assert cache.get("dht12") == 1
+    clock.now = 1.9
+    assert cache.get("dht12") == 1
+    clock.now = 2.0
+    assert cache.get("dht12") == 2
+    assert cache.stats()["dht12"]["hits"] == 1
+
+def test_waiters_share_the_inflight_read():
+    started = threading.Event()
+    release = threading.Event()
+    count = [0]
+
+    def read():
+        count[0] += 1
+        started.set()
+        release.wait()
+        return count[0]
+
+    cache = SensorCache()
+    cache.register("dht12", read, 2.0)
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get("dht12")))
+    leader.start()
+    started.wait()
+    waiters = [threading.Thread(target=lambda: results.append(cache.get("dht12"))) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    while cache.stats()["dht12"]["single_flight_waits"] < 3:
+        pass
+    release.set()
+    for t in [leader] + waiters:
+        t.join()
+    assert results == [1, 1, 1, 1]
+    assert count[0] == 1
+
+def test_waiters_get_the_leaders_error():
+    started = threading.Event()
+    release = threading.Event()
+
+    def read():
+        started.set()
+        release.wait()
+        raise Exception("Failed to read from address 0x5c")
+
+    cache = SensorCache()
+    cache.register("dht12", read, 2.0)
+    errors = []
+
+    def get():
+        try:
+            cache.get("dht12")
+        except Exception as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=get)
+    leader.start()
+    started.wait()
+    waiter = threading.Thread(target=get)
+    waiter.start()
+    while cache.stats()["dht12"]["single_flight_waits"] < 1:
+        pass
+    release.set()
+    leader.join()
+    waiter.join()
+    assert errors == ["Failed to read from address 0x5c"] * 2
+    with pytest.raises(Exception):
+        cache.get("dht12")  # Errors are not cached: a new read, which fails again
+
+def test_max_age_zero_refreshes_and_feeds_ttl_readers():
+    clock = FakeClock()
+    cache = SensorCache(clock=clock)
+    reads = []
+    cache.register("dht12", lambda: reads.append(clock.now) or len(reads), 2.0)
+    assert cache.get("dht12", max_age=0) == 1
+    clock.now = 1.0
+    assert cache.get("dht12") == 1  # Another consumer within the TTL
+    clock.now = 2.0
+    assert cache.get("dht12", max_age=0) == 2  # The owner's next period
+    clock.now = 2.5
+    assert cache.get("dht12", max_age=0) == 3  # Never served from the cache
+    assert cache.stats()["dht12"]["hits"] == 1
@@ -0,0 +1,47 @@
+from sensor_scheduler import PollingScheduler
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_deferred_reads_do_not_spin():
+    fake = FakeTime()
+    flushing = [True]
+    scheduler = PollingScheduler(busy=lambda: flushing[0], clock=fake.clock, sleep=fake.sleep)
+    reads = []
+    scheduler.add("rtc", lambda: reads.append(fake.now), period=1.0, tolerance=0.25)
+    scheduler.run(duration=0.2)
+    # Busy for the whole run: the read waits, in BUSY_POLL steps, not zero sleeps
+    assert reads == []
+    assert scheduler.deferred > 0
+    assert all(s > 0 for s in fake.sleeps)
+    assert len(fake.sleeps) < 50
+    flushing[0] = False
+    scheduler.run(duration=0.05)
+    assert len(reads) == 1
+
+def test_deferred_read_runs_at_its_deadline():
+    fake = FakeTime()
+    scheduler = PollingScheduler(busy=lambda: True, clock=fake.clock, sleep=fake.sleep)
+    reads = []
+    scheduler.add("rtc", lambda: reads.append(fake.now), period=1.0, tolerance=0.25)
+    scheduler.run(duration=0.5)
+    assert len(reads) == 1
+    assert 0.25 <= reads[0] < 0.3
+
+def test_no_sensors():
+    fake = FakeTime()
+    scheduler = PollingScheduler(clock=fake.clock, sleep=fake.sleep)
+    scheduler.start()
+    assert scheduler.seconds_until_next() is None
+    scheduler.run(duration=1.0)
+    assert fake.now == 1.0
+    scheduler.run()  # Returns instead of spinning
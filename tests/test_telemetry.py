@@ -0,0 +1,71 @@
+from telemetry import RingBuffer, TelemetryStore, TelemetryWriter, read_binary
+
+def test_ring_wraps_and_keeps_time_order():
+    ring = RingBuffer(4, ["v"])
+    for t in range(6):
+        ring.append(float(t), [t * 10])
+    assert (ring.count, ring.total, ring.head) == (4, 6, 2)
+    times, (values,) = ring.query()
+    assert list(times) == [2.0, 3.0, 4.0, 5.0]
+    assert list(values) == [20, 30, 40, 50]
+    times, _ = ring.query(3.0, 5.0)  # Start inclusive, end exclusive
+    assert list(times) == [3.0, 4.0]
+
+def test_extend_across_the_end_and_larger_than_capacity():
+    ring = RingBuffer(4, ["v"])
+    ring.extend([0.0, 1.0, 2.0], [[0, 1, 2]])
+    ring.extend([3.0, 4.0], [[3, 4]])  # Splits into two slice copies
+    assert list(ring.query()[1][0]) == [1, 2, 3, 4]
+    ring.extend([float(t) for t in range(5, 11)], [list(range(5, 11))])
+    assert list(ring.query()[1][0]) == [7, 8, 9, 10]
+    assert ring.total == 11
+
+def test_since_cursor_reports_new_and_lost_rows():
+    ring = RingBuffer(4, ["v"])
+    for t in range(3):
+        ring.append(float(t), [t])
+    lost, times, _ = ring.since(0)
+    assert lost == 0 and list(times) == [0.0, 1.0, 2.0]
+    cursor = ring.total
+    assert len(ring.since(cursor)[1]) == 0
+    for t in range(3, 9):
+        ring.append(float(t), [t])
+    lost, times, _ = ring.since(cursor)  # Rows 3 and 4 were overwritten
+    assert lost == 2
+    assert list(times) == [5.0, 6.0, 7.0, 8.0]
+
+def test_rollup_closes_buckets_on_interval_boundaries():
+    store = TelemetryStore(["temperature"], rollups=((1.0, 8), (60.0, 8)))
+    for t, value in [(0.0, 1.0), (0.5, 3.0), (0.999, 2.0), (1.0, 10.0)]:
+        store.append(t, [value])
+    # The sample at exactly 1.0 s opens the second bucket
+    times, (mins, maxs, means, counts) = store.query(resolution=1.0)
+    assert list(times) == [0.0]
+    assert (mins[0], maxs[0], means[0], counts[0]) == (1.0, 3.0, 2.0, 3)
+    assert len(store.query(resolution=60.0)[0]) == 0
+
+def test_minute_rollup_weights_seconds_by_sample_count():
+    store = TelemetryStore(["v"], rollups=((1.0, 120), (60.0, 8)))
+    store.append(0.0, [0.0])
+    store.append(0.5, [0.0])
+    store.append(59.0, [3.0])
+    store.append(60.0, [100.0])  # Closes second 59, which stays in minute 0
+    assert len(store.query(resolution=60.0)[0]) == 0
+    store.append(61.0, [100.0])  # Closes second 60, the first of minute 1
+    times, (mins, maxs, means, counts) = store.query(resolution=60.0)
+    assert list(times) == [0.0]
+    assert (mins[0], maxs[0], means[0], counts[0]) == (0.0, 3.0, 1.0, 3)
+
+def test_writer_appends_only_new_rows(tmp_path):
+    ring = RingBuffer(8, ["a", "b"])
+    path = str(tmp_path / "telemetry.bin")
+    writer = TelemetryWriter(ring, path)
+    ring.append(1.0, [1.5, 2.5])
+    assert writer.flush() == 1
+    assert writer.flush() == 0
+    ring.append(2.0, [3.5, 4.5])
+    assert writer.flush() == 1
+    fields, times, (a, b) = read_binary(path)
+    assert fields == ["a", "b"]
+    assert list(times) == [1.0, 2.0]
+    assert list(a) == [1.5, 3.5] and list(b) == [2.5, 4.5]